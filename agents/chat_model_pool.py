@@ -0,0 +1,214 @@
+import hashlib
+import importlib.util
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+_lock = threading.Lock()
+_chat_models: Dict[tuple, ChatOpenAI] = {}
+_embeddings: Dict[str, OpenAIEmbeddings] = {}
+
+# one keep-alive connection pool shared by every model and embedding client
+_http_settings = {
+    "max_connections": 64,
+    "max_keepalive_connections": 32,
+    "keepalive_expiry": 120.0,
+    "timeout": 120.0,
+    "base_url": None,
+}
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+# window and batch size of the coalescing chat models, None sends every call on its own
+_coalescing: Optional[dict] = None
+
+
+def configure_http_pool(**settings) -> None:
+    """
+    Changes the shared connection pool (max_connections, max_keepalive_connections,
+    keepalive_expiry, timeout) or points every client to an OpenAI-compatible base_url.
+    Has to be called before the first model is created
+    """
+    unknown = set(settings) - set(_http_settings)
+    if unknown:
+        raise ValueError(f"Unknown http pool settings: {', '.join(sorted(unknown))}")
+    with _lock:
+        if _http_client is not None or _chat_models or _embeddings:
+            raise RuntimeError("The http pool is already in use, configure it before creating models")
+        _http_settings.update(settings)
+
+
+def configure_coalescing(
+    window: Optional[float] = 0.02, max_batch: int = 64, tokenizer: Optional[str] = None
+) -> None:
+    """
+    Makes get_chat_model return models that batch the calls sent within {window} seconds
+    into one /completions request of at most {max_batch} prompts. Meant for self-hosted
+    OpenAI-compatible servers set as base_url with configure_http_pool; None turns it off.
+    {tokenizer} names the served chat model on Hugging Face, its chat template renders the prompts
+    """
+    global _coalescing
+    with _lock:
+        if _chat_models:
+            raise RuntimeError("Chat models are already in use, configure coalescing before creating them")
+        if window is not None and _http_settings["base_url"] is None:
+            raise RuntimeError("Coalescing needs the base_url of a self-hosted server, see configure_http_pool")
+        _coalescing = (
+            None if window is None else {"window": window, "max_batch": max_batch, "tokenizer": tokenizer}
+        )
+
+
+def _http_client_kwargs() -> dict:
+    return {
+        "limits": httpx.Limits(
+            max_connections=_http_settings["max_connections"],
+            max_keepalive_connections=_http_settings["max_keepalive_connections"],
+            keepalive_expiry=_http_settings["keepalive_expiry"],
+        ),
+        "timeout": _http_settings["timeout"],
+        # multiplexes the concurrent calls over a single connection where the server allows it
+        "http2": importlib.util.find_spec("h2") is not None,
+    }
+
+
+def get_http_client() -> httpx.Client:
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(**_http_client_kwargs())
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(**_http_client_kwargs())
+        return _async_http_client
+
+
+def _client_kwargs() -> dict:
+    kwargs = {
+        "http_client": get_http_client(),
+        "http_async_client": get_async_http_client(),
+    }
+    if _http_settings["base_url"] is not None:
+        kwargs["base_url"] = _http_settings["base_url"]
+    return kwargs
+
+
+def get_chat_model(model_name: str = "gpt-3.5-turbo", temperature: float = 0.2, **kwargs) -> ChatOpenAI:
+    """
+    Returns the ChatOpenAI shared by every caller asking for the same settings
+    """
+    key = (model_name, temperature, tuple(sorted(kwargs.items())))
+    if _coalescing is not None:
+        return _get_coalescing_chat_model(key, model_name, temperature, **kwargs)
+    client_kwargs = _client_kwargs()
+    with _lock:
+        if key not in _chat_models:
+            _chat_models[key] = ChatOpenAI(
+                model_name=model_name, temperature=temperature, **client_kwargs, **kwargs
+            )
+        return _chat_models[key]
+
+
+def _get_coalescing_chat_model(key: tuple, model_name: str, temperature: float, **kwargs):
+    from agents.coalescing_chat_model import CoalescingChatModel
+
+    with _lock:
+        if key not in _chat_models:
+            _chat_models[key] = CoalescingChatModel(
+                model_name=model_name,
+                temperature=temperature,
+                base_url=_http_settings["base_url"],
+                **_coalescing,
+                **kwargs,
+            )
+        return _chat_models[key]
+
+
+def get_embeddings(model: str = "text-embedding-ada-002") -> OpenAIEmbeddings:
+    """
+    Returns the OpenAIEmbeddings shared by every caller asking for {model}
+    """
+    client_kwargs = _client_kwargs()
+    with _lock:
+        if model not in _embeddings:
+            _embeddings[model] = OpenAIEmbeddings(model=model, **client_kwargs)
+        return _embeddings[model]
+
+
+class EmbeddingCache:
+    """
+    Embeddings by a hash of their text, stored as float32 arrays, the least
+    recently used are dropped once they take more than {max_bytes}
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._vectors: "OrderedDict[bytes, array]" = OrderedDict()
+
+    @staticmethod
+    def key(text: str, model: str) -> bytes:
+        return hashlib.sha1(f"{model}\x00{text}".encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[array]:
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+            return vector
+
+    def put(self, key: bytes, vector: List[float]) -> None:
+        packed = array("f", vector)
+        with self._lock:
+            if key in self._vectors:
+                return
+            self._vectors[key] = packed
+            self.bytes += packed.itemsize * len(packed)
+            while self.bytes > self.max_bytes and len(self._vectors) > 1:
+                _, dropped = self._vectors.popitem(last=False)
+                self.bytes -= dropped.itemsize * len(dropped)
+
+
+embedding_cache = EmbeddingCache()
+# embeddings being requested, a caller asking for the same text waits for that request
+_embeddings_in_flight: Dict[bytes, Future] = {}
+
+
+def embed_query(text: str, model: str = "text-embedding-ada-002") -> List[float]:
+    """
+    Embeds {text}, repeated texts are served from the bounded embedding_cache and
+    a text already being embedded by another thread is not requested twice
+    """
+    key = EmbeddingCache.key(text, model)
+    with _lock:
+        # checked under the lock, a request finishing meanwhile has stored its vector
+        vector = embedding_cache.get(key)
+        if vector is not None:
+            return list(vector)
+        future = _embeddings_in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = _embeddings_in_flight[key] = Future()
+    if not owner:
+        return list(future.result())
+
+    try:
+        vector = get_embeddings(model).embed_query(text)
+        embedding_cache.put(key, vector)
+        future.set_result(vector)
+    except Exception as error:
+        future.set_exception(error)
+        raise
+    finally:
+        with _lock:
+            del _embeddings_in_flight[key]
+    return list(vector)
@@ -0,0 +1,243 @@
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain.chat_models.base import BaseChatModel
+from langchain.schema import AIMessage, BaseMessage, ChatGeneration, ChatResult
+from langchain.schema.messages import AIMessageChunk
+from langchain.schema.output import ChatGenerationChunk
+
+from agents.chat_model_pool import get_http_client
+from agents.tracing import span
+
+_ROLES = {"system": "System", "human": "Human", "ai": "Assistant"}
+_CHAT_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+# ends a plain transcript prompt before the model writes the next human turn
+TRANSCRIPT_STOP = "\n\nHuman:"
+
+
+@functools.lru_cache(maxsize=None)
+def _load_tokenizer(tokenizer_name: str):
+    # only needed to render prompts for a served chat model
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+    if not tokenizer.chat_template:
+        raise ValueError(f"The tokenizer {tokenizer_name!r} has no chat template")
+    return tokenizer
+
+
+def render_prompt(messages: List[BaseMessage], tokenizer_name: Optional[str] = None) -> str:
+    """
+    Renders chat {messages} as a single completion prompt ending with the assistant's turn.
+
+    With {tokenizer_name} (the Hugging Face name of the served model) its chat template
+    renders them, so the completion matches what the chat endpoint would answer. Without it
+    they become a plain role-prefixed transcript, which only suits base models. The messages
+    keep their order either way, so prompts laid out by PromptLayout share their prefix
+    """
+    if tokenizer_name is not None:
+        conversation = [
+            {"role": _CHAT_ROLES.get(message.type, message.type), "content": message.content} for message in messages
+        ]
+        return _load_tokenizer(tokenizer_name).apply_chat_template(
+            conversation, tokenize=False, add_generation_prompt=True
+        )
+    lines = [f"{_ROLES.get(message.type, message.type.capitalize())}: {message.content}" for message in messages]
+    lines.append(f"{_ROLES['ai']}:")
+    return "\n\n".join(lines)
+
+
+class RequestCoalescer:
+    """
+    Collects the completion requests sent to {base_url} within {window} seconds
+    of the first one and submits those with the same parameters and timeout as a single
+    /completions request with a list of prompts, so a batching server runs a whole
+    bidding round in one pass. A batch is sent early once {max_batch} prompts wait.
+    """
+
+    def __init__(self, base_url: str, window: float = 0.02, max_batch: int = 64, api_key: Optional[str] = None) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.window = window
+        self.max_batch = max_batch
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        self.requests = 0
+        self.batches = 0
+        self._condition = threading.Condition()
+        self._pending: List[Tuple[tuple, str, Future]] = []
+        self._opened: Optional[float] = None
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="coalescer")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="coalescer-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, prompt: str, parameters: Dict[str, Any], timeout: Optional[float] = None) -> Future:
+        """
+        Queues {prompt} for the next batch of requests sharing its {parameters} and request
+        {timeout}, the future resolves to the completion text
+        """
+        future: Future = Future()
+        key = (
+            tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in parameters.items())),
+            timeout,
+        )
+        with self._condition:
+            if not self._pending:
+                self._opened = time.monotonic()
+            self._pending.append((key, prompt, future))
+            self.requests += 1
+            self._condition.notify()
+        return future
+
+    def _dispatch(self) -> None:
+        while True:
+            # 1. wait for a first request, then until the window closes or the batch is full
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                while len(self._pending) < self.max_batch:
+                    remaining = self._opened + self.window - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                pending, self._pending = self._pending, []
+
+            # 2. one submission per parameter set, sent while the next window collects
+            groups: Dict[tuple, List[Tuple[str, Future]]] = {}
+            for key, prompt, future in pending:
+                groups.setdefault(key, []).append((prompt, future))
+            for (parameters, timeout), requests in groups.items():
+                for start in range(0, len(requests), self.max_batch):
+                    self._executor.submit(self._send, dict(parameters), timeout, requests[start:start + self.max_batch])
+
+    def _send(self, parameters: Dict[str, Any], timeout: Optional[float], requests: List[Tuple[str, Future]]) -> None:
+        # prompts sharing a prefix sit next to each other, which helps servers reusing prefixes
+        order = sorted(range(len(requests)), key=lambda idx: requests[idx][0])
+        body = dict(parameters, prompt=[requests[idx][0] for idx in order])
+        if isinstance(body.get("stop"), tuple):
+            body["stop"] = list(body["stop"])
+        try:
+            with span("coalesced_batch", "llm", size=len(requests)):
+                response = get_http_client().post(
+                    f"{self.base_url}/completions",
+                    json=body,
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                    # the pool default otherwise, an expired call does not keep its slot
+                    **({"timeout": timeout} if timeout is not None else {}),
+                )
+                response.raise_for_status()
+            choices = response.json()["choices"]
+        except Exception as error:
+            for _, future in requests:
+                future.set_exception(error)
+            return
+
+        with self._condition:
+            self.batches += 1
+        texts = {choice["index"]: choice["text"] for choice in choices}
+        for position, idx in enumerate(order):
+            future = requests[idx][1]
+            if position in texts:
+                future.set_result(texts[position])
+            else:
+                future.set_exception(RuntimeError(f"The batch answer has no choice {position}"))
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            }
+
+
+_coalescers: Dict[tuple, RequestCoalescer] = {}
+_coalescers_lock = threading.Lock()
+
+
+def get_coalescer(base_url: str, window: float = 0.02, max_batch: int = 64) -> RequestCoalescer:
+    """
+    Returns the coalescer shared by every model sending to {base_url}
+    """
+    key = (base_url, window, max_batch)
+    with _coalescers_lock:
+        if key not in _coalescers:
+            _coalescers[key] = RequestCoalescer(base_url, window, max_batch)
+        return _coalescers[key]
+
+
+class CoalescingChatModel(BaseChatModel):
+    """
+    Chat model for self-hosted OpenAI-compatible servers that sends its calls
+    through a RequestCoalescer instead of one request per call. It answers the
+    same calls as ChatOpenAI, so the agents are unchanged. Set {tokenizer} to the
+    Hugging Face name of the served chat model so its chat template renders the
+    prompts, see render_prompt.
+
+    The completions endpoint answers a batch at once, so a streamed call (the bids
+    read by invoke_integer) is coalesced like any other and yields the whole answer
+    as a single chunk.
+    """
+
+    model_name: str = "gpt-3.5-turbo"
+    temperature: float = 0.2
+    max_tokens: Optional[int] = None
+    base_url: str = "http://127.0.0.1:8001/v1"
+    window: float = 0.02
+    max_batch: int = 64
+    tokenizer: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "coalescing-openai-completions"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "temperature": self.temperature,
+            "base_url": self.base_url,
+            "tokenizer": self.tokenizer,
+        }
+
+    def _complete(self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> str:
+        parameters = {"model": self.model_name, "temperature": kwargs.get("temperature", self.temperature)}
+        max_tokens = kwargs.get("max_tokens", self.max_tokens)
+        if max_tokens is not None:
+            parameters["max_tokens"] = max_tokens
+        stop = list(stop or [])
+        if self.tokenizer is None:
+            # the rendered transcript would otherwise go on with the next human turn
+            stop.append(TRANSCRIPT_STOP)
+        if stop:
+            parameters["stop"] = stop
+
+        coalescer = get_coalescer(self.base_url, self.window, self.max_batch)
+        timeout = kwargs.get("timeout")
+        future = coalescer.submit(render_prompt(messages, self.tokenizer), parameters, timeout)
+        # the call may wait for the window to close before its request is sent
+        return future.result(timeout=None if timeout is None else timeout + self.window)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = self._complete(messages, stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        text = self._complete(messages, stop, **kwargs)
+        if run_manager is not None:
+            run_manager.on_llm_new_token(text)
+        yield ChatGenerationChunk(message=AIMessageChunk(content=text))
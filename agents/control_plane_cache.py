@@ -0,0 +1,184 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import BaseMessage
+
+from agents.chat_model_pool import embed_query
+
+# similarity a prompt needs to reuse the answer of a cached one, per call type;
+# call types missing here (the debate turns, the persona and topic descriptions) are never cached
+DEFAULT_THRESHOLDS: Dict[str, float] = {
+    "bid": 0.97,
+    "choice": 0.97,
+}
+# history messages before the instruction that take part in the match
+DEFAULT_HISTORY_WINDOW = 4
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_scope(call_type: str, model_name: str, messages: List[BaseMessage], speaker: Optional[str] = None) -> tuple:
+    """
+    The answers a call may reuse: those of the same call type, model and {speaker}.
+    Without a {speaker} the system prompt stands for it
+    """
+    if speaker is None:
+        speaker = _digest(messages[0].content) if len(messages) > 1 else ""
+    return call_type, model_name, speaker
+
+
+def cache_text(messages: List[BaseMessage], history_window: int = DEFAULT_HISTORY_WINDOW) -> str:
+    """
+    The part of a prompt that is matched: the {history_window} messages before the
+    instruction (the last message) and the instruction, whitespace-normalized
+    """
+    *context, instruction = messages
+    # the system prompt is part of the scope already
+    history = context[1:] if len(context) > 1 else []
+    recent = history[-history_window:] if history_window > 0 else []
+    return "\n".join(_normalize(message.content) for message in recent + [instruction])
+
+
+class _Index:
+    """
+    Ring buffer of prompt vectors and their answers for a single scope
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.vectors: Optional[np.ndarray] = None
+        self.answers: List[Any] = []
+        self.texts: List[str] = []
+        self.exact: Dict[str, int] = {}
+        self.position = 0
+
+    def add(self, text: str, vector: np.ndarray, answer: Any) -> None:
+        if self.vectors is None:
+            self.vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+        slot = self.position % self.max_entries
+        if slot < len(self.answers):
+            # the oldest entry is overwritten
+            self.exact.pop(self.texts[slot], None)
+            self.answers[slot], self.texts[slot] = answer, text
+        else:
+            self.answers.append(answer)
+            self.texts.append(text)
+        self.vectors[slot] = vector
+        self.exact[text] = slot
+        self.position += 1
+
+    def nearest(self, vector: np.ndarray) -> Tuple[int, float]:
+        scores = self.vectors[:min(self.position, self.max_entries)] @ vector
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+
+class ControlPlaneCache:
+    """
+    Answers of control-plane calls by the meaning of their prompts.
+
+    A call is matched only against the answers of its scope (call type, model and
+    speaker, see cache_scope) on its instruction and its {history_window} latest
+    history messages (see cache_text): by the exact text first, by the nearest
+    neighbour above the {thresholds} of its call type next. A bid asked again over
+    an unchanged recent history (a fork, a rerun of a tournament scenario, a sweep
+    over the stopping probability) is answered locally. Every scope keeps at most
+    {max_entries} answers, oldest first out. A share of {audit_rate} of the hits is
+    asked to the model anyway and compared with the cached answer, see stats().
+    """
+
+    def __init__(
+        self,
+        thresholds: Optional[Dict[str, float]] = None,
+        embedding_function: Optional[Callable[[str], List[float]]] = None,
+        history_window: int = DEFAULT_HISTORY_WINDOW,
+        audit_rate: float = 0.05,
+        max_entries: int = 1024,
+    ) -> None:
+        self.thresholds = dict(DEFAULT_THRESHOLDS if thresholds is None else thresholds)
+        self.embedding_function = embedding_function
+        self.history_window = history_window
+        self.audit_rate = audit_rate
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._indexes: Dict[tuple, _Index] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _embed(self, text: str) -> np.ndarray:
+        if self.embedding_function is None:
+            self.embedding_function = embed_query
+        vector = np.asarray(self.embedding_function(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _count(self, call_type: str, counter: str) -> None:
+        counters = self._counters.setdefault(
+            call_type, {"lookups": 0, "hits": 0, "audits": 0, "audit_matches": 0}
+        )
+        counters[counter] += 1
+
+    def caches(self, call_type: str) -> bool:
+        return call_type in self.thresholds
+
+    def text_of(self, messages: List[BaseMessage]) -> str:
+        return cache_text(messages, self.history_window)
+
+    def lookup(self, scope: tuple, text: str) -> Optional[Tuple[Any, float]]:
+        """
+        Returns the cached answer closest to {text} in {scope} and its similarity, or None
+        """
+        call_type = scope[0]
+        with self._lock:
+            self._count(call_type, "lookups")
+            index = self._indexes.get(scope)
+            if index is None:
+                return None
+            if text in index.exact:
+                self._count(call_type, "hits")
+                return index.answers[index.exact[text]], 1.0
+
+        # embedded outside the lock, the embedding cache serves the store that follows a miss
+        vector = self._embed(text)
+        with self._lock:
+            best, similarity = index.nearest(vector)
+            if similarity < self.thresholds[call_type]:
+                return None
+            self._count(call_type, "hits")
+            return index.answers[best], similarity
+
+    def store(self, scope: tuple, text: str, answer: Any) -> None:
+        if not self.caches(scope[0]):
+            return
+        vector = self._embed(text)
+        with self._lock:
+            self._indexes.setdefault(scope, _Index(self.max_entries)).add(text, vector, answer)
+
+    def record_audit(self, call_type: str, cached: Any, fresh: Any) -> None:
+        """
+        Compares a cached answer with the one the model gave for the same prompt
+        """
+        with self._lock:
+            self._count(call_type, "audits")
+            if cached == fresh:
+                self._count(call_type, "audit_matches")
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                call_type: {
+                    **counters,
+                    "hit_rate": counters["hits"] / counters["lookups"] if counters["lookups"] else 0.0,
+                    "audit_agreement": (
+                        counters["audit_matches"] / counters["audits"] if counters["audits"] else None
+                    ),
+                }
+                for call_type, counters in self._counters.items()
+            }
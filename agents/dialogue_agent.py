@@ -1,79 +1,275 @@
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+from langchain_openai import ChatOpenAI
 from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
+import bisect
+import copy
 import os
-from typing import List
+from typing import List, Optional
 
 from langchain.schema import (
-    HumanMessage,
     SystemMessage,
 )
 
+from agents.episodic_memory import EpisodicMemory
+from agents.forked_history import ForkedHistory
+from agents.model_calls import TURN, invoke_model
+from agents.prompt_layout import PromptLayout
+from agents.spilling_history import SpillingHistory
+from agents.token_counter import count_tokens
+from agents.tracing import span
+from agents.word_limit import max_tokens_for, trim_to_word_limit
+from embedings_vectorstores.vector_store_registry import vector_store_registry
+
 class DialogueAgent:
     def __init__(
         self,
         name: str,
         system_message: SystemMessage,
-        model: ChatOpenAI
+        model: ChatOpenAI,
+        word_limit: Optional[int] = None,
     ) -> None:
         self.name = name
         self.system_message = system_message
         self.model = model
         self.prefix = f"{self.name}: "
+        self.spill_settings: Optional[dict] = None
         self.reset()
         self.persist_directory = "empty"
-        self.vectordb : Chroma
+        self.knowledge_corpus: Optional[str] = None
+        self.knowledge_namespace = self.name
+        self.episodic_memory: Optional[EpisodicMemory] = None
+        self.max_history_tokens: Optional[int] = None
+        # responses are capped to {word_limit} words, see _generation_kwargs and _enforce_word_limit
+        self.word_limit = word_limit
+        self.word_limit_headroom = 1.25
+        self.generations = 0
+        self.overruns = 0
 
     def reset(self):
-        self.message_history = ["Here is the conversation so far."]
+        if getattr(self, "spill_settings", None) is not None:
+            self.message_history = SpillingHistory(**self.spill_settings)
+        else:
+            self.message_history = []
+        # token count of every history entry and their running sums, counted only once
+        # a token budget asks for them, see _count_history_tokens;
+        # token_prefix_sums[i] is the number of tokens of message_history[:i]
+        self.message_tokens: List[int] = []
+        self.token_prefix_sums: List[int] = [0]
+        # first history entry shown in a truncated prompt, see _history_for_prompt
+        self._window_start = 0
+        # history index of every received turn, the turn step is the position in this list
+        self._turn_positions: List[int] = []
+        self._append_history("Here is the conversation so far.")
+        if getattr(self, "episodic_memory", None) is not None:
+            self.episodic_memory.reset()
+
+    def _append_history(self, text: str) -> None:
+        self.message_history.append(text)
+
+    def _count_history_tokens(self) -> None:
+        # the entries appended since the last count, agents without a token budget never count
+        model_name = getattr(self.model, "model_name", "gpt-3.5-turbo")
+        for index in range(len(self.message_tokens), len(self.message_history)):
+            tokens = count_tokens(self.message_history[index], model_name)
+            self.message_tokens.append(tokens)
+            self.token_prefix_sums.append(self.token_prefix_sums[-1] + tokens)
+
+    def history_tokens(self, start: int = 0) -> int:
+        """
+        Number of tokens of message_history[start:], in O(1) once counted
+        """
+        self._count_history_tokens()
+        return self.token_prefix_sums[-1] - self.token_prefix_sums[start]
+
+    def truncation_index(self, budget: int) -> int:
+        """
+        Smallest index such that message_history[index:] fits in {budget} tokens
+        """
+        self._count_history_tokens()
+        return bisect.bisect_left(self.token_prefix_sums, self.token_prefix_sums[-1] - budget)
+
+    def use_bounded_memory(self, hot_tail: int = 200, directory: Optional[str] = None) -> None:
+        """
+        Keeps only the newest {hot_tail} history entries in memory, older ones are
+        spilled to a segment file in {directory} and read back only when needed
+        """
+        self.spill_settings = {"hot_tail": hot_tail, "directory": directory}
+        self.message_history = SpillingHistory(items=self.message_history, **self.spill_settings)
+
+    def fork(self, memo: Optional[dict] = None) -> "DialogueAgent":
+        """
+        Returns a copy of the agent that shares the current history without copying it,
+        both continue independently. {memo} maps the episodic memories forked so far,
+        so that a memory shared by many agents stays shared in the fork
+        """
+        memo = {} if memo is None else memo
+        child = copy.copy(self)
+        child.message_history = ForkedHistory(self.message_history)
+        child.message_tokens = ForkedHistory(self.message_tokens)
+        child.token_prefix_sums = ForkedHistory(self.token_prefix_sums)
+        child._turn_positions = ForkedHistory(self._turn_positions)
+        if self.episodic_memory is not None:
+            if id(self.episodic_memory) not in memo:
+                memo[id(self.episodic_memory)] = self.episodic_memory.fork()
+            child.episodic_memory = memo[id(self.episodic_memory)]
+        return child
+
+    @property
+    def turn_is_replayable(self) -> bool:
+        """
+        Whether a turn generated from the same transcript can stand in for send(),
+        false when send() changes the agent's state (the retrieval appends to the history)
+        """
+        return self.knowledge_corpus is None
+
+    def use_episodic_memory(self, memory: EpisodicMemory) -> None:
+        """
+        Builds prompts from the recent window and the turns recalled from {memory}
+        instead of the whole message history. {memory} may be shared by many agents
+        """
+        self.episodic_memory = memory
+        for step, position in enumerate(self._turn_positions):
+            memory.add(self.message_history[position], step)
+
+    def _generation_kwargs(self) -> dict:
+        if self.word_limit is None:
+            return {}
+        return {"max_tokens": max_tokens_for(self.word_limit, self.word_limit_headroom)}
+
+    def _enforce_word_limit(self, text: str) -> str:
+        """
+        Trims a generated {text} to the word limit at a sentence boundary, counting the overruns
+        """
+        if self.word_limit is None:
+            return text
+        text, overran = trim_to_word_limit(text, self.word_limit)
+        self.record_generation(overran)
+        return text
+
+    def record_generation(self, overran: bool) -> None:
+        """
+        Counts a turn of this agent towards its word limit stats, also one
+        replayed from the response cache of a fork, see DialogueSimulator.fork
+        """
+        if self.word_limit is None:
+            return
+        self.generations += 1
+        if overran:
+            self.overruns += 1
+
+    @property
+    def overrun_rate(self) -> float:
+        return self.overruns / self.generations if self.generations else 0.0
+
+    @property
+    def prompt_layout(self) -> PromptLayout:
+        return PromptLayout(self.system_message)
+
+    def _history_for_prompt(self) -> List[str]:
+        """
+        Returns the part of the message history that goes into the prompt
+        """
+        memory = self.episodic_memory
+        # a truncated window starts at the same turn for as many calls as possible and then
+        # jumps ahead by a quarter of its size, so the prompt prefix stays byte-stable in between
+        if memory is None and self.max_history_tokens is not None:
+            # keep the header and the newest turns that fit in the budget
+            self._count_history_tokens()
+            budget = self.max_history_tokens - self.message_tokens[0]
+            if self.history_tokens(max(self._window_start, 1)) > budget:
+                self._window_start = self.truncation_index(int(budget * 0.75))
+            return [self.message_history[0]] + self.message_history[max(self._window_start, 1):]
+        if memory is None and self.spill_settings is not None:
+            # a bounded history never loads its spilled turns into the prompt
+            hot_tail = self.spill_settings["hot_tail"]
+            if len(self.message_history) <= hot_tail:
+                return list(self.message_history)
+            if len(self.message_history) - self._window_start > hot_tail:
+                self._window_start = len(self.message_history) - (hot_tail * 3) // 4
+            return [self.message_history[0]] + self.message_history[self._window_start:]
+        if memory is None or len(self.message_history) <= memory.recent_window + 1:
+            return list(self.message_history)
+
+        # the recent window holds between one and two windows of turns,
+        # the recalled turns go after it, see _recalled_for_prompt
+        if len(self.message_history) - max(self._window_start, 1) > 2 * memory.recent_window:
+            self._window_start = len(self.message_history) - memory.recent_window
+        return [self.message_history[0]] + self.message_history[max(self._window_start, 1):]
+
+    def _recalled_for_prompt(self) -> List[str]:
+        """
+        Returns the earlier turns recalled from the episodic memory, placed after the
+        stable history in the prompt since they change from call to call
+        """
+        memory = self.episodic_memory
+        if memory is None or len(self.message_history) <= memory.recent_window + 1:
+            return []
+        # the turns before the first one of the window, whatever else the history holds
+        first_step = bisect.bisect_left(self._turn_positions, max(self._window_start, 1))
+        return memory.retrieve(self.message_history[-1], before_step=first_step)
+
+    @property
+    def vectordb(self):
+        if self.knowledge_corpus is None:
+            return None
+        return vector_store_registry.get_or_create(self.knowledge_corpus)
 
     def _apply_vector_store_to_message_history(self):
         """
         Applies the chatmodel to the message history
         and returns the message string
         """
-        if self.persist_directory != "empty":
+        if self.knowledge_corpus is not None:
             # TODO : infer the question from message_history, because I want to reflect on current documents
             question = "is there an email i can ask for help"
-            docs = self.vectordb.similarity_search(question, k=3) # k=3 numbers of documents that we wanna return
-            self.vectordb.persist()
+            with span("retrieval", "retrieval", agent=self.name, corpus=self.knowledge_corpus):
+                docs = vector_store_registry.search(
+                    self.knowledge_corpus, question, k=3, namespace=self.knowledge_namespace
+                ) # k=3 numbers of documents that we wanna return
             # Append the content of the first document as the last message in message_history
-            self.message_history.append(docs[0].page_content)
+            if docs:
+                self._append_history(docs[0].page_content)
 
     def send(self) -> str:
         self._apply_vector_store_to_message_history()
-        message = self.model(
-            [
-                self.system_message,
-                HumanMessage(content="\n".join(self.message_history + [self.prefix])),
-            ]
+        message = invoke_model(
+            self.model,
+            self.prompt_layout.messages(self._history_for_prompt(), self.prefix, self._recalled_for_prompt()),
+            call_type=TURN,
+            **self._generation_kwargs(),
         )
-        return message.content
-    
+        return self._enforce_word_limit(message.content)
+
     def receive(self, name: str, message: str) -> None:
         """
         Concatenates {message} spoken by {name} into message history
         """
-        self.message_history.append(f"{name}: {message}")
+        self._append_history(f"{name}: {message}")
+        self._turn_positions.append(len(self.message_history) - 1)
+        if self.episodic_memory is not None:
+            self.episodic_memory.add(self.message_history[-1], len(self._turn_positions) - 1)
 
-    def create_vector_store(self, loaders: List[PyPDFLoader]):
-        docs = []
-        for loader in loaders:
-            docs.extend(loader.load())
+    def attach_knowledge_store(self, corpus_name: str, namespace: Optional[str] = None, **kwargs) -> None:
+        """
+        Shares the {corpus_name} store of the process-wide registry with this agent.
+        Extra kwargs (loaders, persist_directory) are used only if the corpus is not loaded yet
+        """
+        vector_store_registry.get_or_create(corpus_name, **kwargs)
+        self.knowledge_corpus = corpus_name
+        if namespace is not None:
+            self.knowledge_namespace = namespace
 
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1500,
-            chunk_overlap=150
-        )
-        splits = text_splitter.split_documents(docs)
-
-        embedding = OpenAIEmbeddings()
-        
-        self.vectordb = Chroma.from_documents(
-            documents=splits,
-            embedding=embedding, # Assuming 'embedding' is an attribute of DialogueAgent
-            persist_directory=self.persist_directory
+    def add_private_documents(self, documents: List[Document]) -> None:
+        """
+        Adds {documents} to the attached corpus, visible only to this agent's namespace
+        """
+        vector_store_registry.add_private_documents(
+            self.knowledge_corpus, self.knowledge_namespace, documents
         )
 
-        self.vectordb.persist()
\ No newline at end of file
+    def create_vector_store(self, loaders: List[PyPDFLoader]):
+        self.attach_knowledge_store(
+            self.persist_directory,
+            loaders=loaders,
+            persist_directory=self.persist_directory,
+        )
@@ -1,5 +1,9 @@
+from typing import Optional, Tuple
+
 from langchain_openai import ChatOpenAI
 from agents.dialogue_agent import DialogueAgent
+from agents.model_calls import BID, invoke_integer
+from agents.prompt_layout import split_template
 
 from langchain.schema import SystemMessage
 from langchain.prompts import PromptTemplate
@@ -11,20 +15,32 @@ class BiddingDialogueAgent(DialogueAgent):
         system_message: SystemMessage,
         bidding_template: PromptTemplate,
         model: ChatOpenAI,
+        bid_range: Tuple[int, int] = (1, 10),
+        word_limit: Optional[int] = None,
     ) -> None:
-        super().__init__(name, system_message, model)
+        super().__init__(name, system_message, model, word_limit)
         self.bidding_template = bidding_template
+        self.bid_range = bid_range
+        # the part before the history is the persona header, the rest is the per-call instruction
+        bidding_header, bidding_instruction = split_template(self.bidding_template)
+        # most headers repeat the persona of the system prompt
+        if bidding_header.strip() in system_message.content:
+            bidding_header = ""
+        self.bidding_prompt = PromptTemplate(
+            input_variables=["recent_message"],
+            template=bidding_header + bidding_instruction,
+        )
 
-    def bid(self) -> str:
+    def bid(self) -> int:
         """
         Asks the chat model to output a bid to speak
         """
-        prompt = PromptTemplate(
-            input_variables=["message_history", "recent_message"],
-            template=self.bidding_template,
-        ).format(
-            message_history="\n".join(self.message_history),
-            recent_message=self.message_history[-1],
+        # the bid is laid out like a turn, only the instruction after the history differs,
+        # so both share the system prompt and the history message
+        messages = self.prompt_layout.messages(
+            self._history_for_prompt(),
+            self.bidding_prompt.format(recent_message=self.message_history[-1]),
+            self._recalled_for_prompt(),
         )
-        bid_string = self.model([SystemMessage(content=prompt)]).content
-        return bid_string
\ No newline at end of file
+        low, high = self.bid_range
+        return invoke_integer(self.model, messages, BID, low, high, speaker=self.name)
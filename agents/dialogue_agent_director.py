@@ -1,18 +1,20 @@
 import random
-from typing import List
+from typing import List, Optional
 
 import tenacity
 from langchain.prompts import (
     PromptTemplate,
 )
 from langchain.schema import (
-    HumanMessage,
     SystemMessage,
 )
 from langchain_openai import ChatOpenAI
 
 from agents.dialogue_agent import DialogueAgent
+from agents.event_sinks import NEXT_SPEAKER, STOP_DECISION, emit
+from agents.tracing import span
 from agents.integer_output_parser import IntegerOutputParser
+from agents.model_calls import CHOICE, TURN, invoke_integer, invoke_model
 
 class DirectorDialogueAgent(DialogueAgent):
     def __init__(
@@ -22,8 +24,9 @@ class DirectorDialogueAgent(DialogueAgent):
         model: ChatOpenAI,
         speakers: List[DialogueAgent],
         stopping_probability: float,
+        word_limit: Optional[int] = None,
     ) -> None:
-        super().__init__(name, system_message, model)
+        super().__init__(name, system_message, model, word_limit)
         self.speakers = speakers
         self.next_speaker = ""
 
@@ -32,12 +35,13 @@ class DirectorDialogueAgent(DialogueAgent):
         self.termination_clause = "Finish the conversation by stating a concluding message and thanking everyone."
         self.continuation_clause = "Do not end the conversation. Keep the conversation going by adding your own ideas."
 
+        # the templates hold only the per-call instructions, the history goes before them
+        # in the prompt layout so the three calls of a turn share one cached prefix
+
         # 1. have a prompt for generating a response to the previous speaker
         self.response_prompt_template = PromptTemplate(
-            input_variables=["message_history", "termination_clause"],
-            template=f"""{{message_history}}
-
-Follow up with an insightful comment.
+            input_variables=["termination_clause"],
+            template=f"""Follow up with an insightful comment.
 {{termination_clause}}
 {self.prefix}
         """,
@@ -48,8 +52,8 @@ Follow up with an insightful comment.
             regex=r"<(\d+)>", output_keys=["choice"], default_output_key="choice"
         )
         self.choose_next_speaker_prompt_template = PromptTemplate(
-            input_variables=["message_history", "speaker_names"],
-            template=f"""{{message_history}}
+            input_variables=["response", "speaker_names"],
+            template=f"""{self.prefix}{{response}}
 
 Given the above conversation, select the next speaker by choosing index next to their name: 
 {{speaker_names}}
@@ -62,8 +66,8 @@ Do nothing else.
 
         # 3. have a prompt for prompting the next speaker to speak
         self.prompt_next_speaker_prompt_template = PromptTemplate(
-            input_variables=["message_history", "next_speaker"],
-            template=f"""{{message_history}}
+            input_variables=["response", "next_speaker"],
+            template=f"""{self.prefix}{{response}}
 
 The next speaker is {{next_speaker}}. 
 Prompt the next speaker to speak with an insightful question.
@@ -71,57 +75,72 @@ Prompt the next speaker to speak with an insightful question.
         """,
         )
 
+    def reset(self):
+        super().reset()
+        self.force_stop = False
+
+    def request_termination(self):
+        """
+        Makes the next response end the conversation regardless of the coin flip
+        """
+        self.force_stop = True
+
     def _generate_response(self):
         # if self.stop = True, then we will inject the prompt with a termination clause
         sample = random.uniform(0, 1)
-        self.stop = sample < self.stopping_probability
+        self.stop = self.force_stop or sample < self.stopping_probability
 
-        print(f"\tStop? {self.stop}\n")
+        emit(STOP_DECISION, director=self.name, stop=self.stop)
 
         response_prompt = self.response_prompt_template.format(
-            message_history="\n".join(self.message_history),
             termination_clause=self.termination_clause if self.stop else "",
         )
 
-        self.response = self.model(
-            [
-                self.system_message,
-                HumanMessage(content=response_prompt),
-            ]
+        self.response = invoke_model(
+            self.model,
+            self.prompt_layout.messages(self._history, response_prompt, self._recalled),
+            call_type=TURN,
+            **self._generation_kwargs(),
         ).content
+        self.response = self._enforce_word_limit(self.response)
 
         return self.response
 
     @tenacity.retry(
         stop=tenacity.stop_after_attempt(2),
         wait=tenacity.wait_none(),  # No waiting time between retries
-        retry=tenacity.retry_if_exception_type(ValueError),
+        retry=tenacity.retry_if_exception_type((ValueError, TimeoutError)),  # a stuck call is retried once too
         before_sleep=lambda retry_state: print(
-            f"ValueError occurred: {retry_state.outcome.exception()}, retrying..."
+            f"{type(retry_state.outcome.exception()).__name__} occurred: {retry_state.outcome.exception()}, retrying..."
         ),
         retry_error_callback=lambda retry_state: 0,
     )  # Default value when all retries are exhausted
-    def _choose_next_speaker(self) -> str:
+    def _choose_next_speaker(self) -> int:
         speaker_names = "\n".join(
             [f"{idx}: {name}" for idx, name in enumerate(self.speakers)]
         )
         choice_prompt = self.choose_next_speaker_prompt_template.format(
-            message_history="\n".join(
-                self.message_history + [self.prefix] + [self.response]
-            ),
+            response=self.response,
             speaker_names=speaker_names,
         )
 
-        choice_string = self.model(
-            [
-                self.system_message,
-                HumanMessage(content=choice_prompt),
-            ]
-        ).content
-        choice = int(self.choice_parser.parse(choice_string)["choice"])
+        # the index is decoded as a bare integer and validated against the speakers
+        choice = invoke_integer(
+            self.model,
+            self.prompt_layout.messages(self._history, choice_prompt, self._recalled),
+            CHOICE,
+            0,
+            len(self.speakers) - 1,
+            speaker=self.name,
+        )
 
         return choice
 
+    @property
+    def turn_is_replayable(self) -> bool:
+        # a turn draws the stop decision and picks the next speaker, every branch draws its own
+        return False
+
     def select_next_speaker(self):
         return self.chosen_speaker_id
 
@@ -131,30 +150,35 @@ Prompt the next speaker to speak with an insightful question.
         Applies the chatmodel to the message history
         and returns the message string
         """
+        # the three calls of the turn see the same history
+        self._history = self._history_for_prompt()
+        self._recalled = self._recalled_for_prompt()
+
         # 1. generate and save response to the previous speaker
-        self.response = self._generate_response()
+        with span("director.response", agent=self.name):
+            self.response = self._generate_response()
 
         if self.stop:
             message = self.response
         else:
             # 2. decide who to speak next
-            self.chosen_speaker_id = self._choose_next_speaker()
+            with span("director.choice", agent=self.name):
+                self.chosen_speaker_id = self._choose_next_speaker()
             self.next_speaker = self.speakers[self.chosen_speaker_id]
-            print(f"\tNext speaker: {self.next_speaker}\n")
+            emit(NEXT_SPEAKER, director=self.name, next_speaker=self.next_speaker)
 
             # 3. prompt the next speaker to speak
             next_prompt = self.prompt_next_speaker_prompt_template.format(
-                message_history="\n".join(
-                    self.message_history + [self.prefix] + [self.response]
-                ),
+                response=self.response,
                 next_speaker=self.next_speaker,
             )
-            message = self.model(
-                [
-                    self.system_message,
-                    HumanMessage(content=next_prompt),
-                ]
-            ).content
-            message = " ".join([self.response, message])
+            with span("director.prompt_next", agent=self.name):
+                message = invoke_model(
+                    self.model,
+                    self.prompt_layout.messages(self._history, next_prompt, self._recalled),
+                    call_type=TURN,
+                    **self._generation_kwargs(),
+                ).content
+            message = " ".join([self.response, self._enforce_word_limit(message)])
 
         return message
\ No newline at end of file
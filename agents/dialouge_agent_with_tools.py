@@ -1,5 +1,6 @@
-from typing import Callable, List
+from typing import Callable, List, Optional
 from langchain.agents import AgentType, initialize_agent, load_tools
+from langchain.callbacks.base import BaseCallbackHandler
 from langchain.memory import ConversationBufferMemory
 from langchain.schema import (
     AIMessage,
@@ -8,6 +9,36 @@ from langchain.schema import (
 from langchain_openai import ChatOpenAI
 
 from agents.dialogue_agent import DialogueAgent
+from agents.model_calls import TURN, run_call
+from agents.tracing import get_tracer
+
+
+class ToolSpanHandler(BaseCallbackHandler):
+    """
+    Records every tool invocation of the agent chain as a span
+    """
+
+    def __init__(self) -> None:
+        self._spans = {}
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs) -> None:
+        tracer = get_tracer()
+        if tracer is not None:
+            self._spans[run_id] = tracer.start_span(
+                f"tool.{(serialized or {}).get('name', 'tool')}", "tool", query=input_str
+            )
+
+    def _finish(self, run_id) -> None:
+        tracer = get_tracer()
+        tool_span = self._spans.pop(run_id, None)
+        if tracer is not None and tool_span is not None:
+            tracer.finish(tool_span)
+
+    def on_tool_end(self, output, *, run_id, **kwargs) -> None:
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs) -> None:
+        self._finish(run_id)
 
 
 class DialogueAgentWithTools(DialogueAgent):
@@ -17,10 +48,12 @@ class DialogueAgentWithTools(DialogueAgent):
         system_message: SystemMessage,
         model: ChatOpenAI,
         tool_names: List[str],
+        word_limit: Optional[int] = None,
         **tool_kwargs,
     ) -> None:
-        super().__init__(name, system_message, model)
+        super().__init__(name, system_message, model, word_limit)
         self.tools = load_tools(tool_names, **tool_kwargs)
+        self.tool_span_handler = ToolSpanHandler()
 
     def send(self) -> str:
         """
@@ -37,11 +70,18 @@ class DialogueAgentWithTools(DialogueAgent):
             ),
         )
         message = AIMessage(
-            content=agent_chain.run(
+            content=run_call(
+                TURN,
+                agent_chain.run,
                 input="\n".join(
-                    [self.system_message.content] + self.message_history + [self.prefix]
-                )
+                    [self.system_message.content]
+                    + self._history_for_prompt()
+                    + self._recalled_for_prompt()
+                    + [self.prefix]
+                ),
+                callbacks=[self.tool_span_handler],
             )
         )
 
-        return message.content
\ No newline at end of file
+        # the agent chain makes several calls, so the limit is only enforced on its answer
+        return self._enforce_word_limit(message.content)
@@ -0,0 +1,217 @@
+import bisect
+import os
+import tempfile
+import threading
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+
+from agents.chat_model_pool import embed_query
+from agents.forked_history import ForkedHistory
+from agents.spilling_history import SpillingHistory, memory_budget
+
+
+class SpillingVectors:
+    """
+    Append-only matrix of float32 rows of {dimensions} values. With {hot_tail}
+    set, only the newest rows stay in memory, between {hot_tail} and twice as
+    many; older ones are written to a segment file and read back in chunks when
+    scored. A fork reads the first {base_length} rows from {base} and keeps its own.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        hot_tail: Optional[int] = None,
+        directory: Optional[str] = None,
+        base: Optional["SpillingVectors"] = None,
+        base_length: int = 0,
+    ) -> None:
+        self.dimensions = dimensions
+        self.hot_tail = hot_tail
+        self.directory = directory
+        self._base = base
+        self._base_length = base_length
+        self._segment = None
+        self._spilled = 0
+        self._hot = np.zeros((16, dimensions), dtype=np.float32)
+        self._hot_size = 0
+        self._lock = threading.Lock()
+        if hot_tail is not None:
+            memory_budget.register(self)
+
+    def __len__(self) -> int:
+        return self._base_length + self._spilled + self._hot_size
+
+    def append(self, vector: np.ndarray) -> None:
+        with self._lock:
+            if self._hot_size == self._hot.shape[0]:
+                # grow geometrically so appends stay amortized O(1)
+                self._hot = np.concatenate([self._hot, np.zeros_like(self._hot)])
+            self._hot[self._hot_size] = vector
+            self._hot_size += 1
+            # spilled in batches, the hot rows are moved once per {hot_tail} appends
+            if self.hot_tail is not None and self._hot_size >= 2 * max(self.hot_tail, 1):
+                self._spill(self._hot_size - self.hot_tail)
+
+    def shrink(self, hot_tail: int) -> None:
+        """
+        Spills everything but the newest {hot_tail} rows
+        """
+        with self._lock:
+            if self._hot_size > hot_tail:
+                self._spill(self._hot_size - hot_tail)
+                self._hot = self._hot[:max(2 * hot_tail, 16)].copy()
+
+    def _spill(self, count: int) -> None:
+        if self._segment is None:
+            self._segment = tempfile.TemporaryFile(dir=self.directory)
+        self._segment.seek(0, os.SEEK_END)
+        self._segment.write(self._hot[:count].tobytes())
+        self._hot[:self._hot_size - count] = self._hot[count:self._hot_size]
+        self._spilled += count
+        self._hot_size -= count
+
+    def _read_own(self, start: int, stop: int) -> np.ndarray:
+        # rows only move from the hot rows to the segment, so each read finds them where they are now
+        with self._lock:
+            if start < self._spilled:
+                stop = min(stop, self._spilled)
+                row_bytes = self.dimensions * 4
+                self._segment.seek(start * row_bytes)
+                data = self._segment.read((stop - start) * row_bytes)
+                return np.frombuffer(data, dtype=np.float32).reshape(stop - start, self.dimensions)
+            rows = self._hot[start - self._spilled:stop - self._spilled]
+            return rows if self.hot_tail is None else rows.copy()
+
+    def chunks(self, start: int, stop: int, chunk_rows: int = 4096) -> Iterator[np.ndarray]:
+        """
+        Yields the rows [{start}, {stop}) in order, at most {chunk_rows} at a time
+        """
+        if start < self._base_length:
+            yield from self._base.chunks(start, min(stop, self._base_length), chunk_rows)
+            start = self._base_length
+        while start < stop:
+            rows = self._read_own(start - self._base_length, min(stop, start + chunk_rows) - self._base_length)
+            yield rows
+            start += len(rows)
+
+    def scores(self, query: np.ndarray, stop: int) -> np.ndarray:
+        """
+        Dot products of {query} with the rows before {stop}
+        """
+        scores = [rows @ query for rows in self.chunks(0, stop)]
+        return np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+
+    def row(self, index: int) -> np.ndarray:
+        return next(self.chunks(index, index + 1))[0]
+
+    def fork(self, length: int) -> "SpillingVectors":
+        """
+        Returns a matrix holding the first {length} rows of this one without copying them
+        """
+        return SpillingVectors(self.dimensions, self.hot_tail, self.directory, base=self, base_length=length)
+
+    def close(self) -> None:
+        if self._segment is not None:
+            self._segment.close()
+
+
+class EpisodicMemory:
+    """
+    Incremental embedding index over the turns of a conversation.
+
+    Every received turn is embedded once and appended to the index, so
+    building a prompt never re-indexes the history. Every turn is kept with
+    its step, the number of turns received before it. A memory can belong
+    to a single agent or be shared by all of them; in the latter case
+    a broadcast message is stored once per step. With {hot_tail} set, the
+    texts and the vectors of the older turns are spilled to disk.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Optional[Callable[[str], List[float]]] = None,
+        recent_window: int = 10,
+        k: int = 4,
+        hot_tail: Optional[int] = None,
+    ) -> None:
+        self.embedding_function = embedding_function
+        self.recent_window = recent_window
+        self.k = k
+        # with {hot_tail} set, older texts and vectors are spilled to disk and read back when recalled
+        self.hot_tail = hot_tail
+        self.reset()
+
+    def reset(self) -> None:
+        self._texts = [] if self.hot_tail is None else SpillingHistory(self.hot_tail)
+        self._vectors: Optional[SpillingVectors] = None
+        self._steps: List[int] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def fork(self) -> "EpisodicMemory":
+        """
+        Returns a memory holding the same turns that shares the texts and
+        vectors with this one, both continue independently
+        """
+        child = EpisodicMemory(self.embedding_function, self.recent_window, self.k, self.hot_tail)
+        child._texts = ForkedHistory(self._texts, self._size)
+        child._steps = ForkedHistory(self._steps, self._size)
+        child._vectors = self._vectors.fork(self._size) if self._vectors is not None else None
+        child._size = self._size
+        return child
+
+    def _embed(self, text: str) -> np.ndarray:
+        if self.embedding_function is None:
+            self.embedding_function = embed_query
+        vector = np.asarray(self.embedding_function(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, text: str, step: Optional[int] = None) -> None:
+        """
+        Indexes {text} received at {step}, by default the step after the last one
+        """
+        if step is None:
+            step = self._steps[-1] + 1 if self._size else 0
+        # a shared memory gets the same broadcast once from every agent
+        if self._size and step <= self._steps[-1]:
+            return
+
+        vector = self._embed(text)
+        if self._vectors is None:
+            self._vectors = SpillingVectors(vector.shape[0], self.hot_tail)
+        self._vectors.append(vector)
+        self._texts.append(text)
+        self._steps.append(step)
+        self._size += 1
+
+    def retrieve(self, query: str, k: Optional[int] = None, before_step: Optional[int] = None) -> List[str]:
+        """
+        Returns up to {k} turns received before {before_step} (the first turn of the
+        caller's prompt window) that are the most relevant to {query}, in chronological
+        order. Without {before_step} the newest {recent_window} turns are left out
+        """
+        k = self.k if k is None else k
+        if before_step is None:
+            candidates = self._size - self.recent_window
+        else:
+            candidates = bisect.bisect_left(self._steps, before_step)
+        if candidates <= 0 or k <= 0:
+            return []
+
+        # the query is usually the last turn which is already embedded
+        if self._texts[-1] == query:
+            query_vector = self._vectors.row(self._size - 1)
+        else:
+            query_vector = self._embed(query)
+
+        scores = self._vectors.scores(query_vector, candidates)
+        if candidates > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(candidates)
+        return [self._texts[idx] for idx in sorted(top)]
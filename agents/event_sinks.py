@@ -0,0 +1,252 @@
+import atexit
+import contextlib
+import json
+import queue
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+
+MESSAGE = "message"
+BIDS = "bids"
+STOP_DECISION = "stop_decision"
+NEXT_SPEAKER = "next_speaker"
+RUN_STARTED = "run_started"
+RUN_FINISHED = "run_finished"
+
+_COLORS = ['\033[31m', '\033[32m', '\033[33m', '\033[34m', '\033[35m', '\033[36m']
+_RESET = '\033[0m'
+
+
+class EventSink:
+    """
+    Receives the structured events of a simulation; every event is a dict
+    with a "type", a "time" and the fields of that type
+    """
+
+    def emit(self, event: dict) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class ConsoleSink(EventSink):
+    """
+    Renders the events for a human, every speaker gets a color the first time they speak
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, colors: bool = True) -> None:
+        self.stream = stream
+        self.colors = colors
+        self._speaker_colors: Dict[str, str] = {}
+        self._buffer: List[str] = []
+
+    def _color(self, speaker: str) -> str:
+        if not self.colors:
+            return ""
+        if speaker not in self._speaker_colors:
+            self._speaker_colors[speaker] = _COLORS[len(self._speaker_colors) % len(_COLORS)]
+        return self._speaker_colors[speaker]
+
+    def render(self, event: dict) -> str:
+        if event["type"] == MESSAGE:
+            color = self._color(event["speaker"])
+            return f"{color}({event['speaker']}): {event['message']}{_RESET if color else ''}\n\n\n"
+        if event["type"] == BIDS:
+            lines = ["Bids:"] + [f"\t{name} bid: {bid}" for name, bid in event["bids"].items()]
+            lines.append(f"Selected: {event['selected']}")
+            return "\n".join(lines) + "\n\n\n"
+        if event["type"] == STOP_DECISION:
+            return f"\tStop? {event['stop']}\n\n"
+        if event["type"] == NEXT_SPEAKER:
+            return f"\tNext speaker: {event['next_speaker']}\n\n"
+        if event["type"] in (RUN_STARTED, RUN_FINISHED):
+            return ""
+        fields = {key: value for key, value in event.items() if key not in ("type", "time")}
+        return f"[{event['type']}] {json.dumps(fields, default=str)}\n"
+
+    def emit(self, event: dict) -> None:
+        self._buffer.append(self.render(event))
+
+    def flush(self) -> None:
+        if self._buffer:
+            stream = self.stream or sys.stdout
+            stream.write("".join(self._buffer))
+            stream.flush()
+            self._buffer = []
+
+
+class JsonlFileSink(EventSink):
+    """
+    Appends every event as a JSON line to {path}
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._buffer: List[str] = []
+
+    def emit(self, event: dict) -> None:
+        self._buffer.append(json.dumps(event, default=str) + "\n")
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            self._buffer = []
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+
+class InMemorySink(EventSink):
+    """
+    Keeps the events in a list, for analysis right after a run
+    """
+
+    def __init__(self) -> None:
+        self.events: List[dict] = []
+        self._lock = threading.Lock()
+
+    def emit(self, event: dict) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def of_type(self, event_type: str) -> List[dict]:
+        with self._lock:
+            return [event for event in self.events if event["type"] == event_type]
+
+
+class BackgroundEventWriter(EventSink):
+    """
+    Hands the events over to {sinks} on a writer thread, so emitting never
+    waits for the console or the disk. The writer drains up to {batch_size}
+    queued events at a time and flushes the sinks once per batch.
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, sinks: List[EventSink], batch_size: int = 256) -> None:
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._flushed = threading.Condition()
+        self._emitted = 0
+        self._written = 0
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, event: dict) -> None:
+        with self._flushed:
+            self._emitted += 1
+        self._queue.put(event)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            closing = any(event is self._CLOSE for event in batch)
+            events = [event for event in batch if event is not self._CLOSE]
+            for sink in self.sinks:
+                try:
+                    for event in events:
+                        sink.emit(event)
+                    sink.flush()
+                except Exception as error:
+                    print(f"Event sink {type(sink).__name__} failed: {error}")
+
+            with self._flushed:
+                self._written += len(events)
+                self._flushed.notify_all()
+            if closing:
+                return
+
+    def flush(self) -> None:
+        """
+        Blocks until every event emitted so far has been written
+        """
+        with self._flushed:
+            emitted = self._emitted
+            self._flushed.wait_for(lambda: self._written >= emitted or not self._thread.is_alive())
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(self._CLOSE)
+            self._thread.join()
+        for sink in self.sinks:
+            sink.close()
+
+
+_event_sink: Optional[EventSink] = None
+_lock = threading.Lock()
+_held = threading.local()
+
+
+def install_event_sink(sink: EventSink) -> EventSink:
+    """
+    Sends every simulation event to {sink}; the previous sink is closed
+    """
+    global _event_sink
+    with _lock:
+        previous, _event_sink = _event_sink, sink
+    if previous is not None:
+        previous.close()
+    return sink
+
+
+def get_event_sink() -> EventSink:
+    """
+    The installed sink, by default the console behind a background writer
+    """
+    global _event_sink
+    with _lock:
+        if _event_sink is None:
+            _event_sink = BackgroundEventWriter([ConsoleSink()])
+        return _event_sink
+
+
+def emit(event_type: str, **fields) -> None:
+    event = {"type": event_type, "time": time.time(), **fields}
+    held = getattr(_held, "events", None)
+    if held is not None:
+        held.append(event)
+        return
+    get_event_sink().emit(event)
+
+
+@contextlib.contextmanager
+def hold_events():
+    """
+    Keeps the events emitted by this thread in the yielded list instead of
+    sending them, so work running ahead on a helper thread can have its events
+    released later by the thread owning the transcript, in step order
+    """
+    previous, _held.events = getattr(_held, "events", None), []
+    try:
+        yield _held.events
+    finally:
+        _held.events = previous
+
+
+def release_events(events: List[dict]) -> None:
+    """
+    Sends {events} held by hold_events() to the installed sink
+    """
+    for event in events:
+        emit(event["type"], **{key: value for key, value in event.items() if key != "type"})
+
+
+@atexit.register
+def _close_event_sink() -> None:
+    if _event_sink is not None:
+        _event_sink.close()
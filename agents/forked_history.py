@@ -0,0 +1,49 @@
+from collections.abc import Sequence
+from typing import List
+
+
+class ForkedHistory(Sequence):
+    """
+    Copy-on-write view of an append-only list. The first {length} entries are
+    read from {base}, which is never copied nor written to; appends go to a
+    tail owned by the fork. The base may keep growing, the view stays frozen.
+    """
+
+    def __init__(self, base: Sequence, length: int = None) -> None:
+        self.base = base
+        self.length = len(base) if length is None else length
+        self.tail: List = []
+
+    def __len__(self) -> int:
+        return self.length + len(self.tail)
+
+    def append(self, item) -> None:
+        self.tail.append(item)
+
+    def extend(self, items) -> None:
+        self.tail.extend(items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[idx] for idx in range(start, stop, step)]
+            items = list(self.base[start:min(stop, self.length)]) if start < self.length else []
+            items.extend(self.tail[max(start - self.length, 0):max(stop - self.length, 0)])
+            return items
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index < self.length:
+            return self.base[index]
+        return self.tail[index - self.length]
+
+    def __iter__(self):
+        # the base is read in slices, a spilled base never loads at once
+        for start in range(0, self.length, 256):
+            yield from self.base[start:min(start + 256, self.length)]
+        yield from self.tail
+
+    def __add__(self, other) -> List:
+        return list(self) + list(other)
@@ -0,0 +1,195 @@
+import bisect
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# priority classes, lower is served first
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# upper bounds (in seconds) of the queue-wait histogram buckets
+WAIT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+# (simulation id, priority, absolute deadline) of the calls made by the current task
+_call_context: contextvars.ContextVar = contextvars.ContextVar(
+    "llm_call_context", default=("default", BATCH, None)
+)
+
+
+@contextlib.contextmanager
+def simulation_context(simulation_id: str, priority: int = BATCH, deadline_seconds: Optional[float] = None):
+    """
+    Tags every LLM call made inside the block with {simulation_id} and {priority}.
+    Calls still queued {deadline_seconds} after they were made are dropped
+    """
+    token = _call_context.set((simulation_id, priority, deadline_seconds))
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def propagate_context(function: Callable) -> Callable:
+    """
+    Wraps {function} so that it runs with the caller's simulation context on another thread
+    """
+    return functools.partial(contextvars.copy_context().run, function)
+
+
+class AdmissionRejected(Exception):
+    pass
+
+
+class _QueuedCall:
+    __slots__ = ("future", "function", "context", "enqueued_at", "deadline", "priority")
+
+    def __init__(self, function, context, priority, deadline) -> None:
+        self.future: Future = Future()
+        self.function = function
+        self.context = context
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+
+
+class LLMCallScheduler:
+    """
+    Central queue for every LLM call of the process.
+
+    Calls are grouped by priority class and, within a class, by simulation.
+    Simulations are served round-robin, so a long debate with many queued
+    calls cannot starve a short one. Interactive calls go first, but every
+    {batch_share}-th dispatch is given to batch work so it keeps progressing.
+    A simulation can have at most {max_queued_per_simulation} waiting calls,
+    further ones are rejected at admission.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_queued_per_simulation: int = 64,
+        batch_share: int = 10,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queued_per_simulation = max_queued_per_simulation
+        self.batch_share = batch_share
+        self._condition = threading.Condition()
+        self._queues: Dict[int, "OrderedDict[str, Deque[_QueuedCall]]"] = {
+            INTERACTIVE: OrderedDict(),
+            BATCH: OrderedDict(),
+        }
+        self._dispatched = 0
+        self._wait_counts: Dict[int, List[int]] = {
+            priority: [0] * len(WAIT_BUCKETS) for priority in self._queues
+        }
+        self._workers = [
+            threading.Thread(target=self._work, name=f"llm-call-{idx}", daemon=True)
+            for idx in range(max_concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, function: Callable, *args, **kwargs) -> Future:
+        """
+        Queues {function} under the simulation context of the caller
+        """
+        simulation_id, priority, deadline_seconds = _call_context.get()
+        deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+        call = _QueuedCall(
+            functools.partial(function, *args, **kwargs),
+            contextvars.copy_context(),
+            priority,
+            deadline,
+        )
+        with self._condition:
+            queue = self._queues[priority].setdefault(simulation_id, deque())
+            if len(queue) >= self.max_queued_per_simulation:
+                raise AdmissionRejected(
+                    f"Simulation '{simulation_id}' has {len(queue)} calls waiting already"
+                )
+            queue.append(call)
+            self._condition.notify()
+        return call.future
+
+    def _pick_priority(self) -> Optional[int]:
+        waiting = [priority for priority in sorted(self._queues) if self._queues[priority]]
+        if not waiting:
+            return None
+        if BATCH in waiting and self._dispatched % self.batch_share == self.batch_share - 1:
+            return BATCH
+        return waiting[0]
+
+    def _next_call(self) -> Optional[_QueuedCall]:
+        priority = self._pick_priority()
+        if priority is None:
+            return None
+        simulations = self._queues[priority]
+        simulation_id, queue = next(iter(simulations.items()))
+        call = queue.popleft()
+        # round robin: the simulation goes to the back of its class
+        if queue:
+            simulations.move_to_end(simulation_id)
+        else:
+            del simulations[simulation_id]
+        self._dispatched += 1
+        return call
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                call = self._next_call()
+                while call is None:
+                    self._condition.wait()
+                    call = self._next_call()
+
+            now = time.monotonic()
+            waited = now - call.enqueued_at
+            with self._condition:
+                self._wait_counts[call.priority][bisect.bisect_left(WAIT_BUCKETS, waited)] += 1
+
+            # a call cancelled while queued (a hedge that lost, a timed-out caller) is dropped first
+            if not call.future.set_running_or_notify_cancel():
+                continue
+            if call.deadline is not None and now > call.deadline:
+                call.future.set_exception(TimeoutError(f"Call waited {waited:.2f}s, past its deadline"))
+                continue
+            try:
+                call.future.set_result(call.context.run(call.function))
+            except BaseException as error:
+                call.future.set_exception(error)
+
+    def queue_wait_histogram(self) -> Dict[str, List[Tuple[float, int]]]:
+        """
+        Queue-wait counts per priority class as (bucket upper bound, count) pairs
+        """
+        with self._condition:
+            return {
+                PRIORITY_NAMES[priority]: list(zip(WAIT_BUCKETS, counts))
+                for priority, counts in self._wait_counts.items()
+            }
+
+    def queue_wait_quantile(self, priority: int, quantile: float) -> float:
+        """
+        Upper bound of the histogram bucket holding the {quantile} of queue waits
+        """
+        with self._condition:
+            counts = list(self._wait_counts[priority])
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        seen = 0
+        for bound, count in zip(WAIT_BUCKETS, counts):
+            seen += count
+            if seen >= quantile * total:
+                return bound
+        return WAIT_BUCKETS[-1]
+
+    def queued(self) -> int:
+        with self._condition:
+            return sum(len(queue) for simulations in self._queues.values() for queue in simulations.values())
@@ -0,0 +1,296 @@
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional
+
+from langchain.schema import AIMessage, BaseMessage
+
+from agents.control_plane_cache import ControlPlaneCache, cache_scope
+from agents.llm_call_scheduler import LLMCallScheduler, propagate_context
+from agents.tracing import span
+
+if TYPE_CHECKING:
+    from agents.model_router import ModelRouter
+
+# call types, used to tell the control-plane calls from the debate turns
+TURN = "turn"
+BID = "bid"
+CHOICE = "choice"
+DESCRIPTION = "description"
+
+# seconds a call of each type may take before it is abandoned with a TimeoutError
+CALL_TIMEOUTS: Dict[str, float] = {
+    TURN: 120.0,
+    BID: 15.0,
+    CHOICE: 15.0,
+    DESCRIPTION: 60.0,
+}
+
+# idempotent short calls, a duplicate is sent once they run past the observed p95
+HEDGED_CALL_TYPES = {BID, CHOICE}
+HEDGE_QUANTILE = 0.95
+# latencies needed before the p95 is trusted
+HEDGE_MIN_SAMPLES = 20
+
+# constrained decoding of integer answers
+INTEGER_MAX_TOKENS = 5
+INTEGER_STOP = [">", "\n"]
+_INTEGER = re.compile(r"\d+")
+_COMPLETE_INTEGER = re.compile(r"\d+\D")
+
+_call_scheduler: Optional[LLMCallScheduler] = None
+_model_router: Optional["ModelRouter"] = None
+_control_plane_cache: Optional[ControlPlaneCache] = None
+_call_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="llm-call")
+# audits of cached answers never run on the callers' threads
+_audit_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-audit")
+
+
+class LatencyTracker:
+    """
+    Rolling window of the latencies of every call type
+    """
+
+    def __init__(self, window: int = 200) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def record(self, call_type: str, latency: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(call_type, deque(maxlen=self.window)).append(latency)
+
+    def quantile(self, call_type: str, quantile: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(self._latencies.get(call_type, ()))
+        if len(latencies) < min_samples or not latencies:
+            return None
+        return latencies[min(int(quantile * len(latencies)), len(latencies) - 1)]
+
+
+call_latencies = LatencyTracker()
+
+
+def install_call_scheduler(scheduler: Optional[LLMCallScheduler]) -> None:
+    """
+    Routes every following LLM call through {scheduler}, None calls the models directly
+    """
+    global _call_scheduler
+    _call_scheduler = scheduler
+
+
+def get_call_scheduler() -> Optional[LLMCallScheduler]:
+    return _call_scheduler
+
+
+def install_model_router(router: Optional["ModelRouter"]) -> None:
+    """
+    Sends every following call to the model tier of its call type, None uses the callers' models
+    """
+    global _model_router
+    _model_router = router
+
+
+def get_model_router() -> Optional["ModelRouter"]:
+    return _model_router
+
+
+def install_control_plane_cache(cache: Optional[ControlPlaneCache]) -> None:
+    """
+    Serves the control-plane calls from {cache} when the same prompt was answered before
+    """
+    global _control_plane_cache
+    _control_plane_cache = cache
+
+
+def get_control_plane_cache() -> Optional[ControlPlaneCache]:
+    return _control_plane_cache
+
+
+def _cached(call_type: str, model, messages: List[BaseMessage], function: Callable, speaker: Optional[str] = None):
+    """
+    Returns the answer of {function} through the installed control-plane cache
+    """
+    cache = _control_plane_cache
+    if cache is None or not cache.caches(call_type):
+        return function()
+    # answers of different models and speakers are never shared
+    scope = cache_scope(call_type, getattr(model, "model_name", type(model).__name__), messages, speaker)
+    text = cache.text_of(messages)
+    with span("cache_lookup", "llm", call_type=call_type):
+        hit = cache.lookup(scope, text)
+    if hit is None:
+        answer = function()
+        cache.store(scope, text, answer)
+        return answer
+
+    answer, _ = hit
+    if random.random() < cache.audit_rate:
+        def record(future: Future) -> None:
+            if future.exception() is None:
+                cache.record_audit(call_type, answer, future.result())
+
+        _audit_executor.submit(propagate_context(function)).add_done_callback(record)
+    return answer
+
+
+def record_parse_failure(call_type: str) -> None:
+    """
+    Counts an answer of {call_type} that could not be parsed against its tier
+    """
+    tier = _model_router.tier_for(call_type) if _model_router is not None else None
+    if tier is not None:
+        tier.record_parse_failure()
+
+
+def _submit(function: Callable, args, kwargs) -> Future:
+    if _call_scheduler is not None:
+        return _call_scheduler.submit(function, *args, **kwargs)
+    return _call_executor.submit(propagate_context(function), *args, **kwargs)
+
+
+def run_call(call_type: str, function: Callable, *args, **kwargs):
+    """
+    Runs the LLM call {function} of {call_type} through the installed scheduler,
+    within the timeout budget of {call_type} and hedged if it is idempotent
+    """
+    with span("llm_call", "llm", call_type=call_type):
+        return _run_call(call_type, function, *args, **kwargs)
+
+
+def _run_call(call_type: str, function: Callable, *args, **kwargs):
+    timeout = CALL_TIMEOUTS.get(call_type)
+    if timeout is None and _call_scheduler is None:
+        return function(*args, **kwargs)
+
+    started = time.monotonic()
+    deadline = started + timeout if timeout is not None else None
+    pending = {_submit(function, args, kwargs)}
+
+    # 1. send a duplicate of a late idempotent call, the first answer wins
+    if call_type in HEDGED_CALL_TYPES:
+        hedge_after = call_latencies.quantile(call_type, HEDGE_QUANTILE, HEDGE_MIN_SAMPLES)
+        if hedge_after is not None and (timeout is None or hedge_after < timeout):
+            done, _ = wait(pending, timeout=hedge_after)
+            if not done:
+                pending.add(_submit(function, args, kwargs))
+
+    # 2. wait for the first successful answer within the budget
+    error: Optional[BaseException] = None
+    while pending:
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        if remaining is not None and remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                call_latencies.record(call_type, time.monotonic() - started)
+                return future.result()
+            error = future.exception()
+
+    if pending:
+        # queued duplicates never start, running model calls end with their request timeout
+        for future in pending:
+            future.cancel()
+        raise TimeoutError(f"{call_type} call did not finish within {timeout}s")
+    raise error
+
+
+def _route(model, call_type: str, kwargs: dict):
+    # the HTTP request itself is aborted at the budget of its call type, cancelling
+    # the future of a running call would leave its thread and connection busy
+    timeout = CALL_TIMEOUTS.get(call_type)
+    if timeout is not None:
+        kwargs.setdefault("timeout", timeout)
+    tier = _model_router.tier_for(call_type) if _model_router is not None else None
+    if tier is None:
+        return model, None
+    if tier.max_tokens is not None:
+        kwargs.setdefault("max_tokens", tier.max_tokens)
+    return tier.model_for(model), tier
+
+
+def _run_routed(call_type: str, tier, function: Callable, *args, **kwargs):
+    if tier is None:
+        return run_call(call_type, function, *args, **kwargs)
+    started = time.monotonic()
+    try:
+        result = run_call(call_type, function, *args, **kwargs)
+    except Exception:
+        tier.record(time.monotonic() - started, failed=True)
+        raise
+    tier.record(time.monotonic() - started)
+    return result
+
+
+def invoke_model(
+    model, messages: List[BaseMessage], call_type: str = TURN, speaker: Optional[str] = None, **kwargs
+) -> BaseMessage:
+    """
+    Calls the chat {model} with {messages}; every agent and interaction goes through here.
+    {speaker} keeps the cached answers of different agents apart
+    """
+    if _control_plane_cache is None or not _control_plane_cache.caches(call_type):
+        model, tier = _route(model, call_type, kwargs)
+        return _run_routed(call_type, tier, model, messages, **kwargs)
+
+    def call() -> str:
+        routed_model, tier = _route(model, call_type, kwargs)
+        return _run_routed(call_type, tier, routed_model, messages, **kwargs).content
+
+    return AIMessage(content=_cached(call_type, model, messages, call, speaker))
+
+
+def _stream_integer(model, messages: List[BaseMessage], **kwargs) -> str:
+    text = ""
+    for chunk in model.stream(messages, **kwargs):
+        text += chunk.content
+        # a digit run followed by anything else is complete, closing the stream aborts the generation
+        if _COMPLETE_INTEGER.search(text):
+            break
+    return text
+
+
+def invoke_integer(
+    model,
+    messages: List[BaseMessage],
+    call_type: str,
+    low: int,
+    high: int,
+    default: int = 0,
+    speaker: Optional[str] = None,
+) -> int:
+    """
+    Asks the chat {model} for a single integer between {low} and {high}.
+
+    The call is capped to a few tokens, stops at the closing '>' or a newline
+    and the stream is dropped as soon as an integer has been read. An integer
+    outside the range is rejected locally and {default} is returned instead
+    of asking again; an answer without any integer raises a ValueError.
+    """
+    def call() -> int:
+        kwargs = {}
+        routed_model, tier = _route(model, call_type, kwargs)
+        kwargs.setdefault("max_tokens", INTEGER_MAX_TOKENS)
+        text = _run_routed(
+            call_type, tier, _stream_integer, routed_model, messages, stop=INTEGER_STOP, **kwargs
+        )
+
+        match = _INTEGER.search(text)
+        if match is None:
+            record_parse_failure(call_type)
+            raise ValueError(f"Could not parse an integer from: {text!r}")
+        value = int(match.group(0))
+        if not low <= value <= high:
+            record_parse_failure(call_type)
+            return default
+        return value
+
+    # a cached answer is still checked against the range of this call
+    value = _cached(call_type, model, messages, call, speaker)
+    return value if low <= value <= high else default
@@ -0,0 +1,89 @@
+import threading
+from typing import Dict, Optional
+
+from agents.chat_model_pool import get_chat_model
+from agents.model_calls import BID, CHOICE, DESCRIPTION
+
+
+class ModelTier:
+    """
+    Model and generation cap used for one category of calls,
+    together with the latency and parse-failure stats of the tier
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> None:
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        # None keeps the temperature of the model the caller asked for
+        self.temperature = temperature
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.parse_failures = 0
+        self.total_latency = 0.0
+
+    def model_for(self, model):
+        temperature = self.temperature
+        if temperature is None:
+            temperature = getattr(model, "temperature", 0.2)
+        return get_chat_model(model_name=self.model_name, temperature=temperature)
+
+    def record(self, latency: float, failed: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total_latency += latency
+            if failed:
+                self.errors += 1
+
+    def record_parse_failure(self) -> None:
+        with self._lock:
+            self.parse_failures += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "model_name": self.model_name,
+                "max_tokens": self.max_tokens,
+                "calls": self.calls,
+                "errors": self.errors,
+                "parse_failures": self.parse_failures,
+                "mean_latency": self.total_latency / self.calls if self.calls else 0.0,
+            }
+
+
+class ModelRouter:
+    """
+    Sends every call type to its configured tier, call types
+    without a tier use the model the caller passed in
+    """
+
+    def __init__(self, tiers: Dict[str, ModelTier]) -> None:
+        self.tiers = tiers
+
+    def tier_for(self, call_type: str) -> Optional[ModelTier]:
+        return self.tiers.get(call_type)
+
+    def stats(self) -> Dict[str, dict]:
+        return {call_type: tier.stats() for call_type, tier in self.tiers.items()}
+
+
+def control_plane_router(
+    small_model_name: str = "gpt-3.5-turbo", description_max_tokens: int = 200
+) -> ModelRouter:
+    """
+    Router sending bids and speaker choices, which answer with a single integer,
+    and persona/topic descriptions to a small fast model with capped outputs
+    """
+    # a tier per call type, so their latencies and parse failures are told apart
+    return ModelRouter(
+        {
+            BID: ModelTier(small_model_name, max_tokens=5, temperature=0.0),
+            CHOICE: ModelTier(small_model_name, max_tokens=5, temperature=0.0),
+            DESCRIPTION: ModelTier(small_model_name, max_tokens=description_max_tokens),
+        }
+    )
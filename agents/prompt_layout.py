@@ -0,0 +1,59 @@
+from typing import List, Sequence
+
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
+
+
+class PromptLayout:
+    """
+    Assembles every prompt of an agent in the same order: system prompt,
+    persona header, history, recalled turns, per-call instruction.
+
+    The history is append-only between calls, so everything up to the end of
+    the history of a call is a byte-identical prefix of the next one, whatever
+    the instruction; providers serve that prefix from their prompt cache.
+    The turns recalled from episodic memory change from call to call, so they
+    come after the history and only the part after them is sent again.
+    """
+
+    def __init__(self, system_message: SystemMessage, persona_header: str = "") -> None:
+        self.system_message = system_message
+        self.persona_header = persona_header
+
+    def messages(self, history: List[str], instruction: str, recalled: Sequence[str] = ()) -> List[BaseMessage]:
+        messages = [
+            self.system_message,
+            HumanMessage(content=self.persona_header + "\n".join(history)),
+        ]
+        if recalled:
+            messages.append(HumanMessage(content="\n".join(["Relevant earlier turns:", *recalled])))
+        messages.append(HumanMessage(content=instruction))
+        return messages
+
+
+def split_template(template: str, variable: str = "message_history") -> tuple:
+    """
+    Splits a prompt template around its {variable} placeholder into the
+    text before it (the persona header) and the text after it (the instruction).
+    A code fence around the placeholder is dropped with it
+    """
+    placeholder = "{" + variable + "}"
+    if placeholder not in template:
+        return "", template
+    header, instruction = template.split(placeholder, 1)
+    # the history goes into a message of its own, the fence would stay open across it
+    if header.rstrip().endswith("```") and instruction.lstrip().startswith("```"):
+        header = header.rstrip()[:-3]
+        instruction = instruction.lstrip()[3:]
+    return header, instruction
+
+
+def prefix_is_stable(previous: List[BaseMessage], current: List[BaseMessage]) -> bool:
+    """
+    Whether the system prompt and history of the {previous} prompt are a prefix of
+    the {current} one, i.e. whether the current call can reuse the provider's cache
+    of the previous call
+    """
+    if len(previous) < 2 or len(current) < 2:
+        return False
+    (old_system, old_history), (new_system, new_history) = previous[:2], current[:2]
+    return old_system.content == new_system.content and new_history.content.startswith(old_history.content)
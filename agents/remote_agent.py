@@ -0,0 +1,204 @@
+import argparse
+import importlib
+import multiprocessing
+import os
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable, Optional, Tuple
+
+# the connections unpickle what they receive, only peers knowing the key may connect
+AUTHKEY_ENV = "MULTI_AGENTS_AUTHKEY"
+
+
+def _handle(agent, request: tuple):
+    command, *args = request
+    if command == "receive":
+        agent.receive(*args)
+        return None
+    if command == "send":
+        return agent.send()
+    if command == "bid":
+        return agent.bid()
+    if command == "reset":
+        agent.reset()
+        return None
+    if command == "describe":
+        return {
+            "name": agent.name,
+            "word_limit": getattr(agent, "word_limit", None),
+            "generations": getattr(agent, "generations", 0),
+            "overruns": getattr(agent, "overruns", 0),
+        }
+    raise ValueError(f"Unknown command {command!r}")
+
+
+def _serve_connection(agent, connection: Connection) -> None:
+    # every request is answered, so an error is raised on the call that caused it
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request[0] == "close":
+            connection.close()
+            return
+        try:
+            connection.send(("ok", _handle(agent, request)))
+        except Exception as error:
+            connection.send(("error", f"{type(error).__name__}: {error}"))
+
+
+def serve_agent(agent_factory: Callable, listener: Listener) -> None:
+    """
+    Builds an agent with {agent_factory} in this process and serves it to
+    the simulators connecting to {listener}, one connection at a time
+    """
+    agent = agent_factory()
+    while True:
+        with listener.accept() as connection:
+            _serve_connection(agent, connection)
+
+
+def _worker(agent_factory: Callable, authkey: bytes, handshake: Connection) -> None:
+    listener = Listener(("127.0.0.1", 0), authkey=authkey)
+    handshake.send(listener.address)
+    handshake.close()
+    serve_agent(agent_factory, listener)
+
+
+class RemoteAgentError(RuntimeError):
+    pass
+
+
+class RemoteAgentProxy:
+    """
+    Stands in for a DialogueAgent running in another process or on another node.
+
+    Only the transcript deltas cross the connection. receive() ships the new
+    message without waiting, so a broadcast to many remote agents is not a
+    round trip per agent; its acknowledgement is read before the next call, which
+    raises the error of a failed receive. send() and bid() wait for the answer.
+    The full history never leaves the worker. Remote agents cannot be forked.
+    """
+
+    forkable = False
+    # acknowledgements left unread at most, so neither side blocks on a full socket buffer
+    max_pending_acks = 64
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes) -> None:
+        self.address = address
+        self._connection = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+        self._pending_acks = 0
+        description = self._call("describe")
+        self.name = description["name"]
+        self.word_limit = description["word_limit"]
+
+    def _recv(self) -> tuple:
+        try:
+            return self._connection.recv()
+        except (EOFError, OSError) as error:
+            raise RemoteAgentError(f"{self.address} is gone: {type(error).__name__}") from error
+
+    def _send(self, request: tuple) -> None:
+        try:
+            self._connection.send(request)
+        except OSError as error:
+            raise RemoteAgentError(f"{self.address} is gone: {type(error).__name__}") from error
+
+    def _read_acks(self) -> None:
+        # all of them are read, the first failure is raised
+        failure = None
+        while self._pending_acks:
+            status, result = self._recv()
+            self._pending_acks -= 1
+            if status == "error" and failure is None:
+                failure = result
+        if failure is not None:
+            raise RemoteAgentError(f"{self.address} failed to receive a message: {failure}")
+
+    def _call(self, command: str, *args):
+        with self._lock:
+            self._read_acks()
+            self._send((command, *args))
+            status, result = self._recv()
+        if status == "error":
+            raise RemoteAgentError(f"{self.address} failed: {result}")
+        return result
+
+    @property
+    def generations(self) -> int:
+        return self._call("describe")["generations"]
+
+    @property
+    def overruns(self) -> int:
+        return self._call("describe")["overruns"]
+
+    @property
+    def overrun_rate(self) -> float:
+        description = self._call("describe")
+        return description["overruns"] / description["generations"] if description["generations"] else 0.0
+
+    def receive(self, name: str, message: str) -> None:
+        with self._lock:
+            if self._pending_acks >= self.max_pending_acks:
+                self._read_acks()
+            self._send(("receive", name, message))
+            self._pending_acks += 1
+
+    def send(self) -> str:
+        return self._call("send")
+
+    def bid(self) -> int:
+        return self._call("bid")
+
+    def reset(self) -> None:
+        self._call("reset")
+
+    def fork(self, memo: Optional[dict] = None):
+        raise NotImplementedError("Remote agents cannot be forked")
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._connection.send(("close",))
+            except OSError:
+                # the worker is gone already
+                pass
+            self._connection.close()
+
+
+def spawn_agent(
+    agent_factory: Callable, authkey: Optional[bytes] = None
+) -> Tuple[RemoteAgentProxy, multiprocessing.Process]:
+    """
+    Starts a worker process running the agent built by {agent_factory} (a picklable,
+    module-level function) and returns a proxy connected to it. Without an {authkey}
+    a random one is generated and shared with the worker only
+    """
+    if authkey is None:
+        authkey = os.urandom(32)
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_worker, args=(agent_factory, authkey, sender), daemon=True)
+    process.start()
+    sender.close()
+    address = receiver.recv()
+    receiver.close()
+    return RemoteAgentProxy(address, authkey), process
+
+
+if __name__ == "__main__":
+    # MULTI_AGENTS_AUTHKEY=<secret> python -m agents.remote_agent my_module:build_agent --host 0.0.0.0 --port 6001
+    parser = argparse.ArgumentParser(description="Serves a dialogue agent to remote simulators")
+    parser.add_argument("factory", help="module:function building the agent")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6001)
+    parser.add_argument("--authkey", default=None, help=f"shared secret, defaults to ${AUTHKEY_ENV}")
+    arguments = parser.parse_args()
+    authkey = arguments.authkey or os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        # anyone able to connect could run code in this process
+        parser.error(f"an authkey is required, pass --authkey or set {AUTHKEY_ENV}")
+    module_name, function_name = arguments.factory.split(":")
+    factory = getattr(importlib.import_module(module_name), function_name)
+    serve_agent(factory, Listener((arguments.host, arguments.port), authkey=authkey.encode()))
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+import weakref
+from array import array
+from collections.abc import Sequence
+from typing import Iterator, List, Optional
+
+
+def current_rss_mb() -> float:
+    """
+    Resident set size of the process in MB
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # no procfs, fall back to the peak RSS
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if os.uname().sysname != "Darwin" else peak / (1024 * 1024)
+
+
+class MemoryBudget:
+    """
+    Process-wide RSS ceiling of the bounded-memory mode. Every {check_every}
+    appends the RSS is read and, above the ceiling, every spilling history
+    and every spilling matrix of episodic memory vectors keeps only
+    {min_hot_tail} entries in memory.
+    """
+
+    def __init__(self, rss_ceiling_mb: Optional[float] = None, check_every: int = 256, min_hot_tail: int = 16) -> None:
+        self.rss_ceiling_mb = rss_ceiling_mb
+        self.check_every = check_every
+        self.min_hot_tail = min_hot_tail
+        self._appends = 0
+        # anything with a shrink(hot_tail) method
+        self._histories: "weakref.WeakSet" = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def register(self, history) -> None:
+        with self._lock:
+            self._histories.add(history)
+
+    def tick(self) -> None:
+        if self.rss_ceiling_mb is None:
+            return
+        self._appends += 1
+        if self._appends % self.check_every:
+            return
+        if current_rss_mb() > self.rss_ceiling_mb:
+            with self._lock:
+                histories = list(self._histories)
+            for history in histories:
+                history.shrink(self.min_hot_tail)
+
+
+memory_budget = MemoryBudget()
+
+
+class SpillingHistory(Sequence):
+    """
+    Append-only list of strings that keeps only its newest {hot_tail}
+    entries in memory. Older entries are written to a segment file and read
+    back lazily, contiguous ranges with a single read.
+    """
+
+    def __init__(self, hot_tail: int = 200, directory: Optional[str] = None, items=()) -> None:
+        self.hot_tail = hot_tail
+        self._segment = tempfile.TemporaryFile(dir=directory)
+        # byte offset of every spilled entry plus the end of the last one
+        self._offsets = array("q", [0])
+        self._hot: List[str] = []
+        self._lock = threading.Lock()
+        memory_budget.register(self)
+        for item in items:
+            self.append(item)
+
+    @property
+    def spilled(self) -> int:
+        return len(self._offsets) - 1
+
+    def __len__(self) -> int:
+        return self.spilled + len(self._hot)
+
+    def append(self, text: str) -> None:
+        with self._lock:
+            self._hot.append(text)
+            if len(self._hot) > self.hot_tail:
+                self._spill(len(self._hot) - self.hot_tail)
+        memory_budget.tick()
+
+    def extend(self, texts) -> None:
+        for text in texts:
+            self.append(text)
+
+    def shrink(self, hot_tail: int) -> None:
+        """
+        Spills everything but the newest {hot_tail} entries
+        """
+        with self._lock:
+            if len(self._hot) > hot_tail:
+                self._spill(len(self._hot) - hot_tail)
+
+    def _spill(self, count: int) -> None:
+        encoded = [text.encode("utf-8") for text in self._hot[:count]]
+        self._segment.seek(0, os.SEEK_END)
+        self._segment.write(b"".join(encoded))
+        for chunk in encoded:
+            self._offsets.append(self._offsets[-1] + len(chunk))
+        del self._hot[:count]
+
+    def _read_spilled(self, start: int, stop: int) -> List[str]:
+        if start >= stop:
+            return []
+        self._segment.seek(self._offsets[start])
+        data = self._segment.read(self._offsets[stop] - self._offsets[start])
+        base = self._offsets[start]
+        return [
+            data[self._offsets[idx] - base:self._offsets[idx + 1] - base].decode("utf-8")
+            for idx in range(start, stop)
+        ]
+
+    def _range(self, start: int, stop: int) -> List[str]:
+        with self._lock:
+            spilled = self.spilled
+            items = self._read_spilled(start, min(stop, spilled))
+            items.extend(self._hot[max(start - spilled, 0):max(stop - spilled, 0)])
+            return items
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self._range(start, stop)
+            return [self[idx] for idx in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._range(index, index + 1)[0]
+
+    def __iter__(self) -> Iterator[str]:
+        # spilled entries are read in batches, never all at once
+        length = len(self)
+        for start in range(0, length, 256):
+            yield from self._range(start, min(start + 256, length))
+
+    def hot(self) -> List[str]:
+        """
+        The entries currently held in memory
+        """
+        with self._lock:
+            return list(self._hot)
+
+    def __add__(self, other) -> List[str]:
+        return list(self) + list(other)
+
+    def close(self) -> None:
+        self._segment.close()
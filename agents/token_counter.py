@@ -0,0 +1,20 @@
+import functools
+
+import tiktoken
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding_for_model(model_name: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@functools.lru_cache(maxsize=8192)
+def count_tokens(text: str, model_name: str = "gpt-3.5-turbo") -> int:
+    """
+    Number of tokens of {text} for {model_name}, plus one for the newline joining the history.
+    Cached, so a message broadcast to every agent is tokenized only once
+    """
+    return len(_encoding_for_model(model_name).encode(text)) + 1
@@ -0,0 +1,230 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain.agents import Tool
+
+from agents.llm_call_scheduler import propagate_context
+from agents.tracing import span
+
+_STOPWORDS = set(
+    """
+    a about above after again against all also am an and any are as at be because been before being
+    below between both but by can could did do does doing down during each even few for from further
+    had has have having he her here hers herself him himself his how i if in into is it its itself
+    just let like may me might more most much must my myself no nor not now of off on once only or
+    other our ours ourselves out over own same she should so some such than that the their theirs them
+    themselves then there these they this those through to too under until up upon us very was we
+    well were what when where which while who whom why will with would you your yours yourself
+    yourselves agree argue believe point think thank thanks indeed however therefore really
+    """.split()
+)
+_WORD = re.compile(r"[A-Za-z][A-Za-z\-']+")
+# runs of capitalized words like "Universal Basic Income" and acronyms like "OECD"
+_PROPER_NOUN = re.compile(r"\b(?:[A-Z][a-z]+(?:\s+(?:of\s+|and\s+|for\s+)?[A-Z][a-z]+)+|[A-Z]{2,}s?)\b")
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _content_words(query: str) -> frozenset:
+    return frozenset(word.lower() for word in _WORD.findall(query) if word.lower() not in _STOPWORDS)
+
+
+def overlap(first: str, second: str) -> float:
+    """
+    Share of the content words of two queries they have in common (Jaccard)
+    """
+    first_words, second_words = _content_words(first), _content_words(second)
+    if not first_words or not second_words:
+        return 0.0
+    return len(first_words & second_words) / len(first_words | second_words)
+
+
+def extract_query_terms(message: str, max_terms: int = 3, ignore: Optional[List[str]] = None) -> List[str]:
+    """
+    Likely lookup queries for {message}: its multi-word proper nouns and acronyms first,
+    then its most frequent content words as one query. Words of {ignore} (speaker names) are left out
+    """
+    ignored = {word.lower() for name in ignore or [] for word in _WORD.findall(name)}
+    queries: List[str] = []
+    for phrase in _PROPER_NOUN.findall(message):
+        # a sentence may start with "The", "In", ...
+        words = phrase.split()
+        while len(words) > 1 and words[0].lower() in _STOPWORDS:
+            words.pop(0)
+        phrase = " ".join(words)
+        if not set(phrase.lower().split()) <= ignored and _normalize(phrase) not in map(_normalize, queries):
+            queries.append(phrase)
+        if len(queries) == max_terms - 1:
+            break
+
+    words = Counter(
+        word.lower()
+        for word in _WORD.findall(message)
+        if len(word) > 3 and word.lower() not in _STOPWORDS and word.lower() not in ignored
+    )
+    keywords = [word for word, _ in words.most_common(3)]
+    if keywords:
+        queries.append(" ".join(keywords))
+    return queries[:max_terms]
+
+
+class ToolResultCache:
+    """
+    Results of tool lookups by tool and normalized query, at most {max_entries}.
+
+    The agents phrase their own queries, so a lookup is answered by the prefetched
+    query of the same tool sharing at least {min_overlap} of its content words when
+    there is no exact match. A lookup still in flight is joined instead of being sent again
+    """
+
+    def __init__(self, max_entries: int = 256, min_overlap: float = 0.5) -> None:
+        self.max_entries = max_entries
+        self.min_overlap = min_overlap
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[tuple, Future]" = OrderedDict()
+        self.counters = {"lookups": 0, "hits": 0, "joined": 0, "prefetched": 0}
+
+    def _usable(self, future: Optional[Future]) -> bool:
+        return future is not None and not (future.done() and future.exception() is not None)
+
+    def _closest(self, tool_name: str, query: str) -> Optional[Future]:
+        best, best_overlap = None, self.min_overlap
+        for (name, cached_query), future in self._results.items():
+            if name != tool_name or not self._usable(future):
+                continue
+            score = overlap(query, cached_query)
+            if score >= best_overlap:
+                best, best_overlap = future, score
+        return best
+
+    def _claim(self, key: tuple, similar: bool = False):
+        # returns the future of the key and whether the caller has to run the lookup
+        with self._lock:
+            future = self._results.get(key)
+            if not self._usable(future) and similar:
+                future = self._closest(*key)
+            if self._usable(future):
+                if key in self._results:
+                    self._results.move_to_end(key)
+                return future, False
+            future = Future()
+            self._results[key] = future
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+            return future, True
+
+    def _run(self, tool, query: str, future: Future) -> None:
+        try:
+            future.set_result(tool.run(query))
+        except Exception as error:
+            future.set_exception(error)
+
+    def lookup(self, tool, query: str) -> str:
+        """
+        Runs {tool} on {query} unless its result or the one of a similar query is cached or being prefetched
+        """
+        future, owner = self._claim((tool.name, _normalize(query)), similar=True)
+        with self._lock:
+            self.counters["lookups"] += 1
+            if not owner:
+                self.counters["hits" if future.done() else "joined"] += 1
+        if owner:
+            self._run(tool, query, future)
+        return future.result()
+
+    def prefetch(self, tool, query: str, executor: ThreadPoolExecutor) -> bool:
+        """
+        Starts looking {query} up with {tool} unless a similar query is cached, returns whether it did
+        """
+        future, owner = self._claim((tool.name, _normalize(query)), similar=True)
+        if not owner:
+            return False
+        with self._lock:
+            self.counters["prefetched"] += 1
+
+        def run() -> None:
+            with span(f"prefetch.{tool.name}", "tool", query=query):
+                self._run(tool, query, future)
+
+        executor.submit(propagate_context(run))
+        return True
+
+    def wrap(self, tool) -> Tool:
+        """
+        The same tool for the agent chain, answered through the cache
+        """
+        return Tool(
+            name=tool.name,
+            description=tool.description,
+            func=lambda query: self.lookup(tool, query),
+        )
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["hit_rate"] = (
+            (counters["hits"] + counters["joined"]) / counters["lookups"] if counters["lookups"] else 0.0
+        )
+        return counters
+
+
+class ToolPrefetcher:
+    """
+    Warms the tool results of the agents with tools while the conversation goes on.
+
+    Every broadcast message is scanned for likely queries, which are looked up
+    in the background with the tools of the registered agents other than the
+    speaker, at most {max_lookups} external requests per message. The next
+    speaker starts generating at the same time and finds its lookups done or in
+    flight when its queries overlap the prefetched ones, see stats() for how often.
+    """
+
+    def __init__(
+        self,
+        max_terms: int = 2,
+        max_lookups: int = 2,
+        max_workers: int = 4,
+        cache: Optional[ToolResultCache] = None,
+    ) -> None:
+        self.max_terms = max_terms
+        self.max_lookups = max_lookups
+        self.cache = cache if cache is not None else ToolResultCache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-prefetch")
+        self._raw_tools: Dict[str, list] = {}
+
+    def register(self, agent) -> None:
+        """
+        Routes the tools of {agent} through the cache and prefetches for them
+        """
+        if agent.name in self._raw_tools:
+            return
+        self._raw_tools[agent.name] = list(agent.tools)
+        agent.tools = [self.cache.wrap(tool) for tool in agent.tools]
+
+    def notify(self, step: int, name: str, message: str) -> None:
+        """
+        Starts the lookups for {message} spoken by {name} at {step}, returns immediately
+        """
+        queries = extract_query_terms(message, self.max_terms, ignore=list(self._raw_tools) + [name])
+        # the speaker has just had its turn, the lookups go to the agents speaking next
+        lookups = [
+            (tool, query)
+            for query in queries
+            for agent_name, tools in self._raw_tools.items()
+            if agent_name != name
+            for tool in tools
+        ]
+        budget = self.max_lookups
+        for tool, query in lookups:
+            if budget <= 0:
+                break
+            if self.cache.prefetch(tool, query, self._executor):
+                budget -= 1
+
+    def stats(self) -> Dict[str, float]:
+        return self.cache.stats()
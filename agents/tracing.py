@@ -0,0 +1,164 @@
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class Span:
+    __slots__ = ("name", "category", "span_id", "parent_id", "start", "end", "thread", "attributes")
+
+    def __init__(self, name: str, category: str, span_id: int, parent_id: Optional[int], attributes: dict) -> None:
+        self.name = name
+        self.category = category
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_tracer: Optional["Tracer"] = None
+
+
+class Tracer:
+    """
+    Collects the nested spans of a simulation. The parent of a span is the span
+    open in the current context, which follows the work handed over to other
+    threads with propagate_context
+    """
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def start_span(self, name: str, category: str = "simulation", parent: Optional[Span] = None, **attributes) -> Span:
+        parent = parent if parent is not None else _current_span.get()
+        return Span(name, category, next(self._ids), parent.span_id if parent is not None else None, attributes)
+
+    def finish(self, span: Span) -> None:
+        span.end = time.perf_counter()
+        with self._lock:
+            self.spans.append(span)
+
+    def chrome_trace(self) -> dict:
+        """
+        The finished spans in the Chrome trace event format (chrome://tracing, Perfetto)
+        """
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": (span.start - self._origin) * 1e6,
+                    "dur": (span.end - span.start) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": span.thread,
+                    "args": {"span_id": span.span_id, "parent_id": span.parent_id, **span.attributes},
+                }
+                for span in spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def export_chrome_trace(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.chrome_trace(), file, default=str)
+
+    def _children(self) -> Dict[Optional[int], List[Span]]:
+        with self._lock:
+            spans = list(self.spans)
+        children: Dict[Optional[int], List[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+        return children
+
+    def _critical_path(self, span: Span, children: Dict[Optional[int], List[Span]], path: List[tuple]) -> None:
+        # walk back from the end of the span, the child ending last is the one the span waited for
+        cursor = span.end
+        own = children.get(span.span_id, [])
+        while True:
+            candidates = [child for child in own if child.end <= cursor + 1e-9 and child.start < cursor]
+            if not candidates:
+                break
+            critical = max(candidates, key=lambda child: child.end)
+            # removing it helps only as far as the siblings running next to it do not take over
+            overlap = max(
+                (
+                    min(other.end, critical.end) - max(other.start, critical.start)
+                    for other in own
+                    if other is not critical and other.start < critical.end and other.end > critical.start
+                ),
+                default=0.0,
+            )
+            path.append((critical, max(critical.end - critical.start - overlap, 0.0)))
+            self._critical_path(critical, children, path)
+            cursor = critical.start
+
+    def critical_path_report(self, root_name: str = "turn") -> List[dict]:
+        """
+        For every {root_name} span, the spans on its critical path with how much the
+        turn would shorten at most if each were removed or overlapped, largest first
+        """
+        children = self._children()
+        report = []
+        roots = [span for spans in children.values() for span in spans if span.name == root_name]
+        for root in sorted(roots, key=lambda span: span.start):
+            path: List[tuple] = []
+            self._critical_path(root, children, path)
+            report.append(
+                {
+                    "turn": root.attributes.get("step"),
+                    "duration": root.duration,
+                    "critical_path": [
+                        {"name": span.name, "duration": span.duration, "saving": saving, **span.attributes}
+                        for span, saving in sorted(path, key=lambda item: -item[1])
+                    ],
+                }
+            )
+        return report
+
+
+def install_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """
+    Records the spans of every following turn in {tracer}, None turns tracing off
+    """
+    global _tracer
+    _tracer = tracer
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = "simulation", **attributes):
+    """
+    Records the block as a span nested in the current one; a no-op without a tracer
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield None
+        return
+    current = tracer.start_span(name, category, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+        tracer.finish(current)
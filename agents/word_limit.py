@@ -0,0 +1,35 @@
+import math
+import re
+from typing import Tuple
+
+# English averages about 1.3 tokens per word, rounded up for names and punctuation
+TOKENS_PER_WORD = 1.4
+_WORD = re.compile(r"\S+")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s|$)")
+
+
+def max_tokens_for(word_limit: int, headroom: float = 1.25) -> int:
+    """
+    Generation cap for a response of {word_limit} words; the {headroom} leaves
+    room to finish the last sentence, the overrun is trimmed afterwards
+    """
+    return math.ceil(word_limit * TOKENS_PER_WORD * headroom) + 8
+
+
+def trim_to_word_limit(text: str, word_limit: int) -> Tuple[str, bool]:
+    """
+    Cuts {text} to at most {word_limit} words at the last sentence boundary,
+    or at the last word when no sentence ends in the second half of the limit.
+    Returns the text and whether it overran the limit
+    """
+    words = list(_WORD.finditer(text))
+    if len(words) <= word_limit:
+        return text, False
+
+    head = text[:words[word_limit - 1].end()]
+    boundaries = [end.end() for end in _SENTENCE_END.finditer(head)]
+    # a boundary this early would drop most of the answer
+    half = words[max(word_limit // 2 - 1, 0)].end()
+    if boundaries and boundaries[-1] >= half:
+        return head[:boundaries[-1]], True
+    return head.rstrip(",;:-") + "...", True
@@ -0,0 +1,162 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.vectorstores import Chroma
+from langchain_openai import OpenAIEmbeddings
+
+from agents.chat_model_pool import get_embeddings
+
+# namespace of the documents that every agent attached to a corpus can see
+SHARED_NAMESPACE = "shared"
+
+
+class VectorStoreRegistry:
+    """
+    Process-wide registry of knowledge stores keyed by corpus name.
+    Each corpus is ingested (or loaded from disk) once and shared read-only
+    by all agents attached to it. Private documents are tagged with
+    the owning agent's namespace and filtered out for everybody else.
+    """
+
+    def __init__(self, base_directory: str = "docs/chroma") -> None:
+        self.base_directory = base_directory
+        self._stores: Dict[str, Chroma] = {}
+        self._corpus_locks: Dict[str, threading.Lock] = {}
+        # threads holding or waiting for every corpus lock
+        self._corpus_lock_users: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def embedding(self) -> OpenAIEmbeddings:
+        return get_embeddings()
+
+    @contextmanager
+    def _corpus_lock(self, corpus_name: str) -> Iterator[None]:
+        # the lock is counted while held or waited for, so release() never drops it from under a thread
+        with self._lock:
+            lock = self._corpus_locks.setdefault(corpus_name, threading.Lock())
+            self._corpus_lock_users[corpus_name] = self._corpus_lock_users.get(corpus_name, 0) + 1
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                self._corpus_lock_users[corpus_name] -= 1
+                if not self._corpus_lock_users[corpus_name]:
+                    del self._corpus_lock_users[corpus_name]
+                    # a corpus released (or never loaded) meanwhile drops its lock with the last user
+                    if corpus_name not in self._stores:
+                        self._corpus_locks.pop(corpus_name, None)
+
+    def get_or_create(
+        self,
+        corpus_name: str,
+        loaders: Optional[List[PyPDFLoader]] = None,
+        persist_directory: Optional[str] = None,
+        chunk_size: int = 1500,
+        chunk_overlap: int = 150,
+    ) -> Chroma:
+        """
+        Returns the store of {corpus_name}, loading it from {persist_directory}
+        or ingesting {loaders} only if nobody did it before
+        """
+        if corpus_name in self._stores:
+            return self._stores[corpus_name]
+
+        with self._corpus_lock(corpus_name):
+            # another agent may have finished the ingestion while we waited
+            if corpus_name in self._stores:
+                return self._stores[corpus_name]
+
+            if persist_directory is None:
+                persist_directory = os.path.join(self.base_directory, corpus_name)
+
+            vectordb = Chroma(
+                persist_directory=persist_directory,
+                embedding_function=self.embedding,
+            )
+            # reuse the embeddings persisted by a previous run
+            if vectordb._collection.count() > 0:
+                self._tag_untagged_documents(vectordb)
+            else:
+                if not loaders:
+                    raise ValueError(f"Corpus '{corpus_name}' is empty and no loaders were given")
+                docs = []
+                for loader in loaders:
+                    docs.extend(loader.load())
+
+                text_splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                )
+                splits = text_splitter.split_documents(docs)
+                for split in splits:
+                    split.metadata["namespace"] = SHARED_NAMESPACE
+
+                vectordb.add_documents(splits)
+                vectordb.persist()
+
+            self._stores[corpus_name] = vectordb
+            return vectordb
+
+    @staticmethod
+    def _tag_untagged_documents(vectordb: Chroma) -> None:
+        # stores persisted before namespaces existed (docs/chroma) would never match the filter of search,
+        # their documents are shared
+        stored = vectordb._collection.get(include=["metadatas"])
+        untagged = [
+            (document_id, dict(metadata or {}, namespace=SHARED_NAMESPACE))
+            for document_id, metadata in zip(stored["ids"], stored["metadatas"])
+            if not metadata or "namespace" not in metadata
+        ]
+        if untagged:
+            ids, metadatas = zip(*untagged)
+            vectordb._collection.update(ids=list(ids), metadatas=list(metadatas))
+            vectordb.persist()
+
+    def add_private_documents(
+        self, corpus_name: str, namespace: str, documents: List[Document]
+    ) -> None:
+        """
+        Adds {documents} to {corpus_name} visible only within {namespace}
+        """
+        vectordb = self.get_or_create(corpus_name)
+        for document in documents:
+            document.metadata["namespace"] = namespace
+        with self._corpus_lock(corpus_name):
+            vectordb.add_documents(documents)
+
+    def search(
+        self,
+        corpus_name: str,
+        query: str,
+        k: int = 3,
+        namespace: Optional[str] = None,
+    ) -> List[Document]:
+        """
+        Similarity search over the shared documents and the ones of {namespace}
+        """
+        if namespace is None or namespace == SHARED_NAMESPACE:
+            search_filter = {"namespace": SHARED_NAMESPACE}
+        else:
+            search_filter = {"namespace": {"$in": [SHARED_NAMESPACE, namespace]}}
+        # a released corpus is loaded again from disk
+        return self.get_or_create(corpus_name).similarity_search(query, k=k, filter=search_filter)
+
+    def release(self, corpus_name: str) -> None:
+        """
+        Forgets the store of {corpus_name}, the next use loads it again from disk
+        """
+        with self._lock:
+            self._stores.pop(corpus_name, None)
+            # a lock in use is dropped by its last user
+            if corpus_name not in self._corpus_lock_users:
+                self._corpus_locks.pop(corpus_name, None)
+
+
+vector_store_registry = VectorStoreRegistry()
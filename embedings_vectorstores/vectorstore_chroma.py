@@ -1,12 +1,15 @@
 import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 from langchain_community.vectorstores import Chroma
 
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_openai import OpenAIEmbeddings
+from agents.chat_model_pool import get_embeddings
 
 # https://python.langchain.com/docs/modules/data_connection/text_embedding/
 # think about text as a vector space
-embedding = OpenAIEmbeddings()
+embedding = get_embeddings()
 
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 assets_dir = os.path.join(base_dir, 'assets')
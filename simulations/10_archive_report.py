@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from simulators.transcript_archive import ArchiveQuery
+
+# aggregates over every run archived by the simulations, e.g. 3_presidential_debate.py
+archive = ArchiveQuery(sys.argv[1] if len(sys.argv) > 1 else "docs/archive")
+print(f"{len(archive.column('runs', 'run'))} runs, {len(archive.column('turns', 'run'))} turns")
+
+print("Average bid per persona:")
+for speaker, bid in archive.average_bid_by_speaker().items():
+    print(f"\t{speaker}: {bid:.2f}")
+
+print("Turns to termination per stopping probability:")
+for probability, turns in archive.turns_by_stopping_probability().items():
+    print(f"\t{probability:.2f}: {turns:.1f}")
+
+print("Speakers chosen by the director:")
+for speaker, count in archive.next_speaker_counts().items():
+    print(f"\t{speaker}: {count}")
+
+print("Average tokens per turn:")
+for speaker, tokens in archive.mean_by("turns", "tokens", "speaker").items():
+    print(f"\t{speaker}: {tokens:.0f}")
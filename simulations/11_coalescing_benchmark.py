@@ -0,0 +1,71 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+from aiohttp import web
+from langchain.schema import SystemMessage
+
+from agents.chat_model_pool import configure_coalescing, configure_http_pool, get_chat_model
+from agents.coalescing_chat_model import get_coalescer
+from agents.dialogue_agent_bidding import BiddingDialogueAgent
+from simulators.openai_stub_server import OpenAIStubServer
+
+# Runs bidding rounds of a few agents against the local stub server acting as a
+# batching server (every request takes LATENCY, whatever the number of prompts)
+# and compares the requests it received with the number of bids.
+PORT = 8011
+AGENTS = 8
+ROUNDS = 20
+LATENCY = 0.2
+BIDDING_TEMPLATE = "You are {name}.\n{{message_history}}\n\nBid from 1 to 10 to answer: {{recent_message}}\n<"
+
+
+def serve(stub: OpenAIStubServer, ready: threading.Event) -> None:
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(stub.create_app())
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", PORT).start())
+    ready.set()
+    loop.run_forever()
+
+
+if __name__ == "__main__":
+    stub = OpenAIStubServer(reply="7>", latency=LATENCY)
+    ready = threading.Event()
+    threading.Thread(target=serve, args=(stub, ready), daemon=True).start()
+    ready.wait()
+
+    base_url = f"http://127.0.0.1:{PORT}/v1"
+    configure_http_pool(base_url=base_url)
+    configure_coalescing(window=0.02, max_batch=64)
+
+    model = get_chat_model(temperature=0.2)
+    agents = [
+        BiddingDialogueAgent(
+            name=f"Agent {idx}",
+            system_message=SystemMessage(content=f"You are Agent {idx}, a debate candidate."),
+            bidding_template=BIDDING_TEMPLATE.format(name=f"Agent {idx}"),
+            model=model,
+        )
+        for idx in range(AGENTS)
+    ]
+    for agent in agents:
+        agent.receive("Moderator", "What should be done about transportation?")
+
+    executor = ThreadPoolExecutor(max_workers=AGENTS)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        bids = list(executor.map(lambda agent: agent.bid(), agents))
+        assert bids == [7] * AGENTS, bids
+    elapsed = time.perf_counter() - start
+
+    stats = httpx.get(f"http://127.0.0.1:{PORT}/stats").json()
+    print(f"{ROUNDS * AGENTS} bids in {elapsed:.2f}s ({elapsed / ROUNDS:.2f}s per round)")
+    print(f"stub server: {stats}")
+    print(f"coalescer: {get_coalescer(base_url, 0.02, 64).stats()}")
@@ -11,10 +11,13 @@ from langchain.schema import (
     HumanMessage,
     SystemMessage,
 )
-from langchain_openai import ChatOpenAI
+from agents.chat_model_pool import get_chat_model
+from agents.model_calls import DESCRIPTION, invoke_model
 
 from agents.dialogue_agent import DialogueAgent
-from agents.dialogue_simulator import DialogueSimulator
+from simulators.dialogue_simulator import DialogueSimulator
+from simulators.convergence_monitor import ConvergenceMonitor
+from simulators.select_alternately import select_next_speaker_alternately
 
 observer_name = "Isaac Asimov"
 
@@ -57,7 +60,7 @@ goal_specifier_prompt = [
         Do not add anything else."""
     ),
 ]
-specified_goal = ChatOpenAI(temperature=1.0)(goal_specifier_prompt).content
+specified_goal = invoke_model(get_chat_model(temperature=1.0), goal_specifier_prompt, call_type=DESCRIPTION).content
 
 print(f"Original goal:\n{goal}\n")
 print(f"Detailed goal:\n{specified_goal}\n")
@@ -70,7 +73,7 @@ for agent_name, agent_system_message in zip(
         DialogueAgent(
             name=agent_name,
             system_message=agent_system_message,
-            model=ChatOpenAI(temperature=0.2),
+            model=get_chat_model(temperature=0.2),
         )
     )
 
@@ -81,34 +84,19 @@ observer_system_message = observer_interaction.generate_system_message(observer_
 observer = DialogueAgent(
     name=observer_name,
     system_message=observer_system_message,
-    model=ChatOpenAI(temperature=0.2),
+    model=get_chat_model(temperature=0.2),
 )
 
-def select_next_speaker(step: int, agents: List[DialogueAgent]) -> int:
-    """
-    If the step is even, then select the storyteller
-    Otherwise, select the other characters in a round-robin fashion.
-
-    For example, with three characters with indices: 1 2 3
-    The storyteller is index 0.
-    Then the selected index will be as follows:
-
-    step: 0  1  2  3  4  5  6  7  8  9 10 11 12 13 14 15 16
-
-    idx:  0  1  0  2  0  3  0  1  0  2  0  3  0  1  0  2  0
-    """
-    if step % 2 == 0:
-        idx = 0
-    else:
-        idx = (step // 2) % (len(agents) - 1) + 1
-    return idx
-
 max_iters = 7
 n = 0
 
 simulator = DialogueSimulator(
-    agents=[observer] + agents, selection_function=select_next_speaker
+    agents=agents,
+    selection_function=select_next_speaker_alternately,
+    convergence_monitor=ConvergenceMonitor(),
 )
+# the observer only comments, so it follows the story off the speaking order
+simulator.attach_side_channel(observer, every=2)
 simulator.reset()
 simulator.inject(observer_name, specified_goal)
 print(f"({observer_name}): {specified_goal}")
@@ -126,4 +114,11 @@ while n < max_iters:
     # Print the message in the selected color and reset color at the end
     print(f"{color}({name}): {message}\033[0m")
     print("\n")
-    n += 1
\ No newline at end of file
+    # stop early once the agents only repeat themselves
+    if simulator.converged:
+        break
+    n += 1
+
+for step, name, observation in simulator.merge_side_channels():
+    print(f"[after step {step}] ({name}): {observation}")
+    print("\n")
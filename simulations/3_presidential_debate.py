@@ -1,7 +1,8 @@
 import os
 import sys
 
-from simulators.dialogue_simulator import DialogueSimulator
+from simulators.pipelined_bidding_simulator import PipelinedBiddingSimulator
+from simulators.convergence_monitor import ConvergenceMonitor
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from agents.dialogue_agent_bidding import BiddingDialogueAgent
@@ -13,7 +14,33 @@ from langchain.schema import (
     SystemMessage,
 )
 
-from langchain_openai import ChatOpenAI
+from agents.chat_model_pool import get_chat_model
+from agents.event_sinks import (
+    MESSAGE,
+    RUN_FINISHED,
+    RUN_STARTED,
+    BackgroundEventWriter,
+    ConsoleSink,
+    emit,
+    get_event_sink,
+    install_event_sink,
+)
+from agents.model_router import control_plane_router
+from agents.model_calls import (
+    DESCRIPTION,
+    get_model_router,
+    get_control_plane_cache,
+    install_model_router,
+    install_control_plane_cache,
+    invoke_model,
+)
+from agents.control_plane_cache import ControlPlaneCache
+from simulators.transcript_archive import ArchiveSink, TranscriptArchive
+
+# bids, speaker choices and persona/topic blurbs go to a small model with capped outputs
+install_model_router(control_plane_router(small_model_name="gpt-3.5-turbo"))
+# the transcript goes to the console and, with the bids, to the run archive
+install_event_sink(BackgroundEventWriter([ConsoleSink(), ArchiveSink(TranscriptArchive("docs/archive"))]))
 
 debate_members_names = ["Donald Trump", "Kanye West", "Elizabeth Warren"]
 topic = "transcontinental high speed rail"
@@ -79,11 +106,14 @@ topic_specifier_prompt = [
     ),
 ]
 
-specified_topic = ChatOpenAI(temperature=1.0)(topic_specifier_prompt).content
+specified_topic = invoke_model(get_chat_model(temperature=1.0), topic_specifier_prompt, call_type=DESCRIPTION).content
 
 print(f"Original topic:\n{topic}\n")
 print(f"Detailed topic:\n{specified_topic}\n")
 
+# installed once the personas and the topic are generated, only the bids of a candidate
+# asked again over a near-identical recent history are answered locally, 5% of the hits are audited
+install_control_plane_cache(ControlPlaneCache(audit_rate=0.05))
 
 members = []
 for character_name, character_system_message, bidding_template in zip(
@@ -93,30 +123,51 @@ for character_name, character_system_message, bidding_template in zip(
         BiddingDialogueAgent(
             name=character_name,
             system_message=character_system_message,
-            model=ChatOpenAI(temperature=0.2),
+            model=get_chat_model(temperature=0.2),
             bidding_template=bidding_template,
+            word_limit=word_limit,
         )
     )
 
 max_iters = 10
 n = 0
 
-simulator = DialogueSimulator(agents=members, selection_function=debate_member_interactions.select_next_speaker)
+# bids for the next turn are requested while the current turn is being printed
+simulator = PipelinedBiddingSimulator(
+    agents=members,
+    selection_function=debate_member_interactions.select_next_speaker,
+    convergence_monitor=ConvergenceMonitor(),
+    max_turns=max_iters,
+)
 simulator.reset()
 simulator.inject("Debate Moderator", specified_topic)
 
-print(f"(Debate Moderator): {specified_topic}")
-print("\n")
-# ANSI color codes
-even_color = '\033[94m' # Blue for even iterations
-odd_color = '\033[92m' # Green for odd iterations
+emit(RUN_STARTED, label=topic)
+emit(MESSAGE, step=0, speaker="Debate Moderator", message=specified_topic)
 
 while n < max_iters:
-    # Choose the color based on whether n is even or odd
-    color = even_color if n % 2 == 0 else odd_color
-
     name, message = simulator.step()
-    # Print the message in the selected color and reset color at the end
-    print(f"{color}({name}): {message}\033[0m")
-    print("\n")
-    n += 1
\ No newline at end of file
+    # rendered with the bids by the console sink, on its own thread
+    emit(MESSAGE, step=n + 1, speaker=name, message=message)
+    # stop early once the agents only repeat themselves
+    if simulator.converged:
+        break
+    n += 1
+
+emit(RUN_FINISHED, converged=simulator.converged)
+simulator.close()
+
+# the reports below follow the transcript
+get_event_sink().flush()
+
+print("Word limit overruns:")
+for name, report in simulator.word_limit_report().items():
+    print(f"\t{name}: {report['overruns']}/{report['generations']} ({report['overrun_rate']:.0%})")
+
+print("Model tiers:")
+for call_type, stats in get_model_router().stats().items():
+    print(f"\t{call_type}: {stats}")
+
+print("Control-plane cache:")
+for call_type, stats in get_control_plane_cache().stats().items():
+    print(f"\t{call_type}: {stats}")
@@ -14,7 +14,9 @@ from langchain.schema import (
 
 from simulators.dialogue_simulator_wrapper import DebateSimulatorWrapper
 from simulators.dialogue_simulator import DialogueSimulator
-from langchain_openai import ChatOpenAI
+from simulators.convergence_monitor import ConvergenceMonitor
+from agents.chat_model_pool import get_chat_model
+from agents.model_calls import DESCRIPTION, invoke_model
 from agents.dialogue_agent import DialogueAgent
 from agents.dialogue_agent_director import DirectorDialogueAgent
 from simulations.interactions.television_debate.television_debate_description import TelevisionDebateDescription
@@ -70,7 +72,7 @@ topic_specifier_prompt = [
         Do not add anything else."""
     ),
 ]
-specified_topic = ChatOpenAI(temperature=1.0)(topic_specifier_prompt).content
+specified_topic = invoke_model(get_chat_model(temperature=1.0), topic_specifier_prompt, call_type=DESCRIPTION).content
 
 print(f"Original topic:\n{topic}\n")
 print(f"Detailed topic:\n{specified_topic}\n")
@@ -94,9 +96,10 @@ def select_next_speaker(
 director = DirectorDialogueAgent(
     name=director_name,
     system_message=agent_system_messages[0],
-    model=ChatOpenAI(temperature=0.2),
+    model=get_chat_model(temperature=0.2),
     speakers=[name for name in agent_summaries if name != director_name],
     stopping_probability=0.2,
+    word_limit=word_limit,
 )
 
 agents = [director]
@@ -107,7 +110,8 @@ for name, system_message in zip(
         DialogueAgent(
             name=name,
             system_message=system_message,
-            model=ChatOpenAI(temperature=0.2),
+            model=get_chat_model(temperature=0.2),
+            word_limit=word_limit,
         )
     )
 # Replace the main loop with the new wrapper class
@@ -115,6 +119,7 @@ debate_simulator_wrapper = DebateSimulatorWrapper(
     agents=agents,
     director=director,
     selection_function=functools.partial(select_next_speaker, director=director),
+    convergence_monitor=ConvergenceMonitor(),
 )
 
 debate_simulator_wrapper.run_simulation(specified_topic)
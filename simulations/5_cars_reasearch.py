@@ -4,6 +4,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 
 from simulators.dialogue_simulator import DialogueSimulator
+from simulators.convergence_monitor import ConvergenceMonitor
 from simulators.select_alternately import select_next_speaker_alternately
 from simulations.interactions.cars_research_interactions.cars_reasearch_interaction import CarsResearchInteraction
 from agents.dialouge_agent_with_tools import DialogueAgentWithTools
@@ -16,10 +17,19 @@ from langchain.schema import (
     HumanMessage,
     SystemMessage,
 )
-from langchain_openai import ChatOpenAI
+from agents.chat_model_pool import get_chat_model
+from agents.model_router import control_plane_router
+from agents.model_calls import DESCRIPTION, install_model_router, invoke_model
+from agents.tool_prefetcher import ToolPrefetcher
+from agents.tracing import Tracer, install_tracer
 
 #from dotenv import load_dotenv, find_dotenv
 #load_dotenv(find_dotenv())
+# bids, speaker choices and persona/topic blurbs go to a small model with capped outputs
+install_model_router(control_plane_router(small_model_name="gpt-3.5-turbo"))
+# turns, model calls and tool lookups are traced, see the report at the end
+tracer = install_tracer(Tracer())
+
 names = {
     "AI accelerationist": ["arxiv"],
     "AI alarmist": ["wikipedia"],
@@ -55,7 +65,7 @@ topic_specifier_prompt = [
         Do not add anything else."""
     ),
 ]
-specified_topic = ChatOpenAI(temperature=1.0)(topic_specifier_prompt).content
+specified_topic = invoke_model(get_chat_model(temperature=1.0), topic_specifier_prompt, call_type=DESCRIPTION).content
 
 print(f"Original topic:\n{topic}\n")
 print(f"Detailed topic:\n{specified_topic}\n")
@@ -65,7 +75,7 @@ agents = [
     DialogueAgentWithTools(
         name=name,
         system_message=SystemMessage(content=system_message),
-        model=ChatOpenAI(model_name="gpt-4", temperature=0.2),
+        model=get_chat_model(model_name="gpt-4", temperature=0.2),
         tool_names=tools,
         top_k_results=2,
     )
@@ -77,7 +87,17 @@ agents = [
 max_iters = 6
 n = 0
 
-simulator = DialogueSimulator(agents=agents, selection_function=select_next_speaker_alternately)
+simulator = DialogueSimulator(
+    agents=agents,
+    selection_function=select_next_speaker_alternately,
+    convergence_monitor=ConvergenceMonitor(),
+)
+# the tools of both agents look up the terms of every message while the next speaker starts
+prefetcher = ToolPrefetcher()
+for agent in agents:
+    prefetcher.register(agent)
+simulator.add_message_listener(prefetcher.notify)
+
 simulator.reset()
 simulator.inject("Moderator", specified_topic)
 print(f"(Moderator): {specified_topic}")
@@ -95,4 +115,19 @@ while n < max_iters:
     # Print the message in the selected color and reset color at the end
     print(f"{color}({name}): {message}\033[0m")
     print("\n")
-    n += 1
\ No newline at end of file
+    # stop early once the agents only repeat themselves
+    if simulator.converged:
+        break
+    n += 1
+
+# open cars_research_trace.json in chrome://tracing or ui.perfetto.dev
+tracer.export_chrome_trace("cars_research_trace.json")
+for turn in tracer.critical_path_report():
+    print(f"Turn {turn['turn']} took {turn['duration']:.1f}s, on its critical path:")
+    for item in turn["critical_path"][:5]:
+        print(f"\t{item['name']}: {item['duration']:.2f}s, removing it saves up to {item['saving']:.2f}s")
+prefetch = prefetcher.stats()
+print(
+    f"Tool prefetching: {prefetch['hit_rate']:.0%} of the {prefetch['lookups']} tool lookups were served by "
+    f"{prefetch['prefetched']} prefetches ({prefetch['hits']} done, {prefetch['joined']} in flight)"
+)
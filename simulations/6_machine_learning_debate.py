@@ -14,11 +14,16 @@ from langchain.schema import (
 
 from simulators.dialogue_simulator_wrapper import DebateSimulatorWrapper
 from simulators.dialogue_simulator import DialogueSimulator
-from langchain_openai import ChatOpenAI
+from simulators.convergence_monitor import ConvergenceMonitor
+from agents.chat_model_pool import get_chat_model
+from agents.model_calls import DESCRIPTION, invoke_model
 from agents.dialogue_agent import DialogueAgent
 from agents.dialogue_agent_director import DirectorDialogueAgent
+from agents.episodic_memory import EpisodicMemory
 from simulations.interactions.television_debate.television_debate_description import TelevisionDebateDescription
 
+from embedings_vectorstores.vector_store_registry import vector_store_registry
+
 from langchain_community.document_loaders import PyPDFLoader
 topic = "Debate about basics of ML"
 director_name = "Andrew NG"
@@ -72,7 +77,7 @@ topic_specifier_prompt = [
         Do not add anything else."""
     ),
 ]
-specified_topic = ChatOpenAI(temperature=1.0)(topic_specifier_prompt).content
+specified_topic = invoke_model(get_chat_model(temperature=1.0), topic_specifier_prompt, call_type=DESCRIPTION).content
 
 print(f"Original topic:\n{topic}\n")
 print(f"Detailed topic:\n{specified_topic}\n")
@@ -96,9 +101,10 @@ def select_next_speaker(
 director = DirectorDialogueAgent(
     name=director_name,
     system_message=agent_system_messages[0],
-    model=ChatOpenAI(temperature=0.2),
+    model=get_chat_model(temperature=0.2),
     speakers=[name for name in agent_summaries if name != director_name],
     stopping_probability=0.2,
+    word_limit=word_limit,
 )
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 assets_dir = os.path.join(base_dir, 'assets')
@@ -112,26 +118,34 @@ loaders = [
     PyPDFLoader(os.path.join(assets_dir, "MachineLearning-Lecture02.pdf")),
     PyPDFLoader(os.path.join(assets_dir, "MachineLearning-Lecture03.pdf"))
 ]
-director.persist_directory = 'docs/chroma/'
-director.create_vector_store(loaders)
+# the lectures are embedded once and shared read-only by every debater
+vector_store_registry.get_or_create("ml_lectures", loaders=loaders, persist_directory='docs/chroma/')
+director.attach_knowledge_store("ml_lectures")
 
 agents = [director]
 for name, system_message in zip(
     list(agent_summaries.keys())[1:], agent_system_messages[1:]
 ):
-    agents.append(
-        DialogueAgent(
-            name=name,
-            system_message=system_message,
-            model=ChatOpenAI(temperature=0.2),
-        )
+    agent = DialogueAgent(
+        name=name,
+        system_message=system_message,
+        model=get_chat_model(temperature=0.2),
+        word_limit=word_limit,
     )
+    agent.attach_knowledge_store("ml_lectures")
+    agents.append(agent)
+
+# one index of past turns shared by every debater keeps prompts bounded on long runs
+episodic_memory = EpisodicMemory(recent_window=8, k=4)
+for agent in agents:
+    agent.use_episodic_memory(episodic_memory)
 
 # Replace the main loop with the new wrapper class
 debate_simulator_wrapper = DebateSimulatorWrapper(
     agents=agents,
     director=director,
     selection_function=functools.partial(select_next_speaker, director=director),
+    convergence_monitor=ConvergenceMonitor(),
 )
 
 debate_simulator_wrapper.run_simulation(specified_topic)
\ No newline at end of file
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from simulators.tournament_runner import TournamentRunner
+from simulations.interactions.tournament.tournament_interaction import TournamentInteraction
+
+scenarios = [
+    {
+        "name": "automation",
+        "topic": "The current impact of automation and artificial intelligence on employment",
+        "contestants": ["AI accelerationist", "AI alarmist", "Labour economist", "Factory owner"],
+        "word_limit": 50,
+        "max_iters": 6,
+    },
+    {
+        "name": "high speed rail",
+        "topic": "transcontinental high speed rail",
+        "contestants": ["Donald Trump", "Kanye West", "Elizabeth Warren"],
+        "word_limit": 50,
+        "max_iters": 6,
+    },
+]
+
+# personas, model clients and caches are built once and reused by every match
+tournament = TournamentRunner(scenarios, interaction_class=TournamentInteraction)
+
+for result in tournament.run_all():
+    print(f"=== {result['scenario']}: {' vs '.join(result['contestants'])} "
+          f"({len(result['transcript']) - 1} turns, {result['duration']:.1f}s)")
+    for name, message in result["transcript"]:
+        print(f"({name}): {message}")
+    print("\n")
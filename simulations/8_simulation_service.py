@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.llm_call_scheduler import LLMCallScheduler
+from simulators.simulation_service import run_service
+from simulators.tournament_runner import TournamentRunner
+from simulations.interactions.tournament.tournament_interaction import TournamentInteraction
+
+# Example:
+#   curl -X POST localhost:8080/simulations \
+#        -d '{"topic": "transcontinental high speed rail", "contestants": ["Donald Trump", "Kanye West"]}'
+#   curl -N localhost:8080/simulations/<id>/events
+#   curl -X POST localhost:8080/simulations/<id>/run
+
+# scenarios are registered by the clients, the runner keeps their personas between sessions
+runner = TournamentRunner([], interaction_class=TournamentInteraction)
+
+# every model call of every session shares one fair queue and one API quota
+scheduler = LLMCallScheduler(max_concurrency=32, max_queued_per_simulation=64)
+
+run_service(
+    runner,
+    host="127.0.0.1",
+    port=8080,
+    scheduler=scheduler,
+    max_sessions=500,
+    idle_timeout=900.0,
+)
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import zlib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain.schema import SystemMessage
+
+import numpy as np
+
+from agents.dialogue_agent import DialogueAgent
+from agents.episodic_memory import EpisodicMemory
+from agents.spilling_history import current_rss_mb, memory_budget
+
+# Feeds a 10k turn marathon to a few agents sharing an episodic memory without
+# calling the API (the turns get local pseudo-random embeddings) and prints the
+# RSS every 1000 turns, once with plain histories and once in the bounded mode.
+TURNS = 10000
+AGENTS = 4
+HOT_TAIL = 200
+DIMENSIONS = 1536
+names = [f"Agent {idx}" for idx in range(AGENTS)]
+
+
+def local_embedding(text: str) -> np.ndarray:
+    return np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(DIMENSIONS, dtype=np.float32)
+
+
+def run(bounded: bool) -> None:
+    agents = [DialogueAgent(name, SystemMessage(content=""), model=None) for name in names]
+    memory = EpisodicMemory(local_embedding, hot_tail=HOT_TAIL if bounded else None)
+    for agent in agents:
+        if bounded:
+            agent.use_bounded_memory(hot_tail=HOT_TAIL)
+        agent.use_episodic_memory(memory)
+
+    start = time.perf_counter()
+    for turn in range(1, TURNS + 1):
+        speaker = names[turn % AGENTS]
+        # a unique turn of ~150 words, like a long debate answer
+        message = f"turn {turn}: " + " ".join(f"argument{turn}-{word}" for word in range(150))
+        for agent in agents:
+            agent.receive(speaker, message)
+        if turn % 1000 == 0:
+            print(f"  {turn:>6} turns  rss {current_rss_mb():8.1f} MB")
+
+    # the spilled turns are still there when they are needed
+    assert agents[0].message_history[1].startswith(f"{names[1]}: turn 1:")
+    assert memory.retrieve(agents[0].message_history[1], k=1, before_step=TURNS - 1) == [agents[0].message_history[1]]
+    print(f"  {time.perf_counter() - start:.1f}s, prompt entries {len(agents[0]._history_for_prompt())}")
+
+
+if __name__ == "__main__":
+    # above the ceiling every bounded history keeps only a few turns in memory
+    memory_budget.rss_ceiling_mb = 1024
+
+    print("bounded memory mode")
+    run(bounded=True)
+    print("plain message histories")
+    run(bounded=False)
@@ -4,7 +4,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from agent_interaction import AgentInteraction
 from langchain.schema import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+from agents.chat_model_pool import get_chat_model
+from agents.model_calls import DESCRIPTION, invoke_model
 
 class CarsResearchInteraction(AgentInteraction):
     def __init__(self, word_limit, topic, names):
@@ -25,7 +26,7 @@ class CarsResearchInteraction(AgentInteraction):
                 Do not add anything else."""
             ),
         ]
-        agent_description = ChatOpenAI(temperature=1.0)(agent_specifier_prompt).content
+        agent_description = invoke_model(get_chat_model(temperature=1.0), agent_specifier_prompt, call_type=DESCRIPTION).content
         return agent_description
 
     def generate_system_message(self, name, description, tools):
@@ -3,15 +3,18 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import tenacity
+from concurrent.futures import ThreadPoolExecutor
 from agent_interaction import AgentInteraction
 from typing import Callable, List
 from langchain.schema import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+from agents.chat_model_pool import get_chat_model
+from agents.model_calls import DESCRIPTION, invoke_model
+from agents.llm_call_scheduler import propagate_context
 from agents.dialogue_agent import DialogueAgent
+from agents.remote_agent import RemoteAgentError
+from agents.event_sinks import BIDS, emit
 import numpy as np
 
-from simulations.interactions.presidental_debate.bid_output_parser import BidOutputParser
-
 class PresidentialDebateDescription(AgentInteraction):
     def __init__(self, word_limit, topic, debate_members):
         self.word_limit = word_limit
@@ -19,9 +22,7 @@ class PresidentialDebateDescription(AgentInteraction):
         self.agent_descriptor_system_message = SystemMessage(content="You can add detail to the description of each presidential candidate.")
         self.debate_description = f"""Here is the topic for the presidential debate: {topic}.
                         The presidential candidates are: {', '.join(debate_members)}."""
-        self.bid_parser = BidOutputParser(
-            regex=r"<(\d+)>", output_keys=["bid"], default_output_key="bid"
-        )
+        self._bid_executor = ThreadPoolExecutor(max_workers=max(len(debate_members), 1))
     def generate_description(self, agent_name):
         character_specifier_prompt = [
             self.agent_descriptor_system_message,
@@ -32,8 +33,8 @@ class PresidentialDebateDescription(AgentInteraction):
                 Do not add anything else."""
             ),
         ]
-        character_description = ChatOpenAI(temperature=1.0)(
-            character_specifier_prompt
+        character_description = invoke_model(
+            get_chat_model(temperature=1.0), character_specifier_prompt, call_type=DESCRIPTION
         ).content
         return character_description
 
@@ -79,7 +80,7 @@ class PresidentialDebateDescription(AgentInteraction):
     {{recent_message}}
     ```
 
-    {self.bid_parser.get_format_instructions()}
+    Your response should be an integer delimited by angled brackets, like this: <int>.
     Do nothing else.
         """
         return bidding_template
@@ -88,36 +89,36 @@ class PresidentialDebateDescription(AgentInteraction):
     @tenacity.retry(
         stop=tenacity.stop_after_attempt(2),
         wait=tenacity.wait_none(),  # No waiting time between retries
-        retry=tenacity.retry_if_exception_type(ValueError),
+        # a stuck call and a failure of a remote agent are retried once too
+        retry=tenacity.retry_if_exception_type((ValueError, TimeoutError, RemoteAgentError)),
         before_sleep=lambda retry_state: print(
-            f"ValueError occurred: {retry_state.outcome.exception()}, retrying..."
+            f"{type(retry_state.outcome.exception()).__name__} occurred: {retry_state.outcome.exception()}, retrying..."
         ),
         retry_error_callback=lambda retry_state: 0,
     )  # Default value when all retries are exhausted
-    def ask_for_bid(self, agent) -> str:
+    def ask_for_bid(self, agent) -> int:
         """
-        Ask for agent bid and parses the bid into the correct format.
+        Ask for agent bid, the bid is decoded and validated as an integer by the agent.
         """
-        bid_string = agent.bid()
-        bid = int(self.bid_parser.parse(bid_string)["bid"])
-        return bid
+        return agent.bid()
     
     def select_next_speaker(self, step: int, agents: List[DialogueAgent]) -> int:
-        bids = []
-        for agent in agents:
-            bid = self.ask_for_bid(agent)
-            bids.append(bid)
+        # bids do not depend on each other, so all of them are requested at once
+        futures = [
+            self._bid_executor.submit(propagate_context(self.ask_for_bid), agent) for agent in agents
+        ]
+        bids = [future.result() for future in futures]
 
         # randomly select among multiple agents with the same bid
         max_value = np.max(bids)
         max_indices = np.where(bids == max_value)[0]
         idx = np.random.choice(max_indices)
 
-        print("Bids:")
-        for i, (bid, agent) in enumerate(zip(bids, agents)):
-            print(f"\t{agent.name} bid: {bid}")
-            if i == idx:
-                selected_name = agent.name
-        print(f"Selected: {selected_name}")
-        print("\n")
+        # a single event, a pipelined simulator emits it once the previous turn is out
+        emit(
+            BIDS,
+            step=step,
+            bids={agent.name: int(bid) for agent, bid in zip(agents, bids)},
+            selected=agents[idx].name,
+        )
         return idx
\ No newline at end of file
@@ -1,7 +1,8 @@
 from agent_interaction import AgentInteraction
 
 from langchain.schema import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+from agents.chat_model_pool import get_chat_model
+from agents.model_calls import DESCRIPTION, invoke_model
 
 class ObserverInteraction(AgentInteraction):
     def __init__(self, word_limit):
@@ -18,8 +19,8 @@ class ObserverInteraction(AgentInteraction):
                 Do not add anything else."""
             ),
         ]
-        observer_description = ChatOpenAI(temperature=1.0)(
-            observer_specifier_prompt
+        observer_description = invoke_model(
+            get_chat_model(temperature=1.0), observer_specifier_prompt, call_type=DESCRIPTION
         ).content
         return observer_description
 
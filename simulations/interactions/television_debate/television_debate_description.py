@@ -10,7 +10,8 @@ from langchain.schema import (
     SystemMessage,
 )
 
-from langchain_openai import ChatOpenAI
+from agents.chat_model_pool import get_chat_model
+from agents.model_calls import DESCRIPTION, invoke_model
 
 class TelevisionDebateDescription(AgentInteraction):
     def __init__(self, word_limit, topic, agent_summaries):
@@ -42,7 +43,7 @@ The episode features {self._agent_summary_string}."""
                 Do not add anything else."""
             ),
         ]
-        agent_description = ChatOpenAI(temperature=1.0)(agent_specifier_prompt).content
+        agent_description = invoke_model(get_chat_model(temperature=1.0), agent_specifier_prompt, call_type=DESCRIPTION).content
         return agent_description
 
     def generate_system_message(self, agent_name, agent_header):
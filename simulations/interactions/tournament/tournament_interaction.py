@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_interaction import AgentInteraction
+
+from langchain.schema import HumanMessage, SystemMessage
+
+from agents.chat_model_pool import get_chat_model
+from agents.model_calls import DESCRIPTION, invoke_model
+
+class TournamentInteraction(AgentInteraction):
+    def __init__(self, word_limit, topic):
+        self.word_limit = word_limit
+        self.topic = topic
+        self.agent_descriptor_system_message = SystemMessage(content="You can add detail to the description of the conversation participant.")
+        # the persona must not depend on the pairing, so that it can be reused in every match
+        self.conversation_description = f"""Here is the topic of a debate tournament: {topic}
+            Every participant debates one opponent at a time."""
+
+    def generate_description(self, name):
+        agent_specifier_prompt = [
+            self.agent_descriptor_system_message,
+            HumanMessage(
+                content=f"""{self.conversation_description}
+                Please reply with a creative description of {name}, in {self.word_limit} words or less. 
+                Speak directly to {name}.
+                Give them a point of view.
+                Do not add anything else."""
+            ),
+        ]
+        agent_description = invoke_model(get_chat_model(temperature=1.0), agent_specifier_prompt, call_type=DESCRIPTION).content
+        return agent_description
+
+    def generate_system_message(self, name, description):
+        return SystemMessage(
+            content=f"""{self.conversation_description}
+
+            Your name is {name}.
+
+            Your description is as follows: {description}
+
+            Your goal is to persuade your opponent of your point of view.
+            Do not say the same things over and over again.
+            Speak in the first person from the perspective of {name}.
+            Never forget to keep your response to {self.word_limit} words!
+            Do not add anything else.
+
+            Stop speaking the moment you finish speaking from your perspective.
+            """
+        )
+
+    def generate_specified_topic(self):
+        topic_specifier_prompt = [
+            SystemMessage(content="You can make a topic more specific."),
+            HumanMessage(
+                content=f"""{self.topic}
+
+                You are the moderator.
+                Please make the topic more specific.
+                Frame the topic as a single question to be answered.
+                Please reply with the specified topic in {self.word_limit} words or less. 
+                Do not add anything else."""
+            ),
+        ]
+        return invoke_model(get_chat_model(temperature=1.0), topic_specifier_prompt, call_type=DESCRIPTION).content
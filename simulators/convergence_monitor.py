@@ -0,0 +1,132 @@
+import copy
+import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+import numpy as np
+
+from agents.chat_model_pool import embed_query
+from agents.llm_call_scheduler import propagate_context
+
+# embeds the messages handed to prepare() while the simulator broadcasts them
+_embedding_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="convergence-embed")
+
+
+class ConvergenceMonitor:
+    """
+    Tracks how much every new message adds to the conversation.
+
+    A turn is considered stale when it is semantically close to one of the
+    recent messages and it either brings almost no new words or the speaker
+    did not move from their previous stance. After {patience} stale turns
+    in a row the conversation is reported as converged.
+
+    A turn is embedded as the agents store it ("{name}: {message}"), so with
+    episodic memories the vector comes from the embedding cache, and a simulator
+    calling prepare() has it requested while the message is being broadcast.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Optional[Callable[[str], List[float]]] = None,
+        window: int = 4,
+        similarity_threshold: float = 0.92,
+        novelty_threshold: float = 0.35,
+        stance_threshold: float = 0.05,
+        patience: int = 2,
+        min_turns: int = 4,
+    ) -> None:
+        self.embedding_function = embedding_function
+        self.window = window
+        self.similarity_threshold = similarity_threshold
+        self.novelty_threshold = novelty_threshold
+        self.stance_threshold = stance_threshold
+        self.patience = patience
+        self.min_turns = min_turns
+        self.reset()
+
+    def reset(self) -> None:
+        self._recent_vectors: Deque[np.ndarray] = deque(maxlen=self.window)
+        self._recent_words: Deque[Set[str]] = deque(maxlen=self.window)
+        self._last_vector_by_speaker: Dict[str, np.ndarray] = {}
+        self._stale_turns = 0
+        self.turns = 0
+        self.converged = False
+        self.last_scores: Dict[str, float] = {}
+        self._prepared: Dict[str, Future] = {}
+
+    def fork(self) -> "ConvergenceMonitor":
+        """
+        Returns a monitor that continues independently from the current state
+        """
+        child = copy.copy(self)
+        child._recent_vectors = deque(self._recent_vectors, maxlen=self.window)
+        child._recent_words = deque(self._recent_words, maxlen=self.window)
+        child._last_vector_by_speaker = dict(self._last_vector_by_speaker)
+        child.last_scores = dict(self.last_scores)
+        child._prepared = {}
+        return child
+
+    @staticmethod
+    def _turn(name: str, message: str) -> str:
+        # the text the agents append to their histories and index
+        return f"{name}: {message}"
+
+    def _embed(self, text: str) -> np.ndarray:
+        if self.embedding_function is None:
+            self.embedding_function = embed_query
+        vector = np.asarray(self.embedding_function(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def prepare(self, name: str, message: str) -> None:
+        """
+        Starts embedding the {message} spoken by {name} in the background, observe() picks it up
+        """
+        text = self._turn(name, message)
+        if text not in self._prepared:
+            self._prepared[text] = _embedding_executor.submit(propagate_context(self._embed), text)
+
+    @staticmethod
+    def _words(message: str) -> Set[str]:
+        return {word for word in re.findall(r"\w+", message.lower()) if len(word) > 3}
+
+    def observe(self, name: str, message: str) -> bool:
+        """
+        Scores the {message} spoken by {name} against the recent ones
+        and returns whether the conversation has converged
+        """
+        text = self._turn(name, message)
+        prepared = self._prepared.pop(text, None)
+        vector = prepared.result() if prepared is not None else self._embed(text)
+        words = self._words(message)
+
+        # 1. similarity to the closest of the recent messages
+        similarity = max((float(vector @ recent) for recent in self._recent_vectors), default=0.0)
+
+        # 2. share of words not used in the recent messages
+        seen_words = set().union(*self._recent_words) if self._recent_words else set()
+        novelty = len(words - seen_words) / len(words) if words else 0.0
+
+        # 3. how far the speaker moved from their previous message
+        previous = self._last_vector_by_speaker.get(name)
+        stance_change = 1.0 - float(vector @ previous) if previous is not None else 1.0
+
+        stale = similarity >= self.similarity_threshold and (
+            novelty <= self.novelty_threshold or stance_change <= self.stance_threshold
+        )
+        self._stale_turns = self._stale_turns + 1 if stale else 0
+
+        self._recent_vectors.append(vector)
+        self._recent_words.append(words)
+        self._last_vector_by_speaker[name] = vector
+        self.turns += 1
+
+        self.last_scores = {
+            "similarity": similarity,
+            "novelty": novelty,
+            "stance_change": stance_change,
+        }
+        self.converged = self.turns >= self.min_turns and self._stale_turns >= self.patience
+        return self.converged
@@ -1,24 +1,31 @@
+from agents.event_sinks import MESSAGE, RUN_FINISHED, RUN_STARTED, emit
 from simulators.dialogue_simulator import DialogueSimulator
 
 
 class DebateSimulatorWrapper:
-    def __init__(self, agents, director, selection_function):
+    def __init__(self, agents, director, selection_function, convergence_monitor=None):
         self.simulator = DialogueSimulator(
             agents=agents,
             selection_function=selection_function,
+            convergence_monitor=convergence_monitor,
         )
         self.director = director
 
     def run_simulation(self,specified_topic, max_iters=10):
         self.simulator.reset()
+        emit(
+            RUN_STARTED,
+            label=specified_topic,
+            stopping_probability=getattr(self.director, "stopping_probability", None),
+        )
         self.simulator.inject("Audience member", specified_topic)
-        print(f"(Audience member): {specified_topic}")
-        print("\n")
+        emit(MESSAGE, step=0, speaker="Audience member", message=specified_topic)
 
         n = 0
         while n < max_iters:
-            speaker = next(agent for agent in self.simulator.agents if agent.name == name)
             name, message = self.simulator.step()
-            print(f"{speaker.color}({name}): {message}\033[0m")
-            print("\n")
-            n += 1
\ No newline at end of file
+            emit(MESSAGE, step=n + 1, speaker=name, message=message)
+            if self.simulator.converged:
+                break
+            n += 1
+        emit(RUN_FINISHED, converged=self.simulator.converged)
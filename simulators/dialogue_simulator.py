@@ -1,49 +1,212 @@
-from typing import Callable, List
+import copy
+import functools
+import hashlib
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 from agents.dialogue_agent import DialogueAgent
+from agents.tracing import span
+from simulators.convergence_monitor import ConvergenceMonitor
+from simulators.side_channel import SideChannelAgent
+
+def _rebind(function: Callable, forked: Dict[int, DialogueAgent]) -> Callable:
+    # the agents bound into a partial or a bound method are replaced by their forks
+    if isinstance(function, functools.partial):
+        return functools.partial(
+            _rebind(function.func, forked),
+            *(forked.get(id(argument), argument) for argument in function.args),
+            **{name: forked.get(id(value), value) for name, value in function.keywords.items()},
+        )
+    if inspect.ismethod(function) and id(function.__self__) in forked:
+        return getattr(forked[id(function.__self__)], function.__name__)
+    return function
+
 
 class DialogueSimulator:
     def __init__(
         self,
         agents: List[DialogueAgent],
         selection_function: Callable[[int, List[DialogueAgent]], int],
+        convergence_monitor: Optional[ConvergenceMonitor] = None,
     ) -> None:
         self.agents = agents
         self._step = 0
         self.select_next_speaker = selection_function
-        self.assign_colors()
+        self.convergence_monitor = convergence_monitor
+        self.converged = False
+        self.side_channels: List[SideChannelAgent] = []
+        self._side_channel_executor: Optional[ThreadPoolExecutor] = None
+        # called with (step, name, message) for every broadcast message, they must not block
+        self.message_listeners: List[Callable[[int, str, str], None]] = []
+        # (response, whether it overran the word limit) by (transcript hash, speaker),
+        # shared with the forks once there are any
+        self.response_cache: Optional[Dict[Tuple[str, str], Tuple[str, bool]]] = None
+        self._transcript_hash = ""
+
+    def attach_side_channel(self, agent: DialogueAgent, every: int = 1) -> SideChannelAgent:
+        """
+        Lets {agent} follow the conversation without taking turns. It produces an output
+        every {every} messages on a worker pool; see merge_side_channels
+        """
+        if self._side_channel_executor is None:
+            self._side_channel_executor = ThreadPoolExecutor(
+                max_workers=4, thread_name_prefix="side-channel"
+            )
+        side_channel = SideChannelAgent(agent, self._side_channel_executor, every)
+        self.side_channels.append(side_channel)
+        return side_channel
+
+    def merge_side_channels(self, inject: bool = False) -> List[Tuple[int, str, str]]:
+        """
+        Waits for the side channels and returns their outputs as (step, name, output),
+        injecting them into the main conversation if {inject}
+        """
+        outputs = sorted(
+            (step, side_channel.name, output)
+            for side_channel in self.side_channels
+            for step, output in side_channel.collect()
+        )
+        if inject:
+            for _, name, output in outputs:
+                self.inject(name, output)
+        return outputs
+
+    def add_message_listener(self, listener: Callable[[int, str, str], None]) -> None:
+        """
+        Calls {listener} with (step, name, message) as soon as a message is broadcast,
+        e.g. ToolPrefetcher.notify; it must return without waiting for its work
+        """
+        self.message_listeners.append(listener)
+
+    def _notify_side_channels(self, name: str, message: str) -> None:
+        for side_channel in self.side_channels:
+            side_channel.notify(self._step, name, message)
+        for listener in self.message_listeners:
+            listener(self._step, name, message)
+
+    def fork(
+        self,
+        selection_function: Optional[Callable[[int, List[DialogueAgent]], int]] = None,
+    ) -> "DialogueSimulator":
+        """
+        Returns a child simulation that continues from the current state. The agents
+        share the transcript so far with the parent without copying it, and turns
+        already generated from the same state by the parent or another fork are
+        reused, except those of agents whose turns change their state (a director).
+        Agents bound into the selection function with functools.partial or as the
+        instance of a method are replaced by their forks, unless a {selection_function}
+        is given. Side channels are not forked, agents running elsewhere cannot be
+        """
+        unforkable = [agent.name for agent in self.agents if not getattr(agent, "forkable", True)]
+        if unforkable:
+            raise NotImplementedError(f"Cannot fork a simulation with remote agents: {', '.join(unforkable)}")
+        if self.response_cache is None:
+            self.response_cache = {}
+        child = copy.copy(self)
+        memo = {}
+        child.agents = [agent.fork(memo) for agent in self.agents]
+        forked = {id(agent): fork for agent, fork in zip(self.agents, child.agents)}
+        child.select_next_speaker = (
+            selection_function if selection_function is not None else _rebind(self.select_next_speaker, forked)
+        )
+        if self.convergence_monitor is not None:
+            child.convergence_monitor = self.convergence_monitor.fork()
+        child.side_channels = []
+        child.message_listeners = list(self.message_listeners)
+        child._side_channel_executor = None
+        return child
+
+    def _record(self, name: str, message: str) -> None:
+        # every message extends the hash chain that identifies the transcript
+        self._transcript_hash = hashlib.sha256(
+            f"{self._transcript_hash}\x00{name}\x00{message}".encode("utf-8")
+        ).hexdigest()
+
+    def _send(self, speaker: DialogueAgent) -> str:
+        # a turn that updates the speaker's state has to run in every branch
+        if self.response_cache is None or not getattr(speaker, "turn_is_replayable", False):
+            return speaker.send()
+        key = (self._transcript_hash, speaker.name)
+        cached = self.response_cache.get(key)
+        if cached is None:
+            overruns = speaker.overruns
+            message = speaker.send()
+            self.response_cache[key] = (message, speaker.overruns > overruns)
+            return message
+        # a replayed turn counts in the word limit report of this branch too
+        message, overran = cached
+        speaker.record_generation(overran)
+        return message
+
+    def word_limit_report(self) -> Dict[str, dict]:
+        """
+        How often every agent with a word limit overran it and had its response trimmed
+        """
+        return {
+            agent.name: {
+                "word_limit": agent.word_limit,
+                "generations": agent.generations,
+                "overruns": agent.overruns,
+                "overrun_rate": agent.overrun_rate,
+            }
+            for agent in self.agents
+            if agent.word_limit is not None
+        }
 
-    def assign_colors(self):
-        colors = ['\033[31m', '\033[32m', '\033[33m', '\033[34m', '\033[35m', '\033[36m']
-        for i, agent in enumerate(self.agents):
-            agent.color = colors[i % len(colors)]
-            
     def reset(self):
+        self._transcript_hash = ""
         for agent in self.agents:
             agent.reset()
+        for side_channel in self.side_channels:
+            side_channel.reset()
+        self.converged = False
+        if self.convergence_monitor is not None:
+            self.convergence_monitor.reset()
 
     def inject(self, name: str, message: str):
         """
         Initiates the conversation with a {message} from {name}
         """
+        if self.convergence_monitor is not None:
+            self.convergence_monitor.prepare(name, message)
         for agent in self.agents:
             agent.receive(name, message)
+        self._record(name, message)
+        self._notify_side_channels(name, message)
+
+        # the injected message seeds the window the monitor compares against
+        if self.convergence_monitor is not None:
+            self.convergence_monitor.observe(name, message)
 
         # increment time
         self._step += 1
 
     def step(self) -> tuple[str, str]:
-        # 1. choose the next speaker
-        speaker_idx = self.select_next_speaker(self._step, self.agents)
-        speaker = self.agents[speaker_idx]
+        with span("turn", step=self._step):
+            # 1. choose the next speaker
+            with span("select_speaker"):
+                speaker_idx = self.select_next_speaker(self._step, self.agents)
+            speaker = self.agents[speaker_idx]
 
-        # 2. next speaker sends message
-        message = speaker.send()
+            # 2. next speaker sends message, unless a fork already generated it
+            with span("send", agent=speaker.name):
+                message = self._send(speaker)
 
-        # 3. everyone receives message
-        for receiver in self.agents:
-            receiver.receive(speaker.name, message)
+            # 3. everyone receives message, while the convergence monitor embeds it
+            if self.convergence_monitor is not None:
+                self.convergence_monitor.prepare(speaker.name, message)
+            with span("broadcast", receivers=len(self.agents)):
+                for receiver in self.agents:
+                    receiver.receive(speaker.name, message)
+                self._record(speaker.name, message)
+                self._notify_side_channels(speaker.name, message)
 
-        # 4. increment time
-        self._step += 1
+            # 4. check whether the conversation still brings anything new
+            if self.convergence_monitor is not None:
+                with span("convergence"):
+                    self.converged = self.convergence_monitor.observe(speaker.name, message)
+
+            # 5. increment time
+            self._step += 1
 
-        return speaker.name, message
\ No newline at end of file
+        return speaker.name, message
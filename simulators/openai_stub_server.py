@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+from aiohttp import web
+
+
+class OpenAIStubServer:
+    """
+    Minimal OpenAI-compatible server for running the simulations locally.
+
+    It answers chat completions (plain or streamed) and completions (one or a list
+    of prompts, like a batching server) with a fixed reply and embeddings with
+    deterministic vectors, and counts the TCP connections it accepted and the
+    prompts per completions request, so connection reuse and batching of the
+    clients can be checked at /stats.
+
+        configure_http_pool(base_url="http://127.0.0.1:8001/v1")
+    """
+
+    def __init__(self, reply: str = "<5>", dimensions: int = 64, latency: float = 0.0) -> None:
+        self.reply = reply
+        self.dimensions = dimensions
+        self.latency = latency
+        self.requests = 0
+        self.batch_sizes = []
+        self._connections = set()
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.post("/v1/chat/completions", self.chat_completions),
+                web.post("/v1/completions", self.completions),
+                web.post("/v1/embeddings", self.embeddings),
+                web.get("/stats", self.stats),
+            ]
+        )
+        return app
+
+    def _track(self, request: web.Request) -> None:
+        self.requests += 1
+        # the client port tells the TCP connections apart
+        self._connections.add(request.transport.get_extra_info("peername"))
+
+    async def _wait(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _stream_chat_completion(self, request: web.Request, body: dict) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        reply = self.reply
+        for stop in body.get("stop") or []:
+            reply = reply.split(stop)[0]
+        # one character per chunk, like a token stream
+        for idx, character in enumerate(reply):
+            chunk = {
+                "id": f"chatcmpl-{self.requests}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": character} if idx == 0 else {"content": character},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self._track(request)
+        body = await request.json()
+        await self._wait()
+        if body.get("stream"):
+            return await self._stream_chat_completion(request, body)
+        return web.json_response(
+            {
+                "id": f"chatcmpl-{self.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": self.reply},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    async def completions(self, request: web.Request) -> web.Response:
+        self._track(request)
+        body = await request.json()
+        prompts = body["prompt"] if isinstance(body["prompt"], list) else [body["prompt"]]
+        self.batch_sizes.append(len(prompts))
+        # a batching server takes about as long for the whole list as for one prompt
+        await self._wait()
+        reply = self.reply
+        for stop in body.get("stop") or []:
+            reply = reply.split(stop)[0]
+        return web.json_response(
+            {
+                "id": f"cmpl-{self.requests}",
+                "object": "text_completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [
+                    {"index": idx, "text": reply, "logprobs": None, "finish_reason": "stop"}
+                    for idx in range(len(prompts))
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    def _vector(self, text: str) -> list:
+        digest = hashlib.sha256(text.encode()).digest()
+        return [(digest[idx % len(digest)] - 128) / 128 for idx in range(self.dimensions)]
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        self._track(request)
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await self._wait()
+        return web.json_response(
+            {
+                "object": "list",
+                "data": [
+                    {"object": "embedding", "index": idx, "embedding": self._vector(str(text))}
+                    for idx, text in enumerate(inputs)
+                ],
+                "model": body.get("model", "stub"),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Serves the stub from a daemon thread and returns its base_url, {port} 0 picks a free one
+        """
+        started = threading.Event()
+        addresses = []
+
+        def serve() -> None:
+            loop = asyncio.new_event_loop()
+            runner = web.AppRunner(self.create_app())
+            loop.run_until_complete(runner.setup())
+            site = web.TCPSite(runner, host, port)
+            loop.run_until_complete(site.start())
+            addresses.append(runner.addresses[0])
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, name="openai-stub", daemon=True).start()
+        started.wait()
+        bound_host, bound_port = addresses[0][:2]
+        return f"http://{bound_host}:{bound_port}/v1"
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "connections": len(self._connections),
+                "completion_batches": len(self.batch_sizes),
+                "completion_prompts": sum(self.batch_sizes),
+            }
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--reply", default="<5>")
+    parser.add_argument("--latency", type=float, default=0.0)
+    arguments = parser.parse_args()
+    stub = OpenAIStubServer(reply=arguments.reply, latency=arguments.latency)
+    web.run_app(stub.create_app(), host="127.0.0.1", port=arguments.port)
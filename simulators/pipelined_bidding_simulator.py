@@ -0,0 +1,128 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from agents.dialogue_agent import DialogueAgent
+from agents.event_sinks import hold_events, release_events
+from agents.llm_call_scheduler import propagate_context
+from agents.tracing import span
+from simulators.convergence_monitor import ConvergenceMonitor
+from simulators.dialogue_simulator import DialogueSimulator
+
+
+class PipelinedBiddingSimulator(DialogueSimulator):
+    """
+    DialogueSimulator for bidding scenarios that requests the bids of turn t+1
+    the moment the message of turn t is broadcast. step() returns right after
+    the broadcast, so the caller prints the message while the bids are in flight.
+    The events of the bidding (the bids, ...) are held back and emitted by step()
+    once the bids are picked up, so they follow the message they answer.
+    With {max_turns} set, no bids are requested after the last turn. Use it as a
+    context manager or call close() to stop its bidding thread.
+    """
+
+    def __init__(
+        self,
+        agents: List[DialogueAgent],
+        selection_function: Callable[[int, List[DialogueAgent]], int],
+        convergence_monitor: Optional[ConvergenceMonitor] = None,
+        max_turns: Optional[int] = None,
+    ) -> None:
+        super().__init__(agents, selection_function, convergence_monitor)
+        self.max_turns = max_turns
+        self._turns = 0
+        self._selection_executor = ThreadPoolExecutor(max_workers=1)
+        self._next_speaker: Optional[Future] = None
+
+    def __enter__(self) -> "PipelinedBiddingSimulator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Drops the bids in flight and stops the bidding thread
+        """
+        self._discard_selection()
+        self._selection_executor.shutdown(wait=True)
+
+    @property
+    def finished(self) -> bool:
+        return self.converged or (self.max_turns is not None and self._turns >= self.max_turns)
+
+    def _select_next_speaker(self, step: int, agents: List[DialogueAgent]) -> Tuple[int, List[dict]]:
+        with span("select_speaker", step=step), hold_events() as events:
+            return self.select_next_speaker(step, agents), events
+
+    def _schedule_selection(self) -> None:
+        self._next_speaker = self._selection_executor.submit(
+            propagate_context(self._select_next_speaker), self._step, self.agents
+        )
+
+    def _discard_selection(self) -> None:
+        if self._next_speaker is not None:
+            # a bidding that already started is waited for, it reads the histories
+            if not self._next_speaker.cancel():
+                self._next_speaker.exception()
+            self._next_speaker = None
+
+    def fork(
+        self,
+        selection_function: Optional[Callable[[int, List[DialogueAgent]], int]] = None,
+    ) -> "PipelinedBiddingSimulator":
+        # the bids in flight belong to the parent, the fork bids with its own agents
+        child = super().fork(selection_function)
+        child._selection_executor = ThreadPoolExecutor(max_workers=1)
+        child._next_speaker = None
+        return child
+
+    def reset(self):
+        self._discard_selection()
+        super().reset()
+        self._turns = 0
+
+    def inject(self, name: str, message: str):
+        # the bids in flight did not see the injected message
+        self._discard_selection()
+        super().inject(name, message)
+        self._schedule_selection()
+
+    def step(self) -> tuple[str, str]:
+        with span("turn", step=self._step):
+            # 1. pick up the bids requested when the previous message arrived, their
+            # events go out from this thread, after the ones of the previous turn
+            if self._next_speaker is None:
+                self._schedule_selection()
+            with span("wait_for_selection"):
+                speaker_idx, events = self._next_speaker.result()
+            self._next_speaker = None
+            release_events(events)
+            speaker = self.agents[speaker_idx]
+
+            # 2. next speaker sends message, unless a fork already generated it
+            with span("send", agent=speaker.name):
+                message = self._send(speaker)
+
+            # 3. everyone receives message, while the convergence monitor embeds it
+            if self.convergence_monitor is not None:
+                self.convergence_monitor.prepare(speaker.name, message)
+            with span("broadcast", receivers=len(self.agents)):
+                for receiver in self.agents:
+                    receiver.receive(speaker.name, message)
+                self._record(speaker.name, message)
+                self._notify_side_channels(speaker.name, message)
+
+            # 4. check whether the conversation still brings anything new
+            if self.convergence_monitor is not None:
+                with span("convergence"):
+                    self.converged = self.convergence_monitor.observe(speaker.name, message)
+
+            # 5. increment time
+            self._step += 1
+            self._turns += 1
+
+            # 6. bid for the next turn while the caller handles this one, unless there is none
+            if not self.finished:
+                self._schedule_selection()
+
+        return speaker.name, message
@@ -0,0 +1,167 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from agents.dialogue_agent import DialogueAgent
+from agents.llm_call_scheduler import propagate_context
+from agents.tracing import span
+from simulators.convergence_monitor import ConvergenceMonitor
+
+
+class Room:
+    """
+    A conversation between the {members} of a room, with its own speaking order
+    """
+
+    def __init__(
+        self,
+        name: str,
+        members: List[DialogueAgent],
+        selection_function: Callable[[int, List[DialogueAgent]], int],
+        convergence_monitor: Optional[ConvergenceMonitor] = None,
+    ) -> None:
+        self.name = name
+        self.members = list(members)
+        self.select_next_speaker = selection_function
+        self.convergence_monitor = convergence_monitor
+        self.converged = False
+        self._step = 0
+
+
+class RoomSimulator:
+    """
+    Simulation of a large population split into rooms.
+
+    A message is delivered only to the members of the room it was spoken in
+    and to the agents following its speaker, so the cost of a turn depends
+    on the size of the room and not on the population. Independent rooms are
+    stepped concurrently; an agent in several rooms receives one message at a time.
+    """
+
+    def __init__(self, max_workers: int = 8) -> None:
+        self.rooms: Dict[str, Room] = {}
+        self.agents: Dict[str, DialogueAgent] = {}
+        # speaker name -> names of the agents that receive everything they say
+        self.followers: Dict[str, Set[str]] = {}
+        self._agent_locks: Dict[str, threading.Lock] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="room")
+
+    def _register(self, agent: DialogueAgent) -> None:
+        if agent.name not in self.agents:
+            self.agents[agent.name] = agent
+            self._agent_locks[agent.name] = threading.Lock()
+
+    def add_room(
+        self,
+        name: str,
+        members: List[DialogueAgent],
+        selection_function: Callable[[int, List[DialogueAgent]], int],
+        convergence_monitor: Optional[ConvergenceMonitor] = None,
+    ) -> Room:
+        for agent in members:
+            self._register(agent)
+        room = Room(name, members, selection_function, convergence_monitor)
+        self.rooms[name] = room
+        return room
+
+    def join(self, room_name: str, agent: DialogueAgent) -> None:
+        self._register(agent)
+        room = self.rooms[room_name]
+        if agent not in room.members:
+            room.members.append(agent)
+
+    def leave(self, room_name: str, agent: DialogueAgent) -> None:
+        room = self.rooms[room_name]
+        if agent in room.members:
+            room.members.remove(agent)
+
+    def follow(self, follower: DialogueAgent, speaker_name: str) -> None:
+        """
+        Makes {follower} receive every message of {speaker_name}, in any room
+        """
+        self._register(follower)
+        self.followers.setdefault(speaker_name, set()).add(follower.name)
+
+    def unfollow(self, follower: DialogueAgent, speaker_name: str) -> None:
+        self.followers.get(speaker_name, set()).discard(follower.name)
+
+    def reset(self) -> None:
+        for agent in self.agents.values():
+            agent.reset()
+        for room in self.rooms.values():
+            room.converged = False
+            room._step = 0
+            if room.convergence_monitor is not None:
+                room.convergence_monitor.reset()
+
+    def _deliver(self, room: Room, name: str, message: str) -> None:
+        # 1. the members of the room
+        delivered = set()
+        for agent in room.members:
+            with self._agent_locks[agent.name]:
+                agent.receive(name, message)
+            delivered.add(agent.name)
+
+        # 2. the followers outside of the room learn where it was said
+        for follower_name in self.followers.get(name, ()):
+            if follower_name in delivered or follower_name == name:
+                continue
+            with self._agent_locks[follower_name]:
+                self.agents[follower_name].receive(f"{name} (in {room.name})", message)
+
+    def inject(self, room_name: str, name: str, message: str) -> None:
+        """
+        Initiates the conversation of {room_name} with a {message} from {name}
+        """
+        room = self.rooms[room_name]
+        if room.convergence_monitor is not None:
+            room.convergence_monitor.prepare(name, message)
+        self._deliver(room, name, message)
+        if room.convergence_monitor is not None:
+            room.convergence_monitor.observe(name, message)
+        room._step += 1
+
+    def step_room(self, room_name: str) -> Tuple[str, str]:
+        room = self.rooms[room_name]
+        with span("turn", step=room._step, room=room_name):
+            return self._step_room(room)
+
+    def _step_room(self, room: Room) -> Tuple[str, str]:
+        # 1. choose the next speaker among the members
+        with span("select_speaker"):
+            speaker = room.members[room.select_next_speaker(room._step, room.members)]
+
+        # 2. next speaker sends message
+        with span("send", agent=speaker.name), self._agent_locks[speaker.name]:
+            message = speaker.send()
+
+        # 3. the room and the followers of the speaker receive it, while the convergence monitor embeds it
+        if room.convergence_monitor is not None:
+            room.convergence_monitor.prepare(speaker.name, message)
+        with span("broadcast"):
+            self._deliver(room, speaker.name, message)
+
+        # 4. check whether the room still brings anything new
+        if room.convergence_monitor is not None:
+            room.converged = room.convergence_monitor.observe(speaker.name, message)
+
+        # 5. increment time
+        room._step += 1
+
+        return speaker.name, message
+
+    def step(self, room_names: Optional[List[str]] = None) -> Dict[str, Tuple[str, str]]:
+        """
+        Steps {room_names} (every room that has not converged by default) concurrently
+        and returns the (name, message) spoken in each of them
+        """
+        if room_names is None:
+            room_names = [name for name, room in self.rooms.items() if not room.converged and room.members]
+        futures = {
+            name: self._executor.submit(propagate_context(self.step_room), name) for name in room_names
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    @property
+    def converged(self) -> bool:
+        return all(room.converged for room in self.rooms.values())
@@ -0,0 +1,122 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from simulators.dialogue_simulator import DialogueSimulator
+
+
+class SessionPoolFull(Exception):
+    pass
+
+
+class SimulationSession:
+    """
+    A live simulator together with its transcript and the queues of the
+    clients watching it. All fields are touched from the event loop only.
+    """
+
+    def __init__(self, simulator: DialogueSimulator, max_iters: int) -> None:
+        self.id = uuid.uuid4().hex
+        self.simulator = simulator
+        self.max_iters = max_iters
+        self.transcript: List[dict] = []
+        self.subscribers: List[asyncio.Queue] = []
+        # only one step of a simulation may run at a time
+        self.lock = asyncio.Lock()
+        self.runner: Optional[asyncio.Task] = None
+        self.finished = False
+        self.touch()
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked() or (self.runner is not None and not self.runner.done())
+
+    def publish(self, event: dict) -> None:
+        self.transcript.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def fail(self, error: BaseException) -> None:
+        """
+        Ends the simulation after {error}, the watching clients get an error event and the end of the stream
+        """
+        self.finished = True
+        self.publish({"event": "error", "error": f"{type(error).__name__}: {error}"})
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+
+    def close(self) -> None:
+        if self.runner is not None:
+            self.runner.cancel()
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+
+
+class SessionPool:
+    """
+    Bounded pool of live simulation sessions. Sessions idle for longer than
+    {idle_timeout} seconds are evicted; when the pool is full the least
+    recently used idle session makes room for a new one.
+    """
+
+    def __init__(self, max_sessions: int = 500, idle_timeout: float = 900.0) -> None:
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, SimulationSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def has_room(self) -> bool:
+        """
+        Whether a session can be added, evicting an idle one if needed
+        """
+        return len(self._sessions) < self.max_sessions or self._evict_one()
+
+    def add(self, session: SimulationSession) -> SimulationSession:
+        if len(self._sessions) >= self.max_sessions and not self._evict_one():
+            raise SessionPoolFull(f"All {self.max_sessions} sessions are busy")
+        self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> SimulationSession:
+        session = self._sessions[session_id]
+        self._sessions.move_to_end(session_id)
+        session.touch()
+        return session
+
+    def remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+
+    def _evict_one(self) -> bool:
+        for session_id, session in self._sessions.items():
+            if not session.busy and not session.subscribers:
+                self.remove(session_id)
+                return True
+        return False
+
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        expired = [
+            session_id
+            for session_id, session in self._sessions.items()
+            if not session.busy and now - session.last_used > self.idle_timeout
+        ]
+        for session_id in expired:
+            self.remove(session_id)
+        return len(expired)
+
+    async def run_eviction(self, interval: float = 30.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    def sessions(self) -> Dict[str, SimulationSession]:
+        return dict(self._sessions)
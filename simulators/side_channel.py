@@ -0,0 +1,86 @@
+import threading
+from collections import deque
+from concurrent.futures import Executor
+from typing import Deque, List, Tuple
+
+from agents.dialogue_agent import DialogueAgent
+from agents.llm_call_scheduler import propagate_context
+
+
+class SideChannelAgent:
+    """
+    Passive agent (observer, judge, summarizer) that follows the transcript
+    without taking turns in the speaking order.
+
+    Messages are handed over without blocking the caller and processed in
+    order on a worker pool; every {every} messages the agent produces an
+    output that is kept until the simulator merges it back.
+    """
+
+    def __init__(self, agent: DialogueAgent, executor: Executor, every: int = 1) -> None:
+        self.agent = agent
+        self.executor = executor
+        self.every = every
+        self._lock = threading.Lock()
+        self._pending: Deque[Tuple[int, str, str]] = deque()
+        self._draining = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self.reset()
+
+    @property
+    def name(self) -> str:
+        return self.agent.name
+
+    def reset(self) -> None:
+        self.wait()
+        self.agent.reset()
+        self._received = 0
+        self.outputs: List[Tuple[int, str]] = []
+
+    def notify(self, step: int, name: str, message: str) -> None:
+        """
+        Hands over {message} spoken by {name} at {step}, returns immediately
+        """
+        with self._lock:
+            self._pending.append((step, name, message))
+            if self._draining:
+                return
+            self._draining = True
+            self._idle.clear()
+        self.executor.submit(propagate_context(self._drain))
+
+    def _drain(self) -> None:
+        # a single drain runs per agent at a time, so its history is never touched concurrently
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._draining = False
+                    self._idle.set()
+                    return
+                step, name, message = self._pending.popleft()
+            try:
+                self.agent.receive(name, message)
+                self._received += 1
+                if self._received % self.every == 0:
+                    output = self.agent.send()
+                    with self._lock:
+                        self.outputs.append((step, output))
+            except Exception as error:
+                print(f"{self.agent.name} side channel failed at step {step}: {error}")
+
+    def wait(self) -> None:
+        """
+        Blocks until every handed over message has been processed
+        """
+        self._idle.wait()
+
+    def collect(self, wait: bool = True) -> List[Tuple[int, str]]:
+        """
+        Returns and forgets the outputs produced so far
+        """
+        if wait:
+            self.wait()
+        with self._lock:
+            outputs, self.outputs = self.outputs, []
+        return outputs
@@ -0,0 +1,237 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from aiohttp import web
+
+from agents.llm_call_scheduler import (
+    INTERACTIVE,
+    LLMCallScheduler,
+    propagate_context,
+    simulation_context,
+)
+from agents.model_calls import get_call_scheduler, install_call_scheduler
+from simulators.session_pool import SessionPool, SessionPoolFull, SimulationSession
+from simulators.tournament_runner import TournamentRunner
+
+
+def _scenario_settings(config: dict) -> dict:
+    # max_iters is a setting of the session, not of the scenario
+    return {key: value for key, value in config.items() if key != "max_iters"}
+
+
+class SimulationService:
+    """
+    Async HTTP front of the simulators.
+
+        POST   /simulations                 create a simulation from a scenario config
+        POST   /simulations/{id}/step       run one turn and return it
+        POST   /simulations/{id}/run        run up to max_iters turns in the background
+        GET    /simulations/{id}/events     stream the turns as server-sent events
+        GET    /simulations/{id}            transcript and state
+        DELETE /simulations/{id}            close the simulation
+        GET    /metrics/queue-wait          queue-wait histograms of the LLM call scheduler
+
+    Sessions do not own a thread. The blocking model calls of a step run on
+    one bounded executor shared by every session, everything else happens
+    on the event loop.
+    """
+
+    def __init__(
+        self,
+        runner: TournamentRunner,
+        max_sessions: int = 500,
+        idle_timeout: float = 900.0,
+        max_concurrent_steps: int = 64,
+    ) -> None:
+        self.runner = runner
+        self.pool = SessionPool(max_sessions=max_sessions, idle_timeout=idle_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_steps)
+        self._eviction: Optional[asyncio.Task] = None
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.post("/simulations", self.create_simulation),
+                web.get("/simulations/{id}", self.get_simulation),
+                web.delete("/simulations/{id}", self.delete_simulation),
+                web.post("/simulations/{id}/step", self.step_simulation),
+                web.post("/simulations/{id}/run", self.run_simulation),
+                web.get("/simulations/{id}/events", self.stream_events),
+                web.get("/metrics/queue-wait", self.queue_wait),
+            ]
+        )
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self._eviction = asyncio.create_task(self.pool.run_eviction())
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        if self._eviction is not None:
+            self._eviction.cancel()
+        for session_id in list(self.pool.sessions()):
+            self.pool.remove(session_id)
+        self._executor.shutdown(wait=False)
+
+    async def _blocking(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, propagate_context(function), *args
+        )
+
+    def _session(self, request: web.Request) -> SimulationSession:
+        try:
+            return self.pool.get(request.match_info["id"])
+        except KeyError:
+            raise web.HTTPNotFound(text="Unknown simulation")
+
+    async def create_simulation(self, request: web.Request) -> web.Response:
+        config = await request.json()
+        if not config.get("topic") or len(config.get("contestants", [])) < 2:
+            raise web.HTTPBadRequest(text="A scenario needs a topic and at least two contestants")
+        config.setdefault("name", config["topic"])
+        # the personas are generated before the session is added, so the capacity is checked first
+        if not self.pool.has_room():
+            raise web.HTTPServiceUnavailable(text=f"All {self.pool.max_sessions} sessions are busy")
+        # personas of a scenario seen before are reused, a different config needs another name
+        known = self.runner.scenarios.setdefault(config["name"], config)
+        if _scenario_settings(known) != _scenario_settings(config):
+            raise web.HTTPConflict(text=f"A scenario named {config['name']!r} exists with a different config")
+
+        contestants = tuple(config["contestants"])
+        with simulation_context(config["name"], INTERACTIVE):
+            simulator = await self._blocking(self.runner.build_simulator, config["name"], contestants)
+            specified_topic = await self._blocking(self.runner.specified_topic, config["name"])
+            # injecting embeds the topic, so it stays off the event loop too
+            await self._blocking(simulator.reset)
+            await self._blocking(simulator.inject, "Moderator", specified_topic)
+
+        try:
+            session = self.pool.add(SimulationSession(simulator, config.get("max_iters", 6)))
+        except SessionPoolFull as error:
+            raise web.HTTPServiceUnavailable(text=str(error))
+        session.publish({"turn": 0, "name": "Moderator", "message": specified_topic})
+        return web.json_response({"id": session.id, "topic": specified_topic}, status=201)
+
+    async def get_simulation(self, request: web.Request) -> web.Response:
+        session = self._session(request)
+        return web.json_response(
+            {
+                "id": session.id,
+                "transcript": session.transcript,
+                "finished": session.finished,
+                "running": session.busy,
+            }
+        )
+
+    async def delete_simulation(self, request: web.Request) -> web.Response:
+        self._session(request)
+        self.pool.remove(request.match_info["id"])
+        return web.Response(status=204)
+
+    async def _step(self, session: SimulationSession) -> Optional[dict]:
+        """
+        Runs one turn, returns None when the simulation had already finished
+        """
+        async with session.lock:
+            # checked under the lock, concurrent steps never run past max_iters
+            if session.finished:
+                return None
+            try:
+                # calls of the web sessions are served before the batch ones
+                with simulation_context(session.id, INTERACTIVE):
+                    name, message = await self._blocking(session.simulator.step)
+            except Exception as error:
+                session.fail(error)
+                raise
+        session.touch()
+        event = {"turn": len(session.transcript), "name": name, "message": message}
+        session.publish(event)
+        if session.simulator.converged or len(session.transcript) > session.max_iters:
+            session.finished = True
+            session.publish({"event": "finished", "converged": session.simulator.converged})
+        return event
+
+    async def step_simulation(self, request: web.Request) -> web.Response:
+        session = self._session(request)
+        try:
+            event = await self._step(session)
+        except Exception as error:
+            raise web.HTTPBadGateway(text=f"The turn failed: {type(error).__name__}: {error}")
+        if event is None:
+            raise web.HTTPConflict(text="The simulation has finished")
+        return web.json_response(event)
+
+    async def _run(self, session: SimulationSession) -> None:
+        try:
+            while await self._step(session) is not None and not session.finished:
+                pass
+        except Exception as error:
+            # the session has published the error and ended the streams
+            print(f"Simulation {session.id} failed: {type(error).__name__}: {error}")
+
+    async def run_simulation(self, request: web.Request) -> web.Response:
+        session = self._session(request)
+        if session.runner is None or session.runner.done():
+            session.runner = asyncio.create_task(self._run(session))
+        return web.json_response({"id": session.id, "running": True}, status=202)
+
+    async def stream_events(self, request: web.Request) -> web.StreamResponse:
+        session = self._session(request)
+        response = web.StreamResponse(
+            headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+                "Connection": "keep-alive",
+            }
+        )
+        await response.prepare(request)
+
+        # replay what happened so far, then follow the live turns
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in session.transcript:
+            queue.put_nowait(event)
+        if session.finished:
+            queue.put_nowait(None)
+        session.subscribers.append(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+                if event.get("event") == "finished":
+                    break
+        finally:
+            session.subscribers.remove(queue)
+        return response
+
+    async def queue_wait(self, request: web.Request) -> web.Response:
+        scheduler = get_call_scheduler()
+        if scheduler is None:
+            raise web.HTTPNotFound(text="No LLM call scheduler is installed")
+        return web.json_response(
+            {
+                "histogram": {
+                    name: [[bound if bound != float("inf") else "inf", count] for bound, count in buckets]
+                    for name, buckets in scheduler.queue_wait_histogram().items()
+                },
+                "interactive_p99": scheduler.queue_wait_quantile(INTERACTIVE, 0.99),
+                "queued": scheduler.queued(),
+            }
+        )
+
+
+def run_service(
+    runner: TournamentRunner,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    scheduler: Optional[LLMCallScheduler] = None,
+    **kwargs,
+) -> None:
+    if scheduler is not None:
+        install_call_scheduler(scheduler)
+    web.run_app(SimulationService(runner, **kwargs).create_app(), host=host, port=port)
@@ -0,0 +1,132 @@
+import itertools
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain.schema import SystemMessage
+
+from agents.chat_model_pool import get_chat_model
+from agents.dialogue_agent import DialogueAgent
+from agents.llm_call_scheduler import BATCH, simulation_context
+from simulators.convergence_monitor import ConvergenceMonitor
+from simulators.dialogue_simulator import DialogueSimulator
+from simulators.select_alternately import select_next_speaker_alternately
+
+
+class TournamentRunner:
+    """
+    Runs many debates in one long-lived process.
+
+    Scenario definitions are loaded once. Model clients and embeddings come
+    from the process-wide pools, knowledge stores from the vector store
+    registry, and persona descriptions and specified topics are generated
+    once per scenario and reused by every match.
+
+    A scenario is a dict with the keys:
+        name, topic, contestants, and optionally word_limit (50),
+        max_iters (6), model_name ("gpt-3.5-turbo"), temperature (0.2)
+        and knowledge_corpus (name of a corpus in the vector store registry).
+    """
+
+    def __init__(self, scenarios: Iterable[dict], interaction_class) -> None:
+        self.scenarios: Dict[str, dict] = {scenario["name"]: scenario for scenario in scenarios}
+        self.interaction_class = interaction_class
+        self._interactions: Dict[str, object] = {}
+        self._system_messages: Dict[Tuple[str, str], SystemMessage] = {}
+        self._specified_topics: Dict[str, str] = {}
+        self.results: List[dict] = []
+
+    def _interaction(self, scenario: dict):
+        if scenario["name"] not in self._interactions:
+            self._interactions[scenario["name"]] = self.interaction_class(
+                scenario.get("word_limit", 50), scenario["topic"]
+            )
+        return self._interactions[scenario["name"]]
+
+    def system_message(self, scenario_name: str, contestant: str) -> SystemMessage:
+        """
+        Persona of {contestant} in {scenario_name}, generated on first use only
+        """
+        key = (scenario_name, contestant)
+        if key not in self._system_messages:
+            interaction = self._interaction(self.scenarios[scenario_name])
+            description = interaction.generate_description(contestant)
+            self._system_messages[key] = interaction.generate_system_message(contestant, description)
+        return self._system_messages[key]
+
+    def specified_topic(self, scenario_name: str) -> str:
+        if scenario_name not in self._specified_topics:
+            interaction = self._interaction(self.scenarios[scenario_name])
+            self._specified_topics[scenario_name] = interaction.generate_specified_topic()
+        return self._specified_topics[scenario_name]
+
+    def _build_agent(self, scenario: dict, contestant: str) -> DialogueAgent:
+        agent = DialogueAgent(
+            name=contestant,
+            system_message=self.system_message(scenario["name"], contestant),
+            model=get_chat_model(
+                model_name=scenario.get("model_name", "gpt-3.5-turbo"),
+                temperature=scenario.get("temperature", 0.2),
+            ),
+            word_limit=scenario.get("word_limit", 50),
+        )
+        if scenario.get("knowledge_corpus") is not None:
+            agent.attach_knowledge_store(scenario["knowledge_corpus"])
+        return agent
+
+    def build_simulator(self, scenario_name: str, contestants: Tuple[str, ...]) -> DialogueSimulator:
+        """
+        Fresh simulator for {contestants} built from the shared artifacts of {scenario_name}
+        """
+        scenario = self.scenarios[scenario_name]
+        agents = [self._build_agent(scenario, contestant) for contestant in contestants]
+        return DialogueSimulator(
+            agents=agents,
+            selection_function=select_next_speaker_alternately,
+            convergence_monitor=ConvergenceMonitor(),
+        )
+
+    def run_match(self, scenario_name: str, contestants: Tuple[str, ...]) -> dict:
+        """
+        Runs a single debate between {contestants} and records its transcript
+        """
+        scenario = self.scenarios[scenario_name]
+        started = time.perf_counter()
+        # tournament matches are batch work for the LLM call scheduler
+        with simulation_context(f"{scenario_name}: {' vs '.join(contestants)}", BATCH):
+            simulator = self.build_simulator(scenario_name, contestants)
+            specified_topic = self.specified_topic(scenario_name)
+            simulator.reset()
+            simulator.inject("Moderator", specified_topic)
+
+            transcript = [("Moderator", specified_topic)]
+            for _ in range(scenario.get("max_iters", 6)):
+                transcript.append(simulator.step())
+                if simulator.converged:
+                    break
+
+        result = {
+            "scenario": scenario_name,
+            "contestants": contestants,
+            "transcript": transcript,
+            "converged": simulator.converged,
+            "word_limits": simulator.word_limit_report(),
+            "duration": time.perf_counter() - started,
+        }
+        self.results.append(result)
+        return result
+
+    def round_robin(self, scenario_name: str, group_size: int = 2) -> List[dict]:
+        """
+        Plays every combination of {group_size} contestants of {scenario_name} once
+        """
+        contestants = self.scenarios[scenario_name]["contestants"]
+        return [
+            self.run_match(scenario_name, pairing)
+            for pairing in itertools.combinations(contestants, group_size)
+        ]
+
+    def run_all(self, scenario_names: Optional[List[str]] = None) -> List[dict]:
+        results = []
+        for scenario_name in scenario_names or list(self.scenarios):
+            results.extend(self.round_robin(scenario_name))
+        return results
@@ -0,0 +1,303 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from agents.event_sinks import (
+    BIDS,
+    MESSAGE,
+    NEXT_SPEAKER,
+    RUN_FINISHED,
+    RUN_STARTED,
+    STOP_DECISION,
+    EventSink,
+)
+from agents.token_counter import count_tokens
+
+# one row per turn; speaker and next_speaker are ids in the string dictionary,
+# bid is NaN and next_speaker/stop are -1 when the turn had none
+TURN_COLUMNS = {
+    "run": np.int32,
+    "step": np.int32,
+    "speaker": np.int32,
+    "tokens": np.int32,
+    "duration": np.float32,
+    "bid": np.float32,
+    "next_speaker": np.int32,
+    "stop": np.int8,
+}
+# one row per run; label is an id in the string dictionary
+RUN_COLUMNS = {
+    "run": np.int32,
+    "label": np.int32,
+    "turns": np.int32,
+    "stopping_probability": np.float32,
+    "converged": np.int8,
+    "duration": np.float32,
+}
+_STRING_COLUMNS = {"speaker", "next_speaker", "label"}
+
+
+def _write_json(path: str, content) -> None:
+    # readers never see a half written file
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(content, file)
+    os.replace(path + ".tmp", path)
+
+
+class TranscriptArchive:
+    """
+    Append-only columnar archive of finished runs in {directory}.
+
+    Turns and runs are buffered and written as segments of one .npy file per
+    column once {segment_turns} turns are buffered or on flush(). Strings
+    (speakers, run labels) are stored once in a dictionary and referenced by id.
+    """
+
+    def __init__(self, directory: str, segment_turns: int = 65536) -> None:
+        self.directory = directory
+        self.segment_turns = segment_turns
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        meta = {"segments": 0, "runs": 0, "strings": []}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as file:
+                meta = json.load(file)
+        self._segments = meta["segments"]
+        self._next_run = meta["runs"]
+        self._strings: List[str] = meta["strings"]
+        self._ids = {string: idx for idx, string in enumerate(self._strings)}
+        self._reset_buffers()
+
+    def _reset_buffers(self) -> None:
+        self._turns: Dict[str, list] = {column: [] for column in TURN_COLUMNS}
+        self._runs: Dict[str, list] = {column: [] for column in RUN_COLUMNS}
+
+    def intern(self, string: Optional[str]) -> int:
+        if string is None:
+            return -1
+        if string not in self._ids:
+            self._ids[string] = len(self._strings)
+            self._strings.append(string)
+        return self._ids[string]
+
+    def append_run(
+        self,
+        label: str,
+        turns: List[dict],
+        stopping_probability: Optional[float] = None,
+        converged: bool = False,
+    ) -> int:
+        """
+        Adds a finished run. Every turn is a dict with speaker and optionally
+        tokens, duration, bid, next_speaker and stop. Returns the run id
+        """
+        run = self._next_run
+        self._next_run += 1
+        for step, turn in enumerate(turns):
+            stop = turn.get("stop")
+            row = {
+                "run": run,
+                "step": step,
+                "speaker": self.intern(turn["speaker"]),
+                "tokens": turn.get("tokens", 0),
+                "duration": turn.get("duration", 0.0),
+                "bid": np.nan if turn.get("bid") is None else turn["bid"],
+                "next_speaker": self.intern(turn.get("next_speaker")),
+                "stop": -1 if stop is None else int(stop),
+            }
+            for column, value in row.items():
+                self._turns[column].append(value)
+
+        run_row = {
+            "run": run,
+            "label": self.intern(label),
+            "turns": len(turns),
+            "stopping_probability": np.nan if stopping_probability is None else stopping_probability,
+            "converged": int(converged),
+            "duration": sum(turn.get("duration", 0.0) for turn in turns),
+        }
+        for column, value in run_row.items():
+            self._runs[column].append(value)
+
+        if len(self._turns["run"]) >= self.segment_turns:
+            self.flush()
+        return run
+
+    def flush(self) -> None:
+        """
+        Writes the buffered runs as a new segment
+        """
+        if not self._runs["run"]:
+            return
+        segment = os.path.join(self.directory, f"segment-{self._segments:05d}")
+        os.makedirs(segment, exist_ok=True)
+        for table, columns, buffers in (
+            ("turns", TURN_COLUMNS, self._turns),
+            ("runs", RUN_COLUMNS, self._runs),
+        ):
+            for column, dtype in columns.items():
+                np.save(os.path.join(segment, f"{table}.{column}.npy"), np.asarray(buffers[column], dtype=dtype))
+        self._segments += 1
+        _write_json(
+            os.path.join(self.directory, "meta.json"),
+            {"segments": self._segments, "runs": self._next_run, "strings": self._strings},
+        )
+        self._reset_buffers()
+
+    def query(self) -> "ArchiveQuery":
+        self.flush()
+        return ArchiveQuery(self.directory)
+
+
+class ArchiveQuery:
+    """
+    Read-only view of an archive; columns are memory-mapped and concatenated
+    across segments on first use, aggregates run on whole columns
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as file:
+            meta = json.load(file)
+        self.segments = meta["segments"]
+        self.strings: List[str] = meta["strings"]
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def column(self, table: str, column: str) -> np.ndarray:
+        """
+        All the values of {table}.{column} ("turns" or "runs")
+        """
+        key = f"{table}.{column}"
+        if key not in self._columns:
+            parts = [
+                np.load(os.path.join(self.directory, f"segment-{idx:05d}", f"{key}.npy"), mmap_mode="r")
+                for idx in range(self.segments)
+            ]
+            columns = TURN_COLUMNS if table == "turns" else RUN_COLUMNS
+            if not parts:
+                self._columns[key] = np.empty(0, dtype=columns[column])
+            else:
+                self._columns[key] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        return self._columns[key]
+
+    def _names(self, ids: np.ndarray) -> List[str]:
+        return [self.strings[idx] for idx in ids]
+
+    def _group_keys(self, groups: np.ndarray, by: str) -> list:
+        if by in _STRING_COLUMNS:
+            return self._names(groups)
+        if groups.dtype.kind == "f":
+            # float32 keys read back as 0.2 rather than 0.20000000298023224
+            return [float(str(key)) for key in groups]
+        return groups.tolist()
+
+    def mean_by(self, table: str, value: str, by: str) -> Dict:
+        """
+        Mean of {value} for every distinct {by}, NaN values and missing keys are left out
+        """
+        values = np.asarray(self.column(table, value), dtype=np.float64)
+        keys = np.asarray(self.column(table, by))
+        present = ~np.isnan(values)
+        if keys.dtype.kind == "f":
+            present &= ~np.isnan(keys)
+        if by in _STRING_COLUMNS:
+            present &= keys >= 0
+        groups, inverse = np.unique(keys[present], return_inverse=True)
+        sums = np.bincount(inverse, weights=values[present], minlength=len(groups))
+        counts = np.bincount(inverse, minlength=len(groups))
+        return dict(zip(self._group_keys(groups, by), (sums / counts).tolist()))
+
+    def count_by(self, table: str, by: str) -> Dict:
+        keys = np.asarray(self.column(table, by))
+        if by in _STRING_COLUMNS:
+            keys = keys[keys >= 0]
+        groups, counts = np.unique(keys, return_counts=True)
+        return dict(zip(self._group_keys(groups, by), counts.tolist()))
+
+    def average_bid_by_speaker(self) -> Dict[str, float]:
+        return self.mean_by("turns", "bid", "speaker")
+
+    def turns_by_stopping_probability(self) -> Dict[float, float]:
+        """
+        Average number of turns before termination for every stopping probability
+        """
+        return self.mean_by("runs", "turns", "stopping_probability")
+
+    def next_speaker_counts(self) -> Dict[str, int]:
+        """
+        How often the director picked every speaker
+        """
+        return self.count_by("turns", "next_speaker")
+
+
+class ArchiveSink(EventSink):
+    """
+    Builds the rows of the archive from the simulation events, between a
+    run_started and a run_finished event; bids and director decisions are
+    attached to the message that follows them
+    """
+
+    def __init__(self, archive: TranscriptArchive) -> None:
+        self.archive = archive
+        self._run: Optional[dict] = None
+        self._pending: dict = {}
+        # bids by the step they were made for, a pipelined bidding runs ahead of the messages
+        self._bids: Dict[int, dict] = {}
+
+    def _start(self, event: dict) -> None:
+        self._run = {
+            "label": event.get("label", "run"),
+            "stopping_probability": event.get("stopping_probability"),
+            "turns": [],
+            "last_time": event["time"],
+        }
+        self._pending = {}
+        self._bids = {}
+
+    def _finish(self, converged: bool = False) -> None:
+        if self._run is None:
+            return
+        run, self._run = self._run, None
+        self.archive.append_run(
+            run["label"], run["turns"], run["stopping_probability"], converged
+        )
+
+    def emit(self, event: dict) -> None:
+        event_type = event["type"]
+        if event_type == RUN_STARTED:
+            self._finish()
+            self._start(event)
+        elif event_type == RUN_FINISHED:
+            self._finish(event.get("converged", False))
+        elif event_type == BIDS:
+            self._bids[event.get("step")] = event["bids"]
+        elif event_type == STOP_DECISION:
+            self._pending["stop"] = event["stop"]
+        elif event_type == NEXT_SPEAKER:
+            self._pending["next_speaker"] = event["next_speaker"]
+        elif event_type == MESSAGE:
+            if self._run is None:
+                self._start(event)
+            speaker = event["speaker"]
+            self._run["turns"].append(
+                {
+                    "speaker": speaker,
+                    "tokens": count_tokens(event["message"]),
+                    "duration": event["time"] - self._run["last_time"],
+                    "bid": self._bids.pop(event.get("step"), {}).get(speaker),
+                    "next_speaker": self._pending.get("next_speaker"),
+                    "stop": self._pending.get("stop"),
+                }
+            )
+            self._run["last_time"] = event["time"]
+            self._pending = {}
+
+    def flush(self) -> None:
+        # segments are written by the archive once large enough
+        pass
+
+    def close(self) -> None:
+        self._finish()
+        self.archive.flush()
@@ -0,0 +1,59 @@
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("httpx")
+pytest.importorskip("langchain_openai")
+from langchain.schema import HumanMessage
+
+from agents import chat_model_pool
+from simulators.openai_stub_server import OpenAIStubServer
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    # every test gets a fresh pool pointed to its own stub
+    monkeypatch.setattr(chat_model_pool, "_http_client", None)
+    monkeypatch.setattr(chat_model_pool, "_async_http_client", None)
+    monkeypatch.setattr(chat_model_pool, "_chat_models", {})
+    monkeypatch.setattr(chat_model_pool, "_embeddings", {})
+    monkeypatch.setattr(chat_model_pool, "_http_settings", dict(chat_model_pool._http_settings))
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    server = OpenAIStubServer(reply="hello", latency=0.05)
+    base_url = server.start_in_thread()
+    chat_model_pool.configure_http_pool(base_url=base_url, max_connections=4, max_keepalive_connections=4)
+    return server
+
+
+def test_concurrent_calls_reuse_pooled_connections(stub):
+    model = chat_model_pool.get_chat_model(temperature=0.2)
+    assert chat_model_pool.get_chat_model(temperature=0.2) is model
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        replies = list(executor.map(lambda _: model.invoke([HumanMessage(content="hi")]).content, range(40)))
+
+    assert replies == ["hello"] * 40
+    assert stub.requests == 40
+    # 40 concurrent calls went over at most the pool size of keep-alive connections
+    assert len(stub._connections) <= 4
+
+
+def test_sequential_calls_keep_one_connection_alive(stub):
+    first = chat_model_pool.get_chat_model(temperature=0.2)
+    second = chat_model_pool.get_chat_model(temperature=1.0)
+    for model in (first, second, first):
+        model.invoke([HumanMessage(content="hi")])
+
+    assert stub.requests == 3
+    assert len(stub._connections) == 1
+
+
+@pytest.mark.skipif(importlib.util.find_spec("h2") is None, reason="h2 is not installed")
+def test_http2_is_offered_when_h2_is_installed(stub):
+    client = chat_model_pool.get_http_client()
+    # the stub speaks plain HTTP/1.1, so this checks the client offers HTTP/2 to servers negotiating it
+    assert client._transport._pool._http2
+    response = client.get(chat_model_pool._http_settings["base_url"].replace("/v1", "/stats"))
+    assert response.http_version in ("HTTP/1.1", "HTTP/2")
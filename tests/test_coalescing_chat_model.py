@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("httpx")
+pytest.importorskip("langchain_openai")
+from langchain.schema import HumanMessage, SystemMessage
+
+from agents import chat_model_pool, coalescing_chat_model
+from agents.model_calls import BID, invoke_integer
+from simulators.openai_stub_server import OpenAIStubServer
+
+
+class ChatTemplateTokenizer:
+    def apply_chat_template(self, conversation, tokenize, add_generation_prompt):
+        assert not tokenize and add_generation_prompt
+        turns = "".join(f"<|{turn['role']}|>{turn['content']}<|end|>" for turn in conversation)
+        return turns + "<|assistant|>"
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(chat_model_pool, "_http_client", None)
+    monkeypatch.setattr(chat_model_pool, "_chat_models", {})
+    monkeypatch.setattr(chat_model_pool, "_http_settings", dict(chat_model_pool._http_settings))
+    monkeypatch.setattr(coalescing_chat_model, "_coalescers", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    server = OpenAIStubServer(reply="7>", latency=0.05)
+    chat_model_pool.configure_http_pool(base_url=server.start_in_thread())
+    return server
+
+
+def test_prompts_use_the_chat_template_of_the_tokenizer(monkeypatch):
+    monkeypatch.setattr(coalescing_chat_model, "_load_tokenizer", lambda name: ChatTemplateTokenizer())
+    messages = [SystemMessage(content="You are A."), HumanMessage(content="Bid.")]
+
+    assert coalescing_chat_model.render_prompt(messages, "served/model") == (
+        "<|system|>You are A.<|end|><|user|>Bid.<|end|><|assistant|>"
+    )
+    assert coalescing_chat_model.render_prompt(messages) == "System: You are A.\n\nHuman: Bid.\n\nAssistant:"
+
+
+def test_streamed_bids_are_coalesced(stub, monkeypatch):
+    monkeypatch.setattr(chat_model_pool, "_coalescing", {"window": 0.05, "max_batch": 64, "tokenizer": None})
+    model = chat_model_pool.get_chat_model(temperature=0.2)
+    prompts = [[HumanMessage(content=f"Agent {idx}, bid from 1 to 10.")] for idx in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        bids = list(executor.map(lambda messages: invoke_integer(model, messages, BID, 1, 10), prompts))
+
+    assert bids == [7] * 8
+    # the streamed calls went out as one batch instead of 8 requests
+    assert stub.batch_sizes == [8]
@@ -0,0 +1,78 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_openai")
+from langchain.schema import HumanMessage, SystemMessage
+
+from agents.control_plane_cache import ControlPlaneCache, cache_scope, cache_text
+
+TOPICS = ["rail", "tax", "jobs", "health", "climate", "trade"]
+
+
+def topic_embedding(text: str):
+    # one dimension per topic word plus a small share for the text length, deterministic
+    words = text.lower().split()
+    return [float(sum(word.strip(".,?") == topic for word in words)) for topic in TOPICS] + [len(words) / 1000]
+
+
+def bid_prompt(speaker: str, history, instruction: str = "Bid from 1 to 10 on: rail."):
+    return [SystemMessage(content=f"You are {speaker}.")] + [HumanMessage(content=turn) for turn in history] + [
+        HumanMessage(content=instruction)
+    ]
+
+
+@pytest.fixture
+def cache():
+    return ControlPlaneCache(embedding_function=topic_embedding, history_window=2)
+
+
+def test_near_duplicate_prompt_hits(cache):
+    first = bid_prompt("Trump", ["Warren: rail rail", "West: rail jobs"])
+    scope = cache_scope("bid", "small", first, "Trump")
+    cache.store(scope, cache.text_of(first), 7)
+
+    # same recent turns, different whitespace and an older turn outside the window
+    again = bid_prompt("Trump", ["Moderator: tax", "Warren:  rail rail", "West: rail   jobs"])
+    assert cache_text(again, 2) == cache_text(first, 2)
+    assert cache.lookup(scope, cache.text_of(again)) == (7, 1.0)
+
+    reworded = bid_prompt("Trump", ["Warren: rail, rail", "West: rail jobs now"])
+    assert cache.text_of(reworded) not in cache._indexes[scope].exact
+    answer, similarity = cache.lookup(scope, cache.text_of(reworded))
+    assert answer == 7 and similarity >= 0.97
+
+
+def test_prompt_below_the_threshold_misses(cache):
+    first = bid_prompt("Trump", ["Warren: rail rail", "West: rail jobs"])
+    scope = cache_scope("bid", "small", first, "Trump")
+    cache.store(scope, cache.text_of(first), 7)
+
+    moved_on = bid_prompt("Trump", ["Warren: tax health", "West: climate trade"])
+    assert cache.lookup(scope, cache.text_of(moved_on)) is None
+    assert cache.stats()["bid"] == {
+        "lookups": 1, "hits": 0, "audits": 0, "audit_matches": 0, "hit_rate": 0.0, "audit_agreement": None,
+    }
+
+
+def test_speakers_and_call_types_are_isolated(cache):
+    history = ["Warren: rail rail", "West: rail jobs"]
+    trump, warren = bid_prompt("Trump", history), bid_prompt("Warren", history)
+    cache.store(cache_scope("bid", "small", trump, "Trump"), cache.text_of(trump), 9)
+
+    # the same text asked by another candidate, or as another call type, is not answered
+    assert cache.lookup(cache_scope("bid", "small", warren, "Warren"), cache.text_of(warren)) is None
+    assert cache.lookup(cache_scope("choice", "small", trump, "Trump"), cache.text_of(trump)) is None
+    # without a speaker, the system prompt keeps them apart
+    assert cache_scope("bid", "small", trump) != cache_scope("bid", "small", warren)
+    assert not cache.caches("turn") and not cache.caches("description")
+
+
+def test_thresholds_are_per_call_type():
+    cache = ControlPlaneCache(thresholds={"bid": 0.5, "choice": 0.999}, embedding_function=topic_embedding)
+    prompt = bid_prompt("Trump", ["Warren: rail rail"])
+    close = bid_prompt("Trump", ["Warren: rail rail jobs"])
+    for call_type in ("bid", "choice"):
+        cache.store(cache_scope(call_type, "small", prompt, "Trump"), cache.text_of(prompt), 3)
+
+    assert cache.lookup(cache_scope("bid", "small", close, "Trump"), cache.text_of(close))[0] == 3
+    assert cache.lookup(cache_scope("choice", "small", close, "Trump"), cache.text_of(close)) is None
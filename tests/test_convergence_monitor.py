@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_openai")
+from agents import chat_model_pool
+from simulators.convergence_monitor import ConvergenceMonitor
+
+
+class CountingEmbeddings:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.texts = []
+        self._lock = threading.Lock()
+
+    def embed_query(self, text: str):
+        with self._lock:
+            self.texts.append(text)
+        time.sleep(self.delay)
+        return [float(len(text)), 1.0, 0.0]
+
+
+def test_prepared_turn_is_embedded_once():
+    embeddings = CountingEmbeddings()
+    monitor = ConvergenceMonitor(embedding_function=embeddings.embed_query)
+
+    monitor.prepare("A", "High speed rail connects the coasts.")
+    monitor.observe("A", "High speed rail connects the coasts.")
+
+    # the text the agents store, so the embedding cache serves their episodic memories too
+    assert embeddings.texts == ["A: High speed rail connects the coasts."]
+    assert monitor.turns == 1
+
+
+def test_concurrent_embeddings_of_a_text_share_one_request(monkeypatch):
+    embeddings = CountingEmbeddings(delay=0.05)
+    monkeypatch.setattr(chat_model_pool, "embedding_cache", chat_model_pool.EmbeddingCache())
+    monkeypatch.setattr(chat_model_pool, "get_embeddings", lambda model: embeddings)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        vectors = list(executor.map(chat_model_pool.embed_query, ["A: rail"] * 4))
+
+    assert embeddings.texts == ["A: rail"]
+    assert all(vector == pytest.approx(vectors[0]) for vector in vectors)
+
+
+def topic_embedding(text: str):
+    # one axis per topic, so repeated topics are identical and new ones orthogonal
+    return [float("rail" in text), float("tax" in text), float("rail" not in text and "tax" not in text)]
+
+
+class RepeatingAgent:
+    def __init__(self, name: str, message: str) -> None:
+        self.name = name
+        self.message = message
+        self.received = []
+
+    def send(self) -> str:
+        return self.message
+
+    def receive(self, name: str, message: str) -> None:
+        self.received.append((name, message))
+
+    def reset(self) -> None:
+        self.received = []
+
+
+def test_converges_after_patience_stale_turns():
+    monitor = ConvergenceMonitor(embedding_function=topic_embedding, patience=2, min_turns=1)
+
+    assert not monitor.observe("A", "High speed rail connects the coasts.")
+    assert not monitor.observe("B", "High speed rail connects the coasts.")
+    assert monitor.observe("A", "High speed rail connects the coasts.")
+    assert monitor.last_scores["similarity"] == pytest.approx(1.0)
+    assert monitor.last_scores["novelty"] == 0.0
+
+
+def test_a_novel_turn_resets_the_stale_count():
+    monitor = ConvergenceMonitor(embedding_function=topic_embedding, patience=2, min_turns=1)
+    monitor.observe("A", "High speed rail connects the coasts.")
+    monitor.observe("B", "High speed rail connects the coasts.")
+
+    assert not monitor.observe("A", "Lower taxes bring growth everywhere.")
+    assert monitor.last_scores["similarity"] == 0.0
+    assert not monitor.observe("B", "High speed rail connects the coasts.")
+    assert monitor.observe("A", "High speed rail connects the coasts.")
+
+
+def test_the_simulator_reports_convergence():
+    from simulators.dialogue_simulator import DialogueSimulator
+
+    agents = [RepeatingAgent(name, "High speed rail connects the coasts.") for name in ["A", "B"]]
+    monitor = ConvergenceMonitor(embedding_function=topic_embedding, patience=2, min_turns=4)
+    simulator = DialogueSimulator(agents, lambda step, agents: step % len(agents), convergence_monitor=monitor)
+    simulator.inject("Moderator", "Let us talk about rail.")
+
+    # the injected message counts as a turn, the repeated ones are stale from the second on
+    simulator.step()
+    simulator.step()
+    assert not simulator.converged
+    simulator.step()
+    assert simulator.converged
+
+    simulator.reset()
+    assert not simulator.converged and monitor.turns == 0
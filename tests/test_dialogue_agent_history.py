@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("langchain_openai")
+from langchain.schema import SystemMessage
+
+from agents import dialogue_agent
+from agents.dialogue_agent import DialogueAgent
+
+
+def build_agent(monkeypatch, counted: list) -> DialogueAgent:
+    # one token per word plus one, without the encoding download of tiktoken
+    def count_tokens(text, model_name=None):
+        counted.append(text)
+        return len(text.split()) + 1
+
+    monkeypatch.setattr(dialogue_agent, "count_tokens", count_tokens)
+    return DialogueAgent("Alice", SystemMessage(content="You are Alice."), model=None)
+
+
+def test_tokens_are_counted_only_for_a_token_budget(monkeypatch):
+    counted = []
+    agent = build_agent(monkeypatch, counted)
+    for turn in range(5):
+        agent.receive("Bob", f"turn {turn}")
+    agent._history_for_prompt()
+
+    assert counted == []
+    agent.max_history_tokens = 1000
+    agent._history_for_prompt()
+    assert len(counted) == 6
+    # every entry is counted once
+    agent.receive("Bob", "one more")
+    agent._history_for_prompt()
+    assert counted[6:] == ["Bob: one more"]
+
+
+def test_history_tokens_and_truncation_index(monkeypatch):
+    agent = build_agent(monkeypatch, [])
+    # the header is 7 tokens, every turn 4
+    for turn in range(4):
+        agent.receive("Bob", f"turn {turn}")
+
+    assert agent.history_tokens() == 7 + 4 * 4
+    assert agent.history_tokens(3) == 2 * 4
+    assert agent.history_tokens(len(agent.message_history)) == 0
+    assert agent.truncation_index(8) == 3
+    assert agent.truncation_index(9) == 3
+    assert agent.truncation_index(7) == 4
+    assert agent.truncation_index(1000) == 0
+
+
+def test_the_truncated_window_jumps_ahead_once_over_the_budget(monkeypatch):
+    agent = build_agent(monkeypatch, [])
+    # room for the header and 10 turns
+    agent.max_history_tokens = 7 + 40
+    for turn in range(10):
+        agent.receive("Bob", f"turn {turn}")
+
+    assert agent._history_for_prompt() == list(agent.message_history)
+    agent.receive("Bob", "turn 10")
+    window = agent._history_for_prompt()
+
+    # the window restarts with three quarters of the budget, 7 turns
+    assert window == [agent.message_history[0]] + [f"Bob: turn {turn}" for turn in range(4, 11)]
+    # and keeps its start until the budget is exceeded again
+    for turn in range(11, 14):
+        agent.receive("Bob", f"turn {turn}")
+        assert agent._history_for_prompt()[1] == "Bob: turn 4"
+    agent.receive("Bob", "turn 14")
+    assert agent._history_for_prompt()[1] == "Bob: turn 8"
@@ -0,0 +1,134 @@
+import functools
+from typing import List
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+from langchain.schema import AIMessage, SystemMessage
+
+from agents import dialogue_agent
+from agents.dialogue_agent import DialogueAgent
+from simulators.dialogue_simulator import DialogueSimulator
+
+
+class FakeModel:
+    """
+    Chat model numbering its answers, which run past a word limit of three
+    """
+
+    model_name = "fake"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, messages, **kwargs) -> AIMessage:
+        self.calls += 1
+        return AIMessage(content=f"Answer {self.calls} is here. And more words follow it.")
+
+
+class Director(DialogueAgent):
+    # its turns change its state, like a director choosing the next speaker
+    turn_is_replayable = False
+
+
+class Chooser(DialogueAgent):
+    def choose(self, step: int, agents: List[DialogueAgent]) -> int:
+        return agents.index(self)
+
+
+def choose(agent: DialogueAgent, step: int, agents: List[DialogueAgent]) -> int:
+    return agents.index(agent)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # one token per word, without the encoding download of tiktoken
+    monkeypatch.setattr(dialogue_agent, "count_tokens", lambda text, model_name=None: len(text.split()) + 1)
+
+
+def build_simulator(model: FakeModel, agent_class=DialogueAgent, selection_function=None) -> DialogueSimulator:
+    agents = [
+        agent_class(name, SystemMessage(content=f"You are {name}."), model, word_limit=3)
+        for name in ["Alice", "Bob"]
+    ]
+    simulator = DialogueSimulator(agents, selection_function or (lambda step, agents: step % len(agents)))
+    simulator.inject("Moderator", "Begin")
+    return simulator
+
+
+def test_sibling_forks_reuse_the_turns_generated_from_the_same_state():
+    model = FakeModel()
+    parent = build_simulator(model)
+    first, second = parent.fork(), parent.fork()
+
+    assert first.step() == second.step()
+    assert model.calls == 1
+    assert len(parent.response_cache) == 1
+    # after diverging the forks generate their own turns
+    first.inject("Moderator", "Only in the first fork")
+    first.step()
+    second.step()
+    assert model.calls == 3
+
+
+def test_turns_that_change_the_speaker_are_not_reused():
+    model = FakeModel()
+    parent = build_simulator(model, agent_class=Director)
+    first, second = parent.fork(), parent.fork()
+
+    assert first.step() != second.step()
+    assert model.calls == 2
+    assert parent.response_cache == {}
+
+
+def test_replayed_turns_count_in_the_word_limit_report():
+    model = FakeModel()
+    parent = build_simulator(model)
+    first, second = parent.fork(), parent.fork()
+    first.step()
+    second.step()
+
+    assert model.calls == 1
+    for simulator in (first, second):
+        assert simulator.word_limit_report()["Bob"] == {
+            "word_limit": 3,
+            "generations": 1,
+            "overruns": 1,
+            "overrun_rate": 1.0,
+        }
+    assert parent.word_limit_report()["Bob"]["generations"] == 0
+
+
+def test_agents_bound_into_the_selection_function_are_replaced_by_their_forks():
+    model = FakeModel()
+    parent = build_simulator(model, agent_class=Chooser)
+    alice, bob = parent.agents
+    parent.select_next_speaker = functools.partial(choose, bob)
+    child = parent.fork()
+
+    assert child.select_next_speaker.args == (child.agents[1],)
+    assert child.step()[0] == "Bob"
+
+    parent.select_next_speaker = alice.choose
+    child = parent.fork()
+
+    assert child.select_next_speaker.__self__ is child.agents[0]
+    assert child.step()[0] == "Alice"
+    # an explicit selection function is kept as it is
+    assert parent.fork(selection_function=bob.choose).select_next_speaker.__self__ is bob
+
+
+def test_the_parent_history_is_unchanged_by_the_steps_of_a_child():
+    model = FakeModel()
+    parent = build_simulator(model)
+    histories = [list(agent.message_history) for agent in parent.agents]
+    child = parent.fork()
+    for _ in range(3):
+        child.step()
+
+    assert [list(agent.message_history) for agent in parent.agents] == histories
+    assert all(len(agent.message_history) == len(history) + 3 for agent, history in zip(child.agents, histories))
+    # the parent goes on from where it was forked and replays the first turn of the child
+    assert child.agents[0].message_history[len(histories[0])] == "Bob: Answer 1 is..."
+    assert parent.step() == ("Bob", "Answer 1 is...")
+    assert model.calls == 3
@@ -0,0 +1,73 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_openai")
+from agents.episodic_memory import EpisodicMemory
+
+
+def one_hot(text: str):
+    # every turn "name: turn <i>" gets its own direction, the query "turn <i>" matches it
+    vector = [0.0] * 32
+    vector[int(text.split()[-1])] = 1.0
+    return vector
+
+
+def test_shared_memory_stores_a_step_once_even_when_texts_repeat():
+    memory = EpisodicMemory(embedding_function=one_hot, recent_window=2, k=4)
+    for step, text in enumerate(["A: turn 0", "B: turn 1", "A: turn 0", "A: turn 0"]):
+        # every agent adds the broadcast of the step
+        for _ in range(3):
+            memory.add(text, step)
+
+    assert len(memory) == 4
+    assert memory._steps == [0, 1, 2, 3]
+
+
+def test_retrieve_excludes_the_steps_of_the_prompt_window():
+    memory = EpisodicMemory(embedding_function=one_hot, recent_window=2, k=2)
+    for step in range(6):
+        memory.add(f"A: turn {step}", step)
+
+    assert memory.retrieve("turn 1", k=10, before_step=3) == ["A: turn 0", "A: turn 1", "A: turn 2"]
+    assert memory.retrieve("turn 4", before_step=0) == []
+    # without a window the newest recent_window turns are left out
+    assert memory.retrieve("turn 5", k=10) == ["A: turn 0", "A: turn 1", "A: turn 2", "A: turn 3"]
+
+
+def test_fork_keeps_the_steps_apart():
+    memory = EpisodicMemory(embedding_function=one_hot, recent_window=1, k=4)
+    memory.add("A: turn 0", 0)
+    child = memory.fork()
+    child.add("B: turn 1", 1)
+    memory.add("C: turn 2", 1)
+
+    assert child.retrieve("turn 1", before_step=2) == ["A: turn 0", "B: turn 1"]
+    assert memory.retrieve("turn 2", before_step=2) == ["A: turn 0", "C: turn 2"]
+
+
+def test_spilled_vectors_are_still_recalled():
+    memory = EpisodicMemory(embedding_function=one_hot, recent_window=2, k=1, hot_tail=2)
+    for step in range(10):
+        memory.add(f"A: turn {step}", step)
+
+    assert memory._vectors._hot_size < 4
+    assert memory._vectors._spilled + memory._vectors._hot_size == 10
+    assert memory.retrieve("turn 1", before_step=8) == ["A: turn 1"]
+
+    child = memory.fork()
+    for step in range(10, 16):
+        child.add(f"B: turn {step}", step)
+    memory.add("C: turn 16", 10)
+    assert child.retrieve("turn 3", before_step=16) == ["A: turn 3"]
+    assert child.retrieve("turn 12", before_step=16) == ["B: turn 12"]
+    assert memory.retrieve("turn 12", k=11, before_step=16)[-1] == "C: turn 16"
+
+
+def test_memory_budget_shrinks_the_vectors():
+    memory = EpisodicMemory(embedding_function=one_hot, hot_tail=8)
+    for step in range(12):
+        memory.add(f"A: turn {step}", step)
+    memory._vectors.shrink(1)
+
+    assert memory._vectors._hot_size == 1
+    assert memory.retrieve("turn 5", k=1, before_step=12) == ["A: turn 5"]
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from agents.event_sinks import (
+    BIDS,
+    MESSAGE,
+    InMemorySink,
+    emit,
+    hold_events,
+    install_event_sink,
+    release_events,
+)
+
+
+@pytest.fixture
+def sink():
+    sink = InMemorySink()
+    install_event_sink(sink)
+    yield sink
+    install_event_sink(InMemorySink())
+
+
+def test_held_events_are_sent_on_release(sink):
+    with hold_events() as events:
+        emit(BIDS, step=2, bids={"A": 3}, selected="A")
+    assert sink.events == []
+
+    emit(MESSAGE, step=1, speaker="B", message="first")
+    release_events(events)
+    emit(MESSAGE, step=2, speaker="A", message="second")
+
+    assert [(event["type"], event["step"]) for event in sink.events] == [
+        (MESSAGE, 1),
+        (BIDS, 2),
+        (MESSAGE, 2),
+    ]
+    assert sink.events[1]["time"] == events[0]["time"]
+
+
+def test_holding_is_per_thread(sink):
+    with hold_events() as events:
+        thread = threading.Thread(target=emit, args=(MESSAGE,), kwargs={"step": 1})
+        thread.start()
+        thread.join()
+    assert events == []
+    assert len(sink.events) == 1
+
+
+def test_pipelined_bids_follow_the_message_they_answer(sink):
+    pytest.importorskip("langchain_openai")
+    pytest.importorskip("numpy")
+    from simulators.pipelined_bidding_simulator import PipelinedBiddingSimulator
+
+    class Agent:
+        def __init__(self, name):
+            self.name = name
+
+        def reset(self):
+            pass
+
+        def receive(self, name, message):
+            pass
+
+        def send(self):
+            return f"{self.name} speaks"
+
+    def select(step, agents):
+        emit(BIDS, step=step, bids={agent.name: 1 for agent in agents}, selected=agents[0].name)
+        return 0
+
+    with PipelinedBiddingSimulator([Agent("A"), Agent("B")], select, max_turns=3) as simulator:
+        simulator.reset()
+        simulator.inject("Moderator", "topic")
+        for turn in range(3):
+            name, message = simulator.step()
+            emit(MESSAGE, step=turn + 1, speaker=name, message=message)
+
+    assert [(event["type"], event["step"]) for event in sink.events] == [
+        (BIDS, 1), (MESSAGE, 1), (BIDS, 2), (MESSAGE, 2), (BIDS, 3), (MESSAGE, 3),
+    ]
@@ -0,0 +1,47 @@
+import pytest
+
+from agents.forked_history import ForkedHistory
+
+
+def test_fork_reads_the_base_and_appends_to_its_own_tail():
+    base = ["header", "A: one", "B: two"]
+    fork = ForkedHistory(base)
+    fork.append("A: three")
+
+    assert list(fork) == ["header", "A: one", "B: two", "A: three"]
+    assert base == ["header", "A: one", "B: two"]
+    assert fork.tail == ["A: three"]
+
+
+def test_fork_stays_frozen_while_the_base_grows():
+    base = ["header", "A: one"]
+    fork = ForkedHistory(base)
+    base.append("B: parent only")
+    fork.append("C: fork only")
+
+    assert len(fork) == 3
+    assert fork[-1] == "C: fork only"
+    assert fork[1:] == ["A: one", "C: fork only"]
+    assert "B: parent only" not in fork
+
+
+def test_fork_of_a_fork_and_a_shorter_view():
+    base = ["header", "A: one", "B: two", "C: three"]
+    first = ForkedHistory(base, length=2)
+    first.append("D: four")
+    second = ForkedHistory(first)
+    second.extend(["E: five", "F: six"])
+    first.append("G: first only")
+
+    assert list(second) == ["header", "A: one", "D: four", "E: five", "F: six"]
+    assert second[::2] == ["header", "D: four", "F: six"]
+    assert second[-3:-1] == ["D: four", "E: five"]
+    assert second + ["H"] == list(second) + ["H"]
+
+
+def test_index_out_of_range():
+    fork = ForkedHistory(["header"])
+    with pytest.raises(IndexError):
+        fork[1]
+    with pytest.raises(IndexError):
+        fork[-2]
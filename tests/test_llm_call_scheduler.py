@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from agents.llm_call_scheduler import (
+    BATCH,
+    INTERACTIVE,
+    AdmissionRejected,
+    LLMCallScheduler,
+    simulation_context,
+)
+
+
+class Gate:
+    """
+    Occupies the single worker of a scheduler until opened
+    """
+
+    def __init__(self, scheduler: LLMCallScheduler) -> None:
+        self.started = threading.Event()
+        self.opened = threading.Event()
+        with simulation_context("gate"):
+            self.future = scheduler.submit(self._run)
+        assert self.started.wait(1)
+
+    def _run(self) -> None:
+        self.started.set()
+        self.opened.wait(5)
+
+    def open(self) -> None:
+        self.opened.set()
+        self.future.result(timeout=1)
+
+
+def submit(scheduler: LLMCallScheduler, order: list, simulation_id: str, label: str, priority: int = BATCH):
+    with simulation_context(simulation_id, priority):
+        return scheduler.submit(order.append, label)
+
+
+def test_simulations_are_served_round_robin():
+    scheduler = LLMCallScheduler(max_concurrency=1)
+    gate = Gate(scheduler)
+    order = []
+    futures = [submit(scheduler, order, "long", f"long-{idx}") for idx in range(3)]
+    futures.append(submit(scheduler, order, "short", "short-0"))
+    gate.open()
+    for future in futures:
+        future.result(timeout=1)
+
+    assert order == ["long-0", "short-0", "long-1", "long-2"]
+
+
+def test_interactive_calls_go_first_but_batch_keeps_its_share():
+    scheduler = LLMCallScheduler(max_concurrency=1, batch_share=3)
+    gate = Gate(scheduler)
+    order = []
+    futures = [submit(scheduler, order, "batch", "batch-0", BATCH)]
+    futures += [submit(scheduler, order, "chat", f"chat-{idx}", INTERACTIVE) for idx in range(3)]
+    gate.open()
+    for future in futures:
+        future.result(timeout=1)
+
+    # the gate was the first dispatch, every third one goes to batch work
+    assert order == ["chat-0", "batch-0", "chat-1", "chat-2"]
+
+
+def test_admission_is_limited_per_simulation():
+    scheduler = LLMCallScheduler(max_concurrency=1, max_queued_per_simulation=2)
+    gate = Gate(scheduler)
+    order = []
+    futures = [submit(scheduler, order, "greedy", f"greedy-{idx}") for idx in range(2)]
+    with pytest.raises(AdmissionRejected):
+        submit(scheduler, order, "greedy", "greedy-2")
+    # other simulations are still admitted
+    futures.append(submit(scheduler, order, "other", "other-0"))
+    gate.open()
+    for future in futures:
+        future.result(timeout=1)
+
+    assert order == ["greedy-0", "other-0", "greedy-1"]
+
+
+def test_calls_past_their_deadline_are_dropped():
+    scheduler = LLMCallScheduler(max_concurrency=1)
+    gate = Gate(scheduler)
+    with simulation_context("late", deadline_seconds=0.01):
+        future = scheduler.submit(lambda: "answer")
+    gate.opened.wait(0.05)
+    gate.open()
+
+    with pytest.raises(TimeoutError):
+        future.result(timeout=1)
+    assert sum(count for _, count in scheduler.queue_wait_histogram()["batch"]) == 2
+
+
+def test_cancelled_expired_calls_do_not_kill_the_workers():
+    scheduler = LLMCallScheduler(max_concurrency=1)
+    gate = Gate(scheduler)
+    with simulation_context("late", deadline_seconds=0.0):
+        expired = [scheduler.submit(lambda: "answer") for _ in range(3)]
+    for future in expired:
+        assert future.cancel()
+    gate.open()
+
+    order = []
+    submit(scheduler, order, "next", "next-0").result(timeout=1)
+    assert order == ["next-0"]
+    assert all(worker.is_alive() for worker in scheduler._workers)
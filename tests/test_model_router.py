@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("langchain_openai")
+from agents import model_calls
+from agents.model_calls import BID, CHOICE, DESCRIPTION, TURN, record_parse_failure
+from agents.model_router import control_plane_router
+
+
+@pytest.fixture
+def router(monkeypatch):
+    router = control_plane_router(small_model_name="small")
+    monkeypatch.setattr(model_calls, "_model_router", router)
+    return router
+
+
+def test_every_call_type_has_its_own_tier(router):
+    assert router.tier_for(BID) is not router.tier_for(CHOICE)
+    assert router.tier_for(TURN) is None
+    assert router.tier_for(DESCRIPTION).max_tokens == 200
+
+
+def test_stats_stay_separate_per_call_type(router):
+    router.tier_for(BID).record(0.5)
+    router.tier_for(BID).record(1.5, failed=True)
+    router.tier_for(CHOICE).record(0.1)
+    record_parse_failure(BID)
+
+    stats = router.stats()
+    assert (stats[BID]["calls"], stats[BID]["errors"], stats[BID]["parse_failures"]) == (2, 1, 1)
+    assert stats[BID]["mean_latency"] == pytest.approx(1.0)
+    assert (stats[CHOICE]["calls"], stats[CHOICE]["errors"], stats[CHOICE]["parse_failures"]) == (1, 0, 0)
+    assert stats[CHOICE]["mean_latency"] == pytest.approx(0.1)
+    assert stats[DESCRIPTION]["calls"] == 0
@@ -0,0 +1,83 @@
+import threading
+from typing import List
+
+from simulators.pipelined_bidding_simulator import PipelinedBiddingSimulator
+
+
+class ScriptedAgent:
+    """
+    Dialogue agent without a model that numbers its turns
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.history: List[str] = []
+        self.turns = 0
+
+    def send(self) -> str:
+        self.turns += 1
+        return f"turn {self.turns}"
+
+    def receive(self, name: str, message: str) -> None:
+        self.history.append(f"{name}: {message}")
+
+    def reset(self) -> None:
+        self.history = []
+        self.turns = 0
+
+
+class RecordingSelection:
+    """
+    Gives the turn to the moderator's favourite after an interruption and to
+    the other agent otherwise, recording the last message every bidding saw
+    """
+
+    def __init__(self) -> None:
+        self.seen: List[str] = []
+
+    def __call__(self, step: int, agents: List[ScriptedAgent]) -> int:
+        last = agents[0].history[-1]
+        self.seen.append(last)
+        return 0 if last == "Moderator: Interruption" else 1
+
+
+def build_simulator(max_turns=None) -> PipelinedBiddingSimulator:
+    agents = [ScriptedAgent("Alice"), ScriptedAgent("Bob")]
+    return PipelinedBiddingSimulator(agents, RecordingSelection(), max_turns=max_turns)
+
+
+def test_bids_in_flight_are_discarded_by_an_injected_message():
+    with build_simulator() as simulator:
+        selection = simulator.select_next_speaker
+        simulator.inject("Moderator", "Begin")
+        assert simulator.step() == ("Bob", "turn 1")
+        # the bids for the next turn are requested by now, the injection makes them stale
+        simulator.inject("Moderator", "Interruption")
+
+        # the stale bids may have been cancelled before they ran, the turn goes by the fresh ones
+        assert simulator.step() == ("Alice", "turn 1")
+        assert selection.seen[0] == "Moderator: Begin"
+        interruption = selection.seen.index("Moderator: Interruption")
+        assert selection.seen[1:interruption] in ([], ["Bob: turn 1"])
+
+
+def test_no_bids_are_requested_after_the_last_turn():
+    with build_simulator(max_turns=3) as simulator:
+        simulator.inject("Moderator", "Begin")
+        while not simulator.finished:
+            simulator.step()
+
+        assert simulator._turns == 3
+        assert simulator._next_speaker is None
+        assert len(simulator.select_next_speaker.seen) == 3
+
+
+def test_close_stops_the_bidding_thread():
+    before = set(threading.enumerate())
+    simulator = build_simulator()
+    simulator.inject("Moderator", "Begin")
+    simulator.step()
+    simulator.close()
+
+    assert simulator._next_speaker is None
+    assert [thread for thread in threading.enumerate() if thread not in before] == []
@@ -0,0 +1,95 @@
+import pytest
+
+pytest.importorskip("langchain")
+from langchain.schema import SystemMessage
+
+from agents.prompt_layout import PromptLayout, prefix_is_stable, split_template
+
+
+def test_consecutive_turns_share_the_prefix():
+    layout = PromptLayout(SystemMessage(content="You are Alice."), "Header\n")
+    history = ["Moderator: topic", "Bob: first"]
+    first = layout.messages(history, "Alice: ")
+    history.append("Alice: second")
+    second = layout.messages(history, "Bid from 1 to 10.")
+
+    assert prefix_is_stable(first, second)
+    assert second[1].content.startswith(first[1].content)
+
+
+def test_recalled_turns_go_after_the_prefix():
+    layout = PromptLayout(SystemMessage(content="You are Alice."))
+    first = layout.messages(["Moderator: topic"], "Alice: ", recalled=["Bob: old"])
+    second = layout.messages(["Moderator: topic", "Bob: new"], "Alice: ", recalled=["Bob: other"])
+
+    assert prefix_is_stable(first, second)
+    assert [message.content for message in second[2:]] == ["Relevant earlier turns:\nBob: other", "Alice: "]
+
+
+def test_a_changed_history_breaks_the_prefix():
+    layout = PromptLayout(SystemMessage(content="You are Alice."))
+    first = layout.messages(["Moderator: topic", "Bob: first"], "Alice: ")
+    second = layout.messages(["Moderator: topic", "Bob: edited"], "Alice: ")
+
+    assert not prefix_is_stable(first, second)
+
+
+def test_split_template():
+    assert split_template("Header\n{message_history}\nBid") == ("Header\n", "\nBid")
+    assert split_template("no history") == ("", "no history")
+    # the fence around the history is dropped with it
+    assert split_template("Header\n```\n{message_history}\n```\nBid") == ("Header\n", "\nBid")
+
+
+def test_bids_and_turns_share_the_message_prefix(monkeypatch):
+    pytest.importorskip("tiktoken")
+    pytest.importorskip("langchain_openai")
+    from agents import dialogue_agent, dialogue_agent_bidding
+    from agents.dialogue_agent_bidding import BiddingDialogueAgent
+
+    monkeypatch.setattr(dialogue_agent, "count_tokens", lambda text, model_name=None: len(text.split()) + 1)
+    prompts = []
+    monkeypatch.setattr(
+        dialogue_agent_bidding, "invoke_integer", lambda model, messages, *args, **kwargs: prompts.append(messages) or 5
+    )
+    header = "You are Alice, a candidate."
+    template = header + "\n```\n{message_history}\n```\nRate this message: {recent_message}\nAnswer as <bid>."
+    agent = BiddingDialogueAgent(
+        "Alice", SystemMessage(content=header + "\nSpeak as Alice."), template, model=None
+    )
+    agent.receive("Moderator", "topic")
+    agent.receive("Bob", "first")
+
+    assert agent.bid() == 5
+    bid = prompts[-1]
+    turn = agent.prompt_layout.messages(agent._history_for_prompt(), agent.prefix, agent._recalled_for_prompt())
+
+    assert [message.content for message in bid[:2]] == [message.content for message in turn[:2]]
+    assert prefix_is_stable(bid, turn) and prefix_is_stable(turn, bid)
+    # the persona is in the system prompt only, no fence is left open
+    assert bid[-1].content == "\nRate this message: Bob: first\nAnswer as <bid>."
+    assert all(header not in message.content for message in bid[1:])
+
+
+def test_truncated_agent_prompts_stay_stable_between_window_jumps(monkeypatch):
+    pytest.importorskip("tiktoken")
+    pytest.importorskip("langchain_openai")
+    from agents import dialogue_agent
+    from agents.dialogue_agent import DialogueAgent
+
+    # one token per word, without the encoding download of tiktoken
+    monkeypatch.setattr(dialogue_agent, "count_tokens", lambda text, model_name=None: len(text.split()) + 1)
+    agent = DialogueAgent("Alice", SystemMessage(content="You are Alice."), model=None)
+    agent.max_history_tokens = 400
+    agent.receive("Moderator", "topic")
+    previous = None
+    stable = 0
+    for turn in range(60):
+        agent.receive("Bob", f"turn {turn} " + "word " * 20)
+        current = agent.prompt_layout.messages(agent._history_for_prompt(), agent.prefix)
+        if previous is not None and prefix_is_stable(previous, current):
+            stable += 1
+        previous = current
+
+    # the window jumps ahead by a quarter of the budget, in between the prefix is reused
+    assert stable >= 45
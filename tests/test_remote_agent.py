@@ -0,0 +1,107 @@
+import os
+from typing import List
+
+import pytest
+
+from agents.remote_agent import RemoteAgentError, spawn_agent
+from simulators.dialogue_simulator import DialogueSimulator
+
+
+class EchoAgent:
+    """
+    Dialogue agent without a model, its turns and bids tell how much it has heard
+    """
+
+    def __init__(self) -> None:
+        self.name = "Echo"
+        self.word_limit = 5
+        self.history: List[str] = []
+
+    def receive(self, name: str, message: str) -> None:
+        if message == "reject":
+            raise ValueError("rejected message")
+        self.history.append(f"{name}: {message}")
+
+    def send(self) -> str:
+        if any("crash" in line for line in self.history):
+            # the worker dies without answering
+            os._exit(1)
+        return f"heard {len(self.history)}"
+
+    def bid(self) -> int:
+        return len(self.history)
+
+    def reset(self) -> None:
+        self.history = []
+
+
+def build_echo_agent() -> EchoAgent:
+    return EchoAgent()
+
+
+@pytest.fixture
+def remote():
+    proxy, process = spawn_agent(build_echo_agent)
+    yield proxy, process
+    process.terminate()
+    process.join(5)
+
+
+def test_bid_and_send_answer_from_the_worker(remote):
+    proxy, _ = remote
+    assert proxy.name == "Echo"
+    assert proxy.word_limit == 5
+    assert proxy.bid() == 0
+
+    proxy.receive("A", "one")
+    proxy.receive("B", "two")
+
+    assert proxy.bid() == 2
+    assert proxy.send() == "heard 2"
+
+
+def test_receives_are_pipelined_and_their_errors_raised_on_the_next_call(remote):
+    proxy, _ = remote
+    # none of them waits for the worker
+    for index in range(3):
+        proxy.receive("A", f"message {index}")
+    proxy.receive("A", "reject")
+    assert proxy._pending_acks == 4
+
+    with pytest.raises(RemoteAgentError, match="rejected message"):
+        proxy.bid()
+    # the failure is raised once, the messages before it were received
+    assert proxy._pending_acks == 0
+    assert proxy.bid() == 3
+
+
+def test_a_crashed_worker_raises_a_remote_agent_error(remote):
+    proxy, process = remote
+    proxy.receive("A", "crash")
+
+    with pytest.raises(RemoteAgentError, match="is gone"):
+        proxy.send()
+    process.join(5)
+    assert process.exitcode == 1
+
+
+def test_close_ends_the_connection(remote):
+    proxy, process = remote
+    proxy.receive("A", "one")
+    proxy.close()
+
+    with pytest.raises(RemoteAgentError):
+        proxy.bid()
+    # the worker waits for the next simulator
+    assert process.is_alive()
+
+
+def test_simulations_with_remote_agents_refuse_to_fork(remote):
+    proxy, _ = remote
+    simulator = DialogueSimulator([proxy], lambda step, agents: 0)
+    simulator.inject("Moderator", "Begin")
+    assert simulator.step() == ("Echo", "heard 1")
+
+    with pytest.raises(NotImplementedError, match="Echo"):
+        simulator.fork()
+    assert simulator.response_cache is None
@@ -0,0 +1,88 @@
+import threading
+from typing import Optional
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+from langchain.schema import AIMessage, SystemMessage
+
+from agents import dialogue_agent
+from agents.dialogue_agent import DialogueAgent
+from simulators.room_simulator import RoomSimulator
+
+
+class FakeModel:
+    """
+    Chat model answering with the name of the speaker, optionally waiting at
+    a {barrier} until as many calls are in flight as it has parties
+    """
+
+    model_name = "fake"
+
+    def __init__(self, barrier: Optional[threading.Barrier] = None) -> None:
+        self.barrier = barrier
+
+    def __call__(self, messages, **kwargs) -> AIMessage:
+        if self.barrier is not None:
+            self.barrier.wait()
+        # the instruction is the prefix of the speaker, "Alice: "
+        return AIMessage(content=f"{messages[-1].content.rstrip(': ')} speaks")
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # one token per word, without the encoding download of tiktoken
+    monkeypatch.setattr(dialogue_agent, "count_tokens", lambda text, model_name=None: len(text.split()) + 1)
+
+
+def build_agents(model: FakeModel, *names: str):
+    return [DialogueAgent(name, SystemMessage(content=f"You are {name}."), model) for name in names]
+
+
+def first_member(step, members):
+    return 0
+
+
+def test_messages_reach_only_the_members_of_the_room():
+    alice, bob, carol = build_agents(FakeModel(), "Alice", "Bob", "Carol")
+    simulator = RoomSimulator()
+    simulator.add_room("rail", [alice, bob], first_member)
+    simulator.add_room("tax", [carol], first_member)
+
+    simulator.inject("rail", "Moderator", "Rail?")
+    assert simulator.step(["rail"]) == {"rail": ("Alice", "Alice speaks")}
+
+    assert alice.message_history[1:] == ["Moderator: Rail?", "Alice: Alice speaks"]
+    assert bob.message_history[1:] == ["Moderator: Rail?", "Alice: Alice speaks"]
+    assert carol.message_history[1:] == []
+
+
+def test_followers_receive_the_messages_of_other_rooms():
+    alice, bob, carol = build_agents(FakeModel(), "Alice", "Bob", "Carol")
+    simulator = RoomSimulator()
+    simulator.add_room("rail", [alice, bob], first_member)
+    simulator.add_room("tax", [carol], first_member)
+    simulator.follow(carol, "Alice")
+    # a follower in the room gets the message once
+    simulator.follow(bob, "Alice")
+
+    simulator.step_room("rail")
+
+    assert carol.message_history[1:] == ["Alice (in rail): Alice speaks"]
+    assert bob.message_history[1:] == ["Alice: Alice speaks"]
+    simulator.unfollow(carol, "Alice")
+    simulator.step_room("rail")
+    assert len(carol.message_history) == 2
+
+
+def test_rooms_are_stepped_concurrently():
+    # both turns have to be in flight at once for either to finish
+    model = FakeModel(barrier=threading.Barrier(2, timeout=5))
+    alice, bob = build_agents(model, "Alice", "Bob")
+    simulator = RoomSimulator(max_workers=2)
+    simulator.add_room("rail", [alice], first_member)
+    simulator.add_room("tax", [bob], first_member)
+
+    assert simulator.step() == {"rail": ("Alice", "Alice speaks"), "tax": ("Bob", "Bob speaks")}
+    assert alice.message_history[1:] == ["Alice: Alice speaks"]
+    assert bob.message_history[1:] == ["Bob: Bob speaks"]
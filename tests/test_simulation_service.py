@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("langchain_openai")
+from aiohttp.test_utils import TestClient, TestServer
+
+from agents import chat_model_pool
+from simulators.openai_stub_server import OpenAIStubServer
+from simulators.simulation_service import SimulationService
+from simulators.tournament_runner import TournamentRunner
+from simulations.interactions.tournament.tournament_interaction import TournamentInteraction
+
+SCENARIO = {"topic": "transcontinental high speed rail", "contestants": ["Alice", "Bob"], "max_iters": 2}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    # the personas, turns and embeddings come from a local stub
+    monkeypatch.setattr(chat_model_pool, "_http_client", None)
+    monkeypatch.setattr(chat_model_pool, "_async_http_client", None)
+    monkeypatch.setattr(chat_model_pool, "_chat_models", {})
+    monkeypatch.setattr(chat_model_pool, "_embeddings", {})
+    monkeypatch.setattr(chat_model_pool, "_http_settings", dict(chat_model_pool._http_settings))
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    base_url = OpenAIStubServer(reply="Rail now.").start_in_thread()
+    chat_model_pool.configure_http_pool(base_url=base_url)
+    # the texts are sent as they are, without the encoding download of tiktoken
+    chat_model_pool.get_embeddings().check_embedding_ctx_length = False
+    return SimulationService(TournamentRunner([], interaction_class=TournamentInteraction), max_sessions=2)
+
+
+def run(service: SimulationService, scenario) -> None:
+    async def main():
+        async with TestClient(TestServer(service.create_app())) as client:
+            await scenario(client)
+
+    asyncio.run(main())
+
+
+async def create(client: TestClient, **settings) -> str:
+    response = await client.post("/simulations", json=dict(SCENARIO, **settings))
+    assert response.status == 201
+    return (await response.json())["id"]
+
+
+def test_a_run_is_streamed_and_ends_the_simulation(service):
+    async def scenario(client):
+        simulation_id = await create(client)
+        response = await client.post(f"/simulations/{simulation_id}/run")
+        assert response.status == 202
+
+        stream = await client.get(f"/simulations/{simulation_id}/events")
+        assert stream.headers["Content-Type"] == "text/event-stream"
+        events = [
+            json.loads(line[len("data: "):])
+            for line in (await stream.text()).splitlines()
+            if line.startswith("data: ")
+        ]
+        assert [event.get("name") for event in events] == ["Moderator", "Bob", "Alice", None]
+        assert events[-1] == {"event": "finished", "converged": False}
+        assert events[1]["message"] == "Rail now."
+
+        await service.pool.get(simulation_id).runner
+        response = await client.post(f"/simulations/{simulation_id}/step")
+        assert response.status == 409
+        state = await (await client.get(f"/simulations/{simulation_id}")).json()
+        assert state["finished"] and not state["running"]
+        assert len(state["transcript"]) == 4
+
+    run(service, scenario)
+
+
+def test_a_full_pool_evicts_the_least_recently_used_idle_session(service):
+    async def scenario(client):
+        first = await create(client)
+        second = await create(client)
+        # the second session is the least recently used one now
+        assert (await client.get(f"/simulations/{first}")).status == 200
+        third = await create(client)
+
+        assert (await client.get(f"/simulations/{second}")).status == 404
+        assert set(service.pool.sessions()) == {first, third}
+
+    run(service, scenario)
+
+
+def test_busy_sessions_are_never_evicted(service):
+    async def scenario(client):
+        sessions = [service.pool.get(await create(client)) for _ in range(2)]
+        # both sessions are in the middle of a step
+        for session in sessions:
+            await session.lock.acquire()
+        response = await client.post("/simulations", json=SCENARIO)
+        assert response.status == 503
+
+        # idle sessions past the timeout are evicted, the busy ones stay
+        sessions[0].lock.release()
+        service.pool.idle_timeout = 0.0
+        assert service.pool.evict_idle() == 1
+        assert list(service.pool.sessions()) == [sessions[1].id]
+        sessions[1].lock.release()
+
+    run(service, scenario)
@@ -0,0 +1,54 @@
+from agents.forked_history import ForkedHistory
+from agents.spilling_history import MemoryBudget, SpillingHistory
+
+
+def test_only_the_hot_tail_stays_in_memory(tmp_path):
+    history = SpillingHistory(hot_tail=3, directory=str(tmp_path))
+    texts = [f"turn {idx}: é{'x' * idx}" for idx in range(10)]
+    history.extend(texts)
+
+    assert history.spilled == 7
+    assert history.hot() == texts[-3:]
+    assert len(history) == 10
+    assert list(history) == texts
+    assert history[0] == texts[0]
+    assert history[-1] == texts[-1]
+    # a range over the spilled and the hot entries is read with one seek
+    assert history[5:9] == texts[5:9]
+    assert history[::3] == texts[::3]
+    history.close()
+
+
+def test_items_are_spilled_on_creation():
+    history = SpillingHistory(hot_tail=2, items=["a", "b", "c"])
+    assert history.spilled == 1
+    assert history + ["d"] == ["a", "b", "c", "d"]
+
+
+def test_shrink_spills_down_to_the_given_tail():
+    history = SpillingHistory(hot_tail=100, items=[str(idx) for idx in range(50)])
+    history.shrink(5)
+
+    assert history.hot() == [str(idx) for idx in range(45, 50)]
+    assert list(history) == [str(idx) for idx in range(50)]
+
+
+def test_memory_budget_shrinks_the_registered_histories(monkeypatch):
+    budget = MemoryBudget(rss_ceiling_mb=1, check_every=4, min_hot_tail=1)
+    monkeypatch.setattr("agents.spilling_history.memory_budget", budget)
+    history = SpillingHistory(hot_tail=10, items=["a", "b", "c"])
+
+    assert history.hot() == ["a", "b", "c"]
+    history.append("d")
+    # the fourth append crosses check_every and the process is above 1 MB
+    assert history.hot() == ["d"]
+
+
+def test_a_fork_of_a_spilled_history_keeps_its_view():
+    history = SpillingHistory(hot_tail=2, items=["a", "b", "c", "d"])
+    fork = ForkedHistory(history)
+    history.append("parent")
+    fork.append("fork")
+
+    assert list(fork) == ["a", "b", "c", "d", "fork"]
+    assert list(history) == ["a", "b", "c", "d", "parent"]
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+pytest.importorskip("langchain")
+from agents.tool_prefetcher import ToolPrefetcher, extract_query_terms, overlap
+
+
+class SlowTool:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.description = f"{name} lookups"
+        self.queries = []
+
+    def run(self, query: str) -> str:
+        self.queries.append(query)
+        time.sleep(0.05)
+        return f"{self.name}: {query}"
+
+
+class ToolAgent:
+    def __init__(self, name: str, tool: SlowTool) -> None:
+        self.name = name
+        self.tools = [tool]
+
+
+MESSAGE = (
+    "Automation and employment: the OECD reports that automation changes "
+    "employment in manufacturing and employment in services."
+)
+
+
+def test_extract_query_terms_leaves_speaker_names_out():
+    queries = extract_query_terms(MESSAGE, ignore=["AI alarmist"])
+    assert "OECD" in queries
+    assert any("automation" in query and "employment" in query for query in queries)
+
+
+def test_overlap():
+    assert overlap("automation employment statistics", "employment automation oecd") == 0.5
+    assert overlap("the", "a") == 0.0
+
+
+def test_prefetch_skips_the_speaker_and_respects_the_budget():
+    wikipedia, arxiv = SlowTool("wikipedia"), SlowTool("arxiv")
+    listener, speaker = ToolAgent("AI alarmist", wikipedia), ToolAgent("AI accelerationist", arxiv)
+    prefetcher = ToolPrefetcher(max_lookups=1)
+    prefetcher.register(listener)
+    prefetcher.register(speaker)
+
+    prefetcher.notify(1, speaker.name, MESSAGE)
+    time.sleep(0.1)
+
+    assert arxiv.queries == []
+    assert len(wikipedia.queries) == 1
+
+
+def test_similar_lookup_is_served_by_the_prefetch():
+    wikipedia = SlowTool("wikipedia")
+    agent = ToolAgent("AI alarmist", wikipedia)
+    prefetcher = ToolPrefetcher()
+    prefetcher.register(agent)
+
+    prefetcher.notify(1, "AI accelerationist", MESSAGE)
+    agent.tools[0].run("automation employment statistics")
+
+    stats = prefetcher.stats()
+    assert stats["lookups"] == 1 and stats["hits"] + stats["joined"] == 1
+    assert "automation employment statistics" not in wikipedia.queries
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from agents.llm_call_scheduler import propagate_context
+from agents.tracing import Tracer, install_tracer, span
+
+
+def add_span(tracer: Tracer, name: str, start: float, end: float, parent=None, **attributes):
+    recorded = tracer.start_span(name, parent=parent, **attributes)
+    recorded.start, recorded.end = start, end
+    tracer.spans.append(recorded)
+    return recorded
+
+
+@pytest.fixture
+def tracer():
+    tracer = install_tracer(Tracer())
+    yield tracer
+    install_tracer(None)
+
+
+def test_critical_path_of_a_sequential_turn(tracer):
+    turn = add_span(tracer, "turn", 0.0, 10.0, step=3)
+    add_span(tracer, "select_speaker", 0.0, 3.0, parent=turn)
+    send = add_span(tracer, "send", 3.0, 9.0, parent=turn)
+    add_span(tracer, "llm_call", 3.5, 8.5, parent=send)
+    add_span(tracer, "broadcast", 9.0, 10.0, parent=turn)
+
+    (report,) = tracer.critical_path_report()
+    assert report["turn"] == 3
+    assert report["duration"] == 10.0
+    assert [(item["name"], item["saving"]) for item in report["critical_path"]] == [
+        ("send", 6.0),
+        ("llm_call", 5.0),
+        ("select_speaker", 3.0),
+        ("broadcast", 1.0),
+    ]
+
+
+def test_parallel_siblings_limit_the_saving(tracer):
+    turn = add_span(tracer, "turn", 0.0, 4.0, step=1)
+    select = add_span(tracer, "select_speaker", 0.0, 4.0, parent=turn)
+    add_span(tracer, "bid", 0.0, 4.0, parent=select, agent="A")
+    add_span(tracer, "bid", 0.0, 3.0, parent=select, agent="B")
+
+    (report,) = tracer.critical_path_report()
+    path = {(item["name"], item.get("agent")): item["saving"] for item in report["critical_path"]}
+    # without the slowest bid the round still waits for the other one
+    assert path == {("select_speaker", None): 4.0, ("bid", "A"): pytest.approx(1.0)}
+
+
+def test_spans_nest_across_threads(tracer):
+    with span("turn", step=0) as turn:
+        with span("send", agent="A") as send:
+            pass
+
+        def bid():
+            with span("bid"):
+                pass
+
+        worker = threading.Thread(target=propagate_context(bid))
+        worker.start()
+        worker.join()
+
+    by_name = {recorded.name: recorded for recorded in tracer.spans}
+    assert send.parent_id == turn.span_id
+    assert by_name["bid"].parent_id == turn.span_id
+    assert by_name["bid"].thread != turn.thread
+    assert [event["name"] for event in tracer.chrome_trace()["traceEvents"]] == ["send", "bid", "turn"]
+
+
+def test_span_is_a_no_op_without_a_tracer():
+    install_tracer(None)
+    with span("turn") as recorded:
+        assert recorded is None
@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("tiktoken")
+from simulators.transcript_archive import ArchiveQuery, TranscriptArchive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = TranscriptArchive(str(tmp_path), segment_turns=4)
+    archive.append_run(
+        "rail",
+        [
+            {"speaker": "Trump", "bid": 8, "next_speaker": "Warren"},
+            {"speaker": "Warren", "bid": 6},
+            {"speaker": "Trump", "bid": 4, "next_speaker": "Warren"},
+        ],
+        stopping_probability=0.2,
+    )
+    archive.append_run(
+        "rail",
+        [{"speaker": "Warren", "bid": 9}, {"speaker": "West"}],
+        stopping_probability=0.5,
+    )
+    archive.append_run("tax", [{"speaker": "West", "bid": 1}], stopping_probability=0.2)
+    return archive
+
+
+def test_mean_by_groups_across_segments_and_skips_missing_values(archive):
+    query = archive.query()
+    # the first two runs filled a segment, the last one went to a second
+    assert query.segments == 2
+    assert query.average_bid_by_speaker() == {"Trump": 6.0, "Warren": 7.5, "West": 1.0}
+    assert query.turns_by_stopping_probability() == {0.2: 2.0, 0.5: 2.0}
+
+
+def test_mean_by_leaves_turns_without_a_key_out(archive):
+    query = archive.query()
+    # only the turns followed by a director decision have a next speaker
+    assert query.mean_by("turns", "bid", "next_speaker") == {"Warren": 6.0}
+    assert query.next_speaker_counts() == {"Warren": 2}
+
+
+def test_archive_reopens_with_its_strings(archive, tmp_path):
+    archive.flush()
+    reopened = TranscriptArchive(str(tmp_path))
+    reopened.append_run("rail", [{"speaker": "Sanders", "bid": 2}])
+    query = reopened.query()
+
+    assert query.count_by("runs", "label") == {"rail": 3, "tax": 1}
+    assert query.average_bid_by_speaker()["Sanders"] == 2.0
+    assert math.isnan(query.column("turns", "bid")[4])
+    assert ArchiveQuery(str(tmp_path)).count_by("turns", "speaker")["Sanders"] == 1
@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import Dict, List
+
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("langchain_openai")
+from langchain.schema import Document
+
+from embedings_vectorstores import vector_store_registry as registry_module
+from embedings_vectorstores.vector_store_registry import SHARED_NAMESPACE, VectorStoreRegistry
+
+
+class FakeChroma:
+    """
+    In-memory stand-in for Chroma; the documents of a persist directory survive
+    the store like on disk, a search returns every document matching the filter
+    """
+
+    disk: Dict[str, List[Document]] = {}
+
+    def __init__(self, persist_directory: str, embedding_function=None) -> None:
+        self.documents = FakeChroma.disk.setdefault(persist_directory, [])
+        self._collection = self
+
+    def count(self) -> int:
+        return len(self.documents)
+
+    def get(self, include=None) -> dict:
+        return {
+            "ids": [str(index) for index in range(len(self.documents))],
+            "metadatas": [document.metadata for document in self.documents],
+        }
+
+    def add_documents(self, documents: List[Document]) -> None:
+        self.documents.extend(documents)
+
+    def persist(self) -> None:
+        pass
+
+    def similarity_search(self, query: str, k: int = 3, filter=None) -> List[Document]:
+        allowed = filter["namespace"]
+        allowed = allowed["$in"] if isinstance(allowed, dict) else [allowed]
+        return [document for document in self.documents if document.metadata["namespace"] in allowed][:k]
+
+
+class SlowLoader:
+    def __init__(self) -> None:
+        self.loads = 0
+
+    def load(self) -> List[Document]:
+        self.loads += 1
+        time.sleep(0.05)
+        return [Document(page_content="Ask help@example.com for help.", metadata={})]
+
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    monkeypatch.setattr(FakeChroma, "disk", {})
+    monkeypatch.setattr(registry_module, "Chroma", FakeChroma)
+    monkeypatch.setattr(registry_module, "get_embeddings", lambda: None)
+    return VectorStoreRegistry(base_directory=str(tmp_path))
+
+
+def test_agents_share_a_single_ingestion(registry):
+    loader = SlowLoader()
+    stores = []
+    threads = [
+        threading.Thread(target=lambda: stores.append(registry.get_or_create("manual", loaders=[loader])))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loader.loads == 1
+    assert len(stores) == 4 and all(store is stores[0] for store in stores)
+    assert stores[0].documents[0].metadata["namespace"] == SHARED_NAMESPACE
+
+
+def test_private_documents_are_seen_only_in_their_namespace(registry):
+    registry.get_or_create("manual", loaders=[SlowLoader()])
+    registry.add_private_documents("manual", "Alice", [Document(page_content="Alice's notes", metadata={})])
+
+    def contents(namespace):
+        return [document.page_content for document in registry.search("manual", "help", k=5, namespace=namespace)]
+
+    assert contents("Alice") == ["Ask help@example.com for help.", "Alice's notes"]
+    assert contents("Bob") == ["Ask help@example.com for help."]
+    assert contents(None) == ["Ask help@example.com for help."]
+
+
+def test_release_reloads_from_disk_and_keeps_a_lock_in_use(registry):
+    first = registry.get_or_create("manual", loaders=[SlowLoader()])
+    registry.release("manual")
+    # persisted documents need no loaders
+    second = registry.get_or_create("manual")
+    assert second is not first and second.count() == 1
+
+    holding, done = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with registry._corpus_lock("manual"):
+            holding.set()
+            done.wait(1)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    assert holding.wait(1)
+    lock = registry._corpus_locks["manual"]
+    registry.release("manual")
+
+    # the thread holding the lock keeps it registered, the last user drops it
+    assert registry._corpus_locks["manual"] is lock
+    done.set()
+    holder.join()
+    assert "manual" not in registry._corpus_locks
+    assert registry._corpus_lock_users == {}
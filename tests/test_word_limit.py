@@ -0,0 +1,31 @@
+from agents.word_limit import max_tokens_for, trim_to_word_limit
+
+
+def test_max_tokens_for_leaves_headroom():
+    assert max_tokens_for(50) == 96
+    assert max_tokens_for(50, headroom=1.0) == 78
+    assert max_tokens_for(100) > max_tokens_for(50)
+
+
+def test_text_within_the_limit_is_kept():
+    text = "Rail is faster. It is cleaner."
+    assert trim_to_word_limit(text, 6) == (text, False)
+
+
+def test_overrun_is_cut_at_the_last_sentence_end():
+    text = "High speed rail is fast. It cuts emissions too! And it creates jobs across the country."
+    assert trim_to_word_limit(text, 10) == ("High speed rail is fast. It cuts emissions too!", True)
+
+
+def test_sentence_end_with_closing_quote():
+    text = 'He said "we will build it." Then he left the stage quickly today.'
+    assert trim_to_word_limit(text, 8) == ('He said "we will build it."', True)
+
+
+def test_early_boundary_falls_back_to_the_last_word():
+    text = "Yes. Rail connects every major city on the continent, from coast to coast, within hours"
+    trimmed, overran = trim_to_word_limit(text, 9)
+    # the trailing comma of the last word is dropped
+    assert overran
+    assert trimmed == "Yes. Rail connects every major city on the continent..."
+    assert len(trimmed.split()) == 9